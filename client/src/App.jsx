@@ -4,14 +4,14 @@ import Heatmap from "./component/Heatmap";
 import PieChart from "./component/PieChart";
 import Linechart from "./component/Linechart";
 import React, { useState, useEffect } from "react";
+import { fetchAllPages } from "./utils/fetchAllPages";
 
 function App() {
   const [selectedJobTitle, setSelectedJobTitle] = useState("");
   const [recordsData, setRecordsData] = useState([]);
 
   useEffect(() => {
-    fetch("http://127.0.0.1:8000/records")
-      .then((response) => response.json())
+    fetchAllPages("http://127.0.0.1:8000/records")
       .then((data) => {
         console.log("Fetched records:", data);
         setRecordsData(data);
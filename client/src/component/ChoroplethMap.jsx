@@ -44,24 +44,19 @@ const ChoroplethMap = ({ selectedJobTitle }) => {
       // load the elected job data
       if (selectedJobTitle) {
         fetch(
-          `http://127.0.0.1:8000/salaries/${encodeURIComponent(selectedJobTitle)}`
+          `http://127.0.0.1:8000/salary_stats/${encodeURIComponent(selectedJobTitle)}` +
+          "?group_by=employee_residence"
         )
           .then((res) => res.json())
-          .then((csvData) => {
-            const filtered = csvData.filter(
-              (row) =>
-                row.job_title === selectedJobTitle &&
-                isoAlpha2ToNumeric.hasOwnProperty(row.employee_residence)
-            );
-            // median_salary
-            const grouped = d3.rollups(
-              filtered,
-              (v) => ({
-                median_salary: d3.median(v, (d) => +d.salary_in_usd),
-                count: v.length,
-              }),
-              (d) => isoAlpha2ToNumeric[d.employee_residence]
+          .then((statsData) => {
+            const filtered = statsData.filter((row) =>
+              isoAlpha2ToNumeric.hasOwnProperty(row.employee_residence)
             );
+            // median_salary is computed server side per employee_residence
+            const grouped = filtered.map((row) => [
+              isoAlpha2ToNumeric[row.employee_residence],
+              { median_salary: row.median, count: row.count },
+            ]);
 
             const mapData = new Map(
               grouped.map(([regionCode, data]) => [regionCode, data])
@@ -41,14 +41,18 @@ const Heatmap = ({ selectedJobTitle }) => {
       return;
     }
 
-    fetch(`http://127.0.0.1:8000/salaries/${encodeURIComponent(selectedJobTitle)}`)
+    fetch(
+      `http://127.0.0.1:8000/salary_stats/${encodeURIComponent(selectedJobTitle)}` +
+      "?group_by=experience_level&group_by=employee_residence"
+    )
       .then((res) => res.json())
       .then((data) => {
+        // medians are computed server side, one row per (experience_level, employee_residence)
         const nested = d3.rollups(
           data,
           (v) => ({
-            median_salary: d3.median(v, (d) => +d.salary_in_usd),
-            count: v.length,
+            median_salary: v[0].median,
+            count: v[0].count,
           }),
           (d) => d.experience_level,
           (d) => d.employee_residence
@@ -1,12 +1,12 @@
 import React, { useEffect, useRef } from "react";
 import * as d3 from "d3";
+import { fetchAllPages } from "../utils/fetchAllPages";
 
 const LineChart = ({ selectedJobTitle }) => {
     const svgRef = useRef();
 
     useEffect(() => {
-        fetch("http://127.0.0.1:8000/tft_predictions")
-            .then((res) => res.json())
+        fetchAllPages("http://127.0.0.1:8000/tft_predictions")
             .then((predictionData) => {
                 const jobTitleSet = new Set(predictionData.map((d) => d.job_title)); // Collect all unique job titles
 
@@ -29,17 +29,15 @@ const LineChart = ({ selectedJobTitle }) => {
                             selectedJobTitle
                         )}`
                     ).then((res) => res.json())
-                    : Promise.all(
-                        Array.from(jobTitleSet).map((title) =>
-                            fetch(
-                                `http://127.0.0.1:8000/avg_sal_by_year/${encodeURIComponent(
-                                    title
-                                )}`
-                            )
-                                .then((res) => res.json())
-                                .then((res) => ({ title, data: res }))
-                        )
-                    );
+                    : fetch(
+                        `http://127.0.0.1:8000/avg_sal_by_year?${Array.from(jobTitleSet)
+                            .map((title) => `job_title=${encodeURIComponent(title)}`)
+                            .join("&")}`
+                    )
+                        .then((res) => res.json())
+                        .then((res) =>
+                            Object.entries(res).map(([title, data]) => ({ title, data }))
+                        );
 
                 fetchHistorical.then((historicalRaw) => {
                     let data = [];
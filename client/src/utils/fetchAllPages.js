@@ -0,0 +1,15 @@
+// Paged list routes return one page per request and the cursor of the next
+// one in the X-Next-Cursor header; follow it until the last page.
+export async function fetchAllPages(url) {
+  const rows = [];
+  let cursor = null;
+  do {
+    const pageUrl = new URL(url);
+    if (cursor) pageUrl.searchParams.set("cursor", cursor);
+    const response = await fetch(pageUrl);
+    if (!response.ok) throw new Error(`${response.status} ${response.statusText} for ${pageUrl}`);
+    rows.push(...(await response.json()));
+    cursor = response.headers.get("X-Next-Cursor");
+  } while (cursor);
+  return rows;
+}
@@ -0,0 +1,56 @@
+# server/aggregates.py
+# Pre-aggregated salary collections, rebuilt by import_data.py so the average and
+# count routes read a handful of indexed documents instead of grouping every row.
+from typing import Dict, List
+
+import pandas as pd
+
+from collection_swap import replace_collection
+from sketches import TDigest
+
+# collection -> group keys
+AGGREGATES: Dict[str, List[str]] = {
+    "agg_salary_by_title":            ["job_title"],
+    "agg_salary_by_title_level":      ["job_title", "experience_level"],
+    "agg_salary_by_title_year_level": ["job_title", "year", "experience_level"],
+}
+LOCATION_COUNTS = "agg_count_by_location"
+
+
+def build_aggregates(salaries: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    frames = {}
+    for coll_name, keys in AGGREGATES.items():
+        frames[coll_name] = (
+            salaries.groupby(keys, observed=True)["salary_in_usd"]
+            .agg(count="count", sum="sum", mean="mean", median="median")
+            .reset_index()
+        )
+    frames[LOCATION_COUNTS] = (
+        salaries.groupby("company_location", observed=True).size().rename("count").reset_index()
+    )
+    return frames
+
+
+# Same collections rolled up from sketch cells (see sketches.SketchCells) when the
+# raw rows were streamed and never held in memory; medians come from the merged digests.
+# The location counts are counted while streaming (stream_import.stream_salaries)
+def rollup_aggregates(cells: pd.DataFrame, location_counts: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    digests = cells["sketch"].map(TDigest.from_bytes)
+    frames = {}
+    for coll_name, keys in AGGREGATES.items():
+        groups = cells.groupby(keys, observed=True)
+        frame = groups[["count", "sum"]].sum()
+        frame["mean"] = frame["sum"] / frame["count"]
+        positions = groups.indices
+        frame["median"] = [
+            TDigest.merge(list(digests.iloc[positions[key]])).quantile([0.5])[0] for key in frame.index
+        ]
+        frames[coll_name] = frame.reset_index()
+    frames[LOCATION_COUNTS] = location_counts
+    return frames
+
+
+# Each collection is loaded into staging and swapped in, see collection_swap.py
+def write_aggregates(db, frames: Dict[str, pd.DataFrame]):
+    for coll_name, frame in frames.items():
+        replace_collection(db, coll_name, frame.to_dict("records"))
@@ -0,0 +1,255 @@
+# server/bench_load.py
+# Replay the React dashboard's request mix against the API in-process and report
+# latency percentiles and throughput per dataset scale.
+#
+#   python bench_load.py                                  # columnar stand-in, 1x and 10x
+#   python bench_load.py --scales 1 10 100 --concurrency 32 --sessions 200
+#   python bench_load.py --backend mongo                  # seeds a local "team03hw_bench" db
+#   python bench_load.py --compare bench_results/load_<commit>.json
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Tuple
+from urllib.parse import quote, unquote
+
+import httpx
+import numpy as np
+import pandas as pd
+from starlette.routing import Match
+
+import snapshot
+
+ROOT = Path(__file__).parent.parent
+SEED_SALARIES = ROOT / "result" / "filtered_salaries.csv"
+SEED_PREDICTIONS = ROOT / "result" / "TFT_Predictions.csv"
+RESULTS_DIR = ROOT / "bench_results"
+LEVELS = {"EN": "Entry", "MI": "Mid", "SE": "Senior", "EX": "Executive"}
+BASIC_INFO_FILES = {
+    "attention_summary": ("attention_summary.csv", "Encoder Step", "Attention Weight"),
+    "decoder_variable_importances": ("decoder_variable_importances.csv", "Variable", "Importance (%)"),
+    "encoder_variable_importances": ("encoder_variable_importances.csv", "Variable", "Importance (%)"),
+    "static_variable_importances": ("static_variable_importances.csv", "Variable", "Importance (%)"),
+}
+
+
+# The shipped salaries resampled to scale x their size, with a little salary noise
+def synthetic_tables(scale: int, seed: int = 0) -> Dict[str, pd.DataFrame]:
+    rng = np.random.default_rng(seed)
+    base = pd.read_csv(SEED_SALARIES).rename(columns={"work_year": "year"})
+    base["experience_level"] = base["experience_level"].map(LEVELS)
+    base = base[["job_title", "experience_level", "salary_in_usd", "employee_residence", "year", "company_location"]]
+
+    rows = rng.integers(0, len(base), size=len(base) * scale) if scale > 1 else np.arange(len(base))
+    salaries = base.iloc[rows].reset_index(drop=True)
+    if scale > 1:
+        noise = rng.normal(1.0, 0.05, size=len(salaries))
+        salaries["salary_in_usd"] = (salaries["salary_in_usd"] * noise).round().astype("int64")
+
+    frames = []
+    for name, (filename, key_col, value_col) in BASIC_INFO_FILES.items():
+        df = pd.read_csv(ROOT / "result" / filename).rename(columns={key_col: "key", value_col: "value"})
+        df["dataset"] = name
+        frames.append(df[["dataset", "key", "value"]])
+    basic_info = pd.concat(frames, ignore_index=True)
+
+    predictions = pd.read_csv(SEED_PREDICTIONS).rename(columns=lambda c: c.lower().replace(" ", "_"))
+    predictions["experience_level"] = predictions["experience_level"].map(LEVELS)
+    return {"basic_info": basic_info, "salaries": salaries, "predictions": predictions}
+
+
+def seed_mongo(tables: Dict[str, pd.DataFrame], uri: str, db_name: str, version: str):
+    from pymongo import MongoClient
+    from aggregates import build_aggregates, write_aggregates
+    from indexes import ensure_indexes
+    from sketches import SKETCH_COLL, build_sketches
+
+    db = MongoClient(uri)[db_name]
+    for table, coll_name in snapshot.TABLES.items():
+        db[coll_name].drop()
+        records = tables[table].to_dict("records")
+        for start in range(0, len(records), 50_000):
+            db[coll_name].insert_many(records[start:start + 50_000], ordered=False)
+    write_aggregates(db, build_aggregates(tables["salaries"]))
+    write_aggregates(db, {SKETCH_COLL: build_sketches(tables["salaries"])})
+    ensure_indexes(db)
+    db["dataset_meta"].replace_one({"_id": "dataset"}, {"_id": "dataset", "version": version}, upsert=True)
+
+
+# One page view: the initial load of every component, then a click on one bar.
+# Components fetch in parallel, requests inside a component run one after another.
+def session_plan(titles: List[str], selected: str, mix: str) -> List[List[str]]:
+    q = quote(selected)
+    if mix == "legacy":
+        line_all = ["/tft_predictions"] + [f"/avg_sal_by_year/{quote(t)}" for t in titles]
+        detail = [f"/salaries/{q}"]
+    else:
+        line_all = ["/tft_predictions", "/avg_sal_by_year?" + "&".join(f"job_title={quote(t)}" for t in titles)]
+        detail = [f"/salary_stats/{q}?group_by=experience_level&group_by=employee_residence"]
+    if mix == "dashboard":
+        # the click is answered by one request
+        return [["/records"], ["/avg_salaries"], line_all, [f"/dashboard/{q}"]]
+    return [
+        ["/records"],
+        ["/avg_salaries", f"/avg_salaries/{q}"],
+        line_all + ["/tft_predictions", f"/avg_sal_by_year/{q}"],
+        detail,
+        detail if mix == "legacy" else [f"/salary_stats/{q}?group_by=employee_residence"],
+    ]
+
+
+async def run_component(client: httpx.AsyncClient, urls: List[str], samples: List[Tuple[str, float, int]]):
+    for url in urls:
+        start = time.perf_counter()
+        response = await client.get(url)
+        samples.append((url.split("?")[0], time.perf_counter() - start, response.status_code))
+
+
+async def run_load(app, titles: List[str], sessions: int, concurrency: int, mix: str, seed: int) -> Dict:
+    rng = random.Random(seed)
+    plans = [session_plan(titles, rng.choice(titles), mix) for _ in range(sessions)]
+    samples: List[Tuple[str, float, int]] = []
+    queue: asyncio.Queue = asyncio.Queue()
+    for plan in plans:
+        queue.put_nowait(plan)
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            # warm-up so one-off loading and caches don't land in the percentiles
+            await asyncio.gather(*(run_component(client, urls, []) for urls in plans[0]))
+
+            async def user():
+                while not queue.empty():
+                    plan = queue.get_nowait()
+                    await asyncio.gather(*(run_component(client, urls, samples) for urls in plan))
+
+            start = time.perf_counter()
+            await asyncio.gather(*(user() for _ in range(concurrency)))
+            elapsed = time.perf_counter() - start
+
+    return summarize(app, samples, elapsed, sessions)
+
+
+def _percentiles(latencies: List[float]) -> Dict[str, float]:
+    ms = np.asarray(latencies) * 1000
+    return {
+        "count": int(len(ms)),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+    }
+
+
+def route_template(app, path: str) -> str:
+    scope = {"type": "http", "method": "GET", "path": unquote(path), "root_path": ""}
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return path
+
+
+def summarize(app, samples: List[Tuple[str, float, int]], elapsed: float, sessions: int) -> Dict:
+    by_route: Dict[str, List[float]] = {}
+    for path, latency, _ in samples:
+        by_route.setdefault(route_template(app, path), []).append(latency)
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "requests": len(samples),
+        "errors": sum(status >= 500 for _, _, status in samples),
+        "requests_per_s": round(len(samples) / elapsed, 1),
+        "sessions_per_s": round(sessions / elapsed, 2),
+        "overall": _percentiles([latency for _, latency, _ in samples]),
+        "routes": {route: _percentiles(lat) for route, lat in sorted(by_route.items())},
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def load_app(backend: str, snapshot_dir: Path, mongo_db: str):
+    os.environ["STORAGE_BACKEND"] = backend
+    os.environ["SNAPSHOT_DIR"] = str(snapshot_dir)
+    os.environ["MONGO_DB"] = mongo_db
+    # fresh module so the new storage backend is picked up for every scale
+    if "main" in sys.modules:
+        return importlib.reload(sys.modules["main"]).app
+    return importlib.import_module("main").app
+
+
+def print_report(results: Dict, previous: Dict = None):
+    for scale, run in results["scales"].items():
+        print(f"\n== scale {scale}x: {run['rows']} salary rows, {run['requests']} requests, "
+              f"{run['requests_per_s']} req/s, {run['sessions_per_s']} sessions/s, {run['errors']} errors")
+        before = (previous or {}).get("scales", {}).get(scale, {}).get("routes", {})
+        print(f"{'route':45} {'n':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  {'p95 vs prev':>11}")
+        for route, stats in {**run["routes"], "ALL": run["overall"]}.items():
+            prev = before.get(route) if route != "ALL" else (previous or {}).get("scales", {}).get(scale, {}).get("overall")
+            delta = f"{(stats['p95_ms'] / prev['p95_ms'] - 1) * 100:+.1f}%" if prev and prev["p95_ms"] else ""
+            print(f"{route:45} {stats['count']:6} {stats['p50_ms']:9.2f} {stats['p95_ms']:9.2f} {stats['p99_ms']:9.2f}  {delta:>11}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backend", choices=["columnar", "mongo"], default="columnar")
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017")
+    parser.add_argument("--mongo-db", default="team03hw_bench")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--concurrency", type=int, default=16, help="simultaneous dashboard users")
+    parser.add_argument("--sessions", type=int, default=100, help="page views per scale")
+    parser.add_argument("--mix", choices=["current", "legacy", "dashboard"], default="current",
+                        help="current client requests, the pre-batching fan-out, or one /dashboard call per click")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", type=Path, default=None)
+    parser.add_argument("--compare", type=Path, default=None, help="earlier results JSON to diff p95 against")
+    args = parser.parse_args()
+
+    os.environ["MONGO_URI"] = args.mongo_uri
+    results = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "config": {k: str(v) for k, v in vars(args).items()},
+        "scales": {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in args.scales:
+            tables = synthetic_tables(scale, args.seed)
+            version = f"bench-{scale}x"
+            snapshot_dir = Path(tmp) / f"{scale}x"
+            if args.backend == "columnar":
+                snapshot.write_tables(tables, version, snapshot_dir)
+            else:
+                seed_mongo(tables, args.mongo_uri, args.mongo_db, version)
+            app = load_app(args.backend, snapshot_dir, args.mongo_db)
+            titles = sorted(tables["predictions"]["job_title"].unique())
+            run = asyncio.run(run_load(app, titles, args.sessions, args.concurrency, args.mix, args.seed))
+            run["rows"] = len(tables["salaries"])
+            results["scales"][str(scale)] = run
+
+    previous = json.loads(args.compare.read_text()) if args.compare else None
+    print_report(results, previous)
+
+    out = args.out or RESULTS_DIR / f"load_{results['commit']}_{args.backend}_{args.mix}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(results, indent=2))
+    print(f"\nSaved results to {out}")
+
+
+if __name__ == "__main__":
+    main()
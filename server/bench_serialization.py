@@ -0,0 +1,84 @@
+# server/bench_serialization.py
+# Compare per-request CPU of the old read path (pydantic model per row, response_model
+# revalidation, stock JSON encoder) with the projected orjson fast path.
+#
+#   python bench_serialization.py --rows 40000 --repeat 20
+import argparse
+import json
+import random
+import time
+from typing import List
+
+import orjson
+from bson import ObjectId
+from pydantic import TypeAdapter
+
+from data_schema import SalaryRecordModel
+
+TITLES = ["Data Analyst", "Data Engineer", "Data Scientist", "Machine Learning Engineer", "Research Scientist"]
+LEVELS = ["Entry", "Mid", "Senior", "Executive"]
+RESIDENCES = ["US", "GB", "CA", "DE", "IN", "FR", "ES", "AU"]
+
+
+def make_docs(rows: int, seed: int = 0) -> List[dict]:
+    rng = random.Random(seed)
+    return [
+        {
+            "job_title": rng.choice(TITLES),
+            "experience_level": rng.choice(LEVELS),
+            "salary_in_usd": rng.randint(30_000, 400_000),
+            "employee_residence": rng.choice(RESIDENCES),
+            "year": rng.randint(2020, 2025),
+            "company_location": rng.choice(RESIDENCES),
+        }
+        for _ in range(rows)
+    ]
+
+
+adapter = TypeAdapter(List[SalaryRecordModel])
+
+
+# What FastAPI did before: build models, revalidate for response_model, json.dumps
+def legacy_path(docs_with_id: List[dict]) -> bytes:
+    models = [SalaryRecordModel(**doc) for doc in docs_with_id]
+    validated = adapter.validate_python(models, from_attributes=True)
+    content = adapter.dump_python(validated, mode="json")
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+# The projected documents carry no _id and go straight to orjson
+def fast_path(projected_docs: List[dict]) -> bytes:
+    return orjson.dumps(projected_docs)
+
+
+def cpu_ms(fn, docs, repeat: int) -> float:
+    fn(docs)
+    start = time.process_time()
+    for _ in range(repeat):
+        fn(docs)
+    return (time.process_time() - start) * 1000 / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=40_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    projected = make_docs(args.rows)
+    with_id = [{"_id": ObjectId(), **doc} for doc in projected]
+
+    legacy_ms = cpu_ms(legacy_path, with_id, args.repeat)
+    fast_ms = cpu_ms(fast_path, projected, args.repeat)
+    assert json.loads(legacy_path(with_id)) == json.loads(fast_path(projected))
+
+    print(f"rows per request : {args.rows}")
+    print(f"legacy path      : {legacy_ms:8.2f} ms CPU/request")
+    print(f"fast path        : {fast_ms:8.2f} ms CPU/request")
+    print(f"speedup          : {legacy_ms / fast_ms:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# server/bench_sketches.py
+# Check merged t-digest percentiles against exact ones on the same rows, and time
+# sketch merging against sorting the raw salaries.
+#
+#   python bench_sketches.py                      # 1x and 10x the shipped salaries
+#   python bench_sketches.py --scales 1 100 --queries 500
+import argparse
+import random
+import sys
+import time
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from bench_load import synthetic_tables
+from sketches import SKETCH_CELL, TDigest, build_sketches
+
+QUANTILES = [0.01, 0.05, 0.1, 0.25, 0.5, 0.75, 0.9, 0.95, 0.99]
+# worst accepted |rank(estimate) - q| over all queries
+MAX_RANK_ERROR = 0.01
+
+
+# Random filter combinations like the API gets: a title plus any of level/residence/year
+def random_filters(salaries: pd.DataFrame, n: int, seed: int) -> List[Dict]:
+    rng = random.Random(seed)
+    rows = salaries[SKETCH_CELL].drop_duplicates().to_dict("records")
+    queries = []
+    for _ in range(n):
+        row = rng.choice(rows)
+        keep = ["job_title"] + [f for f in SKETCH_CELL[1:] if rng.random() < 0.4]
+        queries.append({f: row[f] for f in keep})
+    return queries
+
+
+def _mask(df: pd.DataFrame, query: Dict) -> np.ndarray:
+    mask = np.ones(len(df), dtype=bool)
+    for field, value in query.items():
+        mask &= df[field].to_numpy() == value
+    return mask
+
+
+def run_scale(scale: int, queries: int, seed: int) -> Dict:
+    salaries = synthetic_tables(scale, seed)["salaries"]
+
+    start = time.perf_counter()
+    cells = build_sketches(salaries)
+    build_s = time.perf_counter() - start
+    sketch_bytes = int(cells["sketch"].map(len).sum())
+    cells["sketch"] = [TDigest.from_bytes(s) for s in cells["sketch"]]
+
+    rank_errors, value_errors, sketch_s, exact_s = [], [], [], []
+    for query in random_filters(salaries, queries, seed):
+        start = time.perf_counter()
+        digest = TDigest.merge(list(cells["sketch"].to_numpy()[_mask(cells, query)]))
+        estimates = digest.quantile(QUANTILES)
+        sketch_s.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        values = np.sort(salaries["salary_in_usd"].to_numpy()[_mask(salaries, query)])
+        exact = np.quantile(values, QUANTILES)
+        exact_s.append(time.perf_counter() - start)
+
+        # an interpolated estimate sits between two neighbouring rows, allow one row
+        slack = 1 / len(values)
+        for q, est, ex in zip(QUANTILES, estimates, exact):
+            lo = np.searchsorted(values, est, side="left") / len(values)
+            hi = np.searchsorted(values, est, side="right") / len(values)
+            error = 0.0 if lo <= q <= hi else max(lo - q, q - hi)
+            rank_errors.append(max(0.0, error - slack))
+            value_errors.append(abs(est - ex) / ex)
+
+    return {
+        "rows": len(salaries),
+        "cells": len(cells),
+        "build_s": build_s,
+        "bytes": sketch_bytes,
+        "max_rank_error": max(rank_errors),
+        "p99_value_error": float(np.percentile(value_errors, 99)),
+        "sketch_us": float(np.median(sketch_s)) * 1e6,
+        "exact_us": float(np.median(exact_s)) * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'scale':>5} {'rows':>10} {'cells':>6} {'build s':>8} {'KiB':>8} "
+          f"{'max rank err':>12} {'p99 rel err':>11} {'sketch us':>10} {'exact us':>10} {'speedup':>8}")
+    failed = False
+    for scale in args.scales:
+        r = run_scale(scale, args.queries, args.seed)
+        failed |= r["max_rank_error"] > MAX_RANK_ERROR
+        print(f"{scale:>5} {r['rows']:>10} {r['cells']:>6} {r['build_s']:>8.2f} {r['bytes'] / 1024:>8.1f} "
+              f"{r['max_rank_error']:>12.4f} {r['p99_value_error']:>11.4f} {r['sketch_us']:>10.1f} "
+              f"{r['exact_us']:>10.1f} {r['exact_us'] / r['sketch_us']:>7.1f}x")
+
+    if failed:
+        print(f"FAIL: rank error above {MAX_RANK_ERROR}")
+        sys.exit(1)
+    print(f"OK: every estimate within {MAX_RANK_ERROR} rank of the exact percentile")
+
+
+if __name__ == "__main__":
+    main()
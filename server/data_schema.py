@@ -1,6 +1,6 @@
 # server/data_schema.py
 from pydantic import BaseModel, Field
-from typing import Literal, Union, Dict
+from typing import Literal, Union, Dict, List, Optional
 
 class BasicInfoModel(BaseModel):
     dataset: Literal[
@@ -18,9 +18,25 @@ class SalaryRecordModel(BaseModel):
     salary_in_usd:      int
     employee_residence: str
     year:               int # work_year
+    company_location:   str
 
 
 
+# A row of the raw Kaggle salaries.csv, as read by the src/ training scripts
+class RawSalaryModel(BaseModel):
+    work_year:          int
+    experience_level:   Literal["EN", "MI", "SE", "EX"]
+    employment_type:    Optional[str] = None
+    job_title:          str
+    salary:             Optional[int] = None
+    salary_currency:    Optional[str] = None
+    salary_in_usd:      Optional[int] = None  # rows without it are dropped by the scripts
+    employee_residence: str
+    remote_ratio:       Optional[int] = None
+    company_location:   str
+    company_size:       Optional[Literal["S", "M", "L"]] = None
+
+
 class LocationOverview(BaseModel):
     total_locations: int
     locations: Dict[str, int]
@@ -30,4 +46,39 @@ class PredictionModel(BaseModel):
     job_title: str
     experience_level: str
     year: int
-    predicted_salary_usd: float
\ No newline at end of file
+    predicted_salary_usd: float
+
+
+class ForecastModel(PredictionModel):
+    checkpoint: str
+    cached: bool
+    batch_size: int
+    latency_ms: float
+
+
+class SalaryStatsModel(BaseModel):
+    experience_level:   Optional[str] = None
+    employee_residence: Optional[str] = None
+    year:               Optional[int] = None
+    count:  int
+    median: float
+    p25:    float
+    p75:    float
+    min:    int
+    max:    int
+
+
+class DashboardModel(BaseModel):
+    job_title:               str
+    level_averages:          Dict[str, float]                  # level -> avg
+    trend:                   Dict[int, Dict[str, float]]       # year -> level -> avg, excluding 2025
+    level_residence_medians: Dict[str, Dict[str, float]]       # level -> residence -> median
+    residence_medians:       Dict[str, float]                  # residence -> median
+    predictions:             List[PredictionModel]
+
+
+class SalaryPercentilesModel(BaseModel):
+    count:       int
+    min:         float
+    max:         float
+    percentiles: Dict[str, float]  # "0.9" -> salary
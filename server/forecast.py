@@ -0,0 +1,253 @@
+# server/forecast.py
+# Online TFT forecasts for /forecast. The checkpoint written by src/main.py is
+# loaded once at startup. Requests that arrive within a short window are answered
+# by one batched forward pass, run on a worker thread so the event loop keeps
+# serving other routes. Results are cached per checkpoint version and
+# (job_title, experience_level, year), least recently used first out.
+import asyncio
+import importlib.util
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from metrics import forecast_batch_fill, forecast_batch_size, forecast_cache, forecast_seconds
+
+CHECKPOINT_DIR = Path(__file__).parent.parent / "checkpoints"
+BATCH_WINDOW_S = 0.005
+MAX_BATCH = 64
+CACHE_SIZE = 4096
+
+# the API's experience level labels -> the codes the model was trained on
+LEVEL_CODES = {"Entry": "EN", "Mid": "MI", "Senior": "SE", "Executive": "EX"}
+
+TARGET_COL = "Salary in USD"
+SERIES_COLS = ["Job Title", "Experience Level"]
+
+ForecastKey = Tuple[str, str, int]
+
+
+# Collect keys for window_s (or until max_batch distinct keys), then run them
+# through run_batch(keys) -> {key: value or exception} on the executor
+class MicroBatcher:
+    def __init__(self, run_batch: Callable[[List[Hashable]], Dict[Hashable, object]],
+                 window_s: float, max_batch: int, executor: Executor):
+        self.run_batch = run_batch
+        self.window_s = window_s
+        self.max_batch = max_batch
+        self.executor = executor
+        self.pending: Dict[Hashable, List[asyncio.Future]] = {}
+        self.flush_handle: Optional[asyncio.TimerHandle] = None
+        self.tasks = set()
+
+    # Value for key and the number of distinct keys in the batch that computed it
+    async def submit(self, key: Hashable) -> Tuple[object, int]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.setdefault(key, []).append(future)
+        if len(self.pending) >= self.max_batch:
+            self._flush()
+        elif self.flush_handle is None:
+            self.flush_handle = loop.call_later(self.window_s, self._flush)
+        return await future
+
+    def _flush(self):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        batch, self.pending = self.pending, {}
+        task = asyncio.get_running_loop().create_task(self._run(batch))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _run(self, batch: Dict[Hashable, List[asyncio.Future]]):
+        keys = list(batch)
+        forecast_batch_size.observe(len(keys))
+        forecast_batch_fill.observe(len(keys) / self.max_batch)
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(self.executor, self.run_batch, keys)
+        except Exception as e:
+            results = {key: e for key in keys}
+        for key, futures in batch.items():
+            result = results[key]
+            for future in futures:
+                # the client may have gone away
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result((result, len(keys)))
+
+
+# src/checkpoints.py loaded by file path, so src/ never goes on the server's sys.path
+def _load_checkpoints_module():
+    path = Path(__file__).parent.parent / "src" / "checkpoints.py"
+    spec = importlib.util.spec_from_file_location("tft_checkpoints", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# The checkpoint's model, fitted dataset parameters and the history it was trained on
+class TFTForecaster:
+    def __init__(self, checkpoint_dir: Path, version: Optional[str] = None):
+        load_checkpoint = _load_checkpoints_module().load_checkpoint
+
+        self.tft, self.dataset_params, meta, path = load_checkpoint(version, checkpoint_dir)
+        self.version = meta["version"]
+        self.horizon = self.dataset_params["max_prediction_length"]
+
+        # the future rows main.py appended have a zero target, everything else is history
+        model_input = pd.read_parquet(path / "model_input.parquet")
+        is_future = model_input["Year"].isin(meta["config"]["future_years"]) & (model_input[TARGET_COL] == 0)
+        self.history = model_input[~is_future]
+        self.template = model_input[is_future].iloc[0].to_dict()
+        self.min_year = int(self.history["Year"].min())
+        self.series = {key: rows for key, rows in self.history.groupby(SERIES_COLS)}
+        self.series_by_id = {int(rows["series_id"].iloc[0]): key for key, rows in self.series.items()}
+
+    # First year of the decoder window that covers year; the series must have
+    # history before it and year must be within horizon of its last observed year
+    def window_start(self, key: ForecastKey) -> int:
+        job_title, experience_level, year = key
+        rows = self.series.get((job_title, experience_level))
+        if rows is None:
+            raise LookupError(f"No TFT series for job_title={job_title}, experience_level={experience_level}")
+        first, last = int(rows["Year"].min()), int(rows["Year"].max())
+        if not first < year <= last + self.horizon:
+            raise ValueError(f"year must be in {first + 1}..{last + self.horizon} for this series")
+        return min(year, last + 1)
+
+    # Encoder rows before start plus horizon decoder rows filled like main.py's future rows
+    def window_frame(self, rows: pd.DataFrame, start: int) -> pd.DataFrame:
+        years = np.arange(start, start + self.horizon)
+        decoder = pd.DataFrame([self.template] * len(years))
+        for col in SERIES_COLS + ["series_id"]:
+            decoder[col] = rows[col].iloc[0]
+        decoder["Year"] = years
+        decoder["time_idx"] = years - self.min_year
+        decoder[TARGET_COL] = 0.0
+        decoder = decoder[rows.columns].astype(rows.dtypes.to_dict())
+        return pd.concat([rows[rows["Year"] < start], decoder], ignore_index=True)
+
+    # One forward pass over one window per series -> {(series, year): prediction}
+    def forward(self, starts: Dict[Tuple[str, str], int]) -> Dict[Tuple[Tuple[str, str], int], float]:
+        import torch
+        from pytorch_forecasting.data import TimeSeriesDataSet
+
+        frame = pd.concat([self.window_frame(self.series[key], start) for key, start in starts.items()],
+                          ignore_index=True)
+        try:
+            dataset = TimeSeriesDataSet.from_parameters(self.dataset_params, frame, predict=True,
+                                                        stop_randomization=True)
+        except (AssertionError, ValueError):
+            # every window was shorter than the model's minimum encoder length
+            return {}
+        dataloader = dataset.to_dataloader(train=False, batch_size=len(starts), num_workers=0)
+
+        predictions = {}
+        with torch.inference_mode():
+            for x, _ in dataloader:
+                values = self.tft.to_prediction(self.tft(x)).cpu().numpy()
+                index = dataset.x_to_index(x)
+                for series_id, time_idx, row in zip(index["series_id"], index["time_idx"], values):
+                    key = self.series_by_id[int(series_id)]
+                    for step, value in enumerate(row):
+                        predictions[(key, self.min_year + int(time_idx) + step)] = float(value)
+        return predictions
+
+    def predict(self, keys: List[ForecastKey]) -> Dict[ForecastKey, object]:
+        results: Dict[ForecastKey, object] = {}
+        windows: Dict[Tuple[Tuple[str, str], int], List[ForecastKey]] = {}
+        for key in keys:
+            try:
+                windows.setdefault(((key[0], key[1]), self.window_start(key)), []).append(key)
+            except (LookupError, ValueError) as e:
+                results[key] = e
+
+        # a series_id can only appear once per dataset, so two windows of the
+        # same series go into separate passes
+        passes: List[Dict[Tuple[str, str], int]] = []
+        for series, start in windows:
+            for starts in passes:
+                if series not in starts:
+                    starts[series] = start
+                    break
+            else:
+                passes.append({series: start})
+
+        for starts in passes:
+            predictions = self.forward(starts)
+            for series, start in starts.items():
+                for key in windows[(series, start)]:
+                    value = predictions.get((series, key[2]))
+                    results[key] = value if value is not None else ValueError(
+                        "Not enough history before this year for the model's encoder")
+        return results
+
+
+class ForecastService:
+    def __init__(self, forecaster: TFTForecaster, window_s: float = BATCH_WINDOW_S, max_batch: int = MAX_BATCH,
+                 cache_size: int = CACHE_SIZE):
+        self.forecaster = forecaster
+        # torch parallelizes each forward pass itself, so passes run one at a time
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="forecast")
+        self.batcher = MicroBatcher(forecaster.predict, window_s, max_batch, self.executor)
+        self.cache: "OrderedDict[Tuple[str, ForecastKey], float]" = OrderedDict()
+        self.cache_size = cache_size
+
+    # experience_level is the API label (Entry/Mid/Senior/Executive)
+    async def forecast(self, job_title: str, experience_level: str, year: int) -> Dict:
+        start = time.perf_counter()
+        key = (job_title, LEVEL_CODES[experience_level], year)
+        cache_key = (self.forecaster.version, key)
+        cached = cache_key in self.cache
+        if cached:
+            value, batch_size = self.cache[cache_key], 0
+            self.cache.move_to_end(cache_key)
+        else:
+            value, batch_size = await self.batcher.submit(key)
+            self.cache[cache_key] = value
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        elapsed = time.perf_counter() - start
+        result = "hit" if cached else "miss"
+        forecast_cache.inc(result=result)
+        forecast_seconds.observe(elapsed, cache=result)
+        return {
+            "job_title": job_title,
+            "experience_level": experience_level,
+            "year": year,
+            "predicted_salary_usd": round(value, 2),
+            "checkpoint": self.forecaster.version,
+            "cached": cached,
+            "batch_size": batch_size,
+            "latency_ms": round(elapsed * 1000, 3),
+        }
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+# FORECAST_CHECKPOINT_DIR / FORECAST_CHECKPOINT (default: the latest version),
+# FORECAST_CACHE_SIZE forecasts kept;
+# None, and /forecast answers 503, when there is no checkpoint or no torch
+def load_forecast_service() -> Optional[ForecastService]:
+    checkpoint_dir = Path(os.environ.get("FORECAST_CHECKPOINT_DIR", CHECKPOINT_DIR))
+    try:
+        forecaster = TFTForecaster(checkpoint_dir, os.environ.get("FORECAST_CHECKPOINT"))
+    except (ImportError, FileNotFoundError) as e:
+        print(f"[forecast] disabled: {e}")
+        return None
+    window_s = float(os.environ.get("FORECAST_BATCH_WINDOW_MS", BATCH_WINDOW_S * 1000)) / 1000
+    max_batch = int(os.environ.get("FORECAST_MAX_BATCH", MAX_BATCH))
+    cache_size = int(os.environ.get("FORECAST_CACHE_SIZE", CACHE_SIZE))
+    print(f"[forecast] serving {forecaster.version}, {len(forecaster.series)} series, "
+          f"window {window_s * 1000:g}ms, max batch {max_batch}")
+    return ForecastService(forecaster, window_s, max_batch, cache_size)
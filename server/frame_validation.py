@@ -0,0 +1,149 @@
+# server/frame_validation.py
+# Column-level checks derived from the pydantic models in data_schema.py, run
+# vectorized over a whole DataFrame instead of building one model per row.
+# Covers the field types these models use: str, int, float, Literal[...], Union
+# and Optional. Every bad value is reported, not just the first one.
+#
+#   python frame_validation.py ../data/salaries.csv RawSalaryModel   # full report of a CSV
+import argparse
+import sys
+from typing import Literal, List, Tuple, Type, Union, get_args, get_origin
+
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel
+
+REPORT_COLUMNS = ["row", "column", "error", "value"]
+
+
+class FrameValidationError(ValueError):
+    def __init__(self, model: Type[BaseModel], report: pd.DataFrame):
+        self.report = report
+        shown = report.head(10).to_string(index=False)
+        more = f"\n... and {len(report) - 10} more" if len(report) > 10 else ""
+        super().__init__(
+            f"{len(report)} invalid values in {report['row'].nunique()} rows for {model.__name__}:\n{shown}{more}"
+        )
+
+
+# Each check returns (bad mask, coerced column); only non-null values are checked
+def _check_str(col: pd.Series) -> Tuple[np.ndarray, pd.Series]:
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        ok_categories = pd.api.types.infer_dtype(col.cat.categories, skipna=True) == "string"
+        return np.zeros(len(col), dtype=bool) if ok_categories else _check_str(col.astype(object))[0], col
+    if pd.api.types.is_numeric_dtype(col.dtype) or pd.api.types.is_bool_dtype(col.dtype):
+        return np.ones(len(col), dtype=bool), col
+    if pd.api.types.infer_dtype(col, skipna=True) in ("string", "empty"):
+        return np.zeros(len(col), dtype=bool), col
+    return ~col.map(lambda v: isinstance(v, str)).to_numpy(dtype=bool), col
+
+
+def _numeric(col: pd.Series) -> pd.Series:
+    if pd.api.types.is_bool_dtype(col.dtype) or pd.api.types.is_numeric_dtype(col.dtype):
+        return col.astype("float64")
+    return pd.to_numeric(col.astype(object), errors="coerce")
+
+
+def _check_int(col: pd.Series) -> Tuple[np.ndarray, pd.Series]:
+    if pd.api.types.is_integer_dtype(col.dtype):
+        return np.zeros(len(col), dtype=bool), col
+    values = _numeric(col)
+    bad = (values.isna() | (values != np.floor(values))).to_numpy()
+    if bad.any():
+        return bad, values
+    return bad, values.astype("int64")
+
+
+def _check_float(col: pd.Series) -> Tuple[np.ndarray, pd.Series]:
+    if pd.api.types.is_float_dtype(col.dtype):
+        return np.zeros(len(col), dtype=bool), col
+    values = _numeric(col)
+    return values.isna().to_numpy(), values
+
+
+CHECKS = {str: (_check_str, "not a string"), int: (_check_int, "not an integer"), float: (_check_float, "not a number")}
+
+
+def _is_optional(annotation) -> bool:
+    return get_origin(annotation) is Union and type(None) in get_args(annotation)
+
+
+def _check(annotation, col: pd.Series) -> Tuple[np.ndarray, pd.Series, str]:
+    origin = get_origin(annotation)
+    if origin is Literal:
+        allowed = list(get_args(annotation))
+        return ~col.isin(allowed).to_numpy(), col, f"not one of {allowed}"
+    if origin is Union:
+        members = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(members) == 1:
+            return _check(members[0], col)
+        # valid if any member accepts it; mixed values are kept as they are
+        bad = np.ones(len(col), dtype=bool)
+        for member in members:
+            bad &= _check(member, col)[0]
+        return bad, col, f"not any of {[getattr(m, '__name__', str(m)) for m in members]}"
+    if annotation in CHECKS:
+        check, message = CHECKS[annotation]
+        bad, coerced = check(col)
+        return bad, coerced, message
+    raise TypeError(f"No column check for {annotation!r}")
+
+
+# Returns the frame with the model's columns (ints coerced) and the error report
+def validate_frame(df: pd.DataFrame, model: Type[BaseModel]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    errors: List[pd.DataFrame] = []
+    out = {}
+    for name, field in model.model_fields.items():
+        column = field.alias or name
+        if column not in df.columns:
+            if field.is_required():
+                errors.append(pd.DataFrame([[None, column, "missing column", None]], columns=REPORT_COLUMNS))
+            else:
+                out[column] = pd.Series(field.default, index=df.index)
+            continue
+
+        col = df[column]
+        null = col.isna().to_numpy()
+        if null.any() and not _is_optional(field.annotation):
+            errors.append(pd.DataFrame({
+                "row": df.index[null], "column": column, "error": "missing value", "value": None,
+            }))
+
+        present = col[~null]
+        bad, coerced, message = _check(field.annotation, present)
+        if bad.any():
+            errors.append(pd.DataFrame({
+                "row": present.index[bad], "column": column, "error": message, "value": present[bad].to_numpy(),
+            }))
+        out[column] = coerced.reindex(df.index) if len(present) < len(col) else coerced
+
+    report = pd.concat(errors, ignore_index=True) if errors else pd.DataFrame(columns=REPORT_COLUMNS)
+    report = report.sort_values("row", na_position="first", kind="stable", ignore_index=True)
+    return pd.DataFrame(out, index=df.index), report
+
+
+# Like validate_frame, but raises FrameValidationError listing every bad value
+def check_frame(df: pd.DataFrame, model: Type[BaseModel]) -> pd.DataFrame:
+    validated, report = validate_frame(df, model)
+    if len(report):
+        raise FrameValidationError(model, report)
+    return validated
+
+
+def main():
+    import data_schema
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("csv")
+    parser.add_argument("model", help="model name in data_schema.py, e.g. RawSalaryModel")
+    args = parser.parse_args()
+
+    _, report = validate_frame(pd.read_csv(args.csv), getattr(data_schema, args.model))
+    if len(report):
+        print(report.to_string(index=False))
+        sys.exit(1)
+    print(f"{args.csv}: no invalid values for {args.model}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# server/http_cache.py
+import asyncio
+import gzip
+from typing import Dict, Iterable, Optional, Tuple
+
+import brotli
+from fastapi import Request
+from fastapi.responses import Response
+
+from streaming import negotiate_stream
+
+CACHE_CONTROL        = "public, max-age=60, must-revalidate"
+VERSION_POLL_SECONDS = 10
+MAX_CACHED_BODIES    = 256
+# route headers kept with a cached body, so paginated hot paths keep their cursor
+REPLAYED_HEADERS     = ("X-Next-Cursor", "Link")
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    # weak comparison, W/"v" and "v" are the same validator
+    wanted = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in wanted or etag.removeprefix("W/") in wanted
+
+
+def _pick_encoding(accept_encoding: str) -> str:
+    offered = set()
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.replace(" ", "") not in ("q=0", "q=0.0"):
+            offered.add(coding.strip().lower())
+    if "br" in offered:
+        return "br"
+    if "gzip" in offered:
+        return "gzip"
+    return "identity"
+
+
+# ETag/Cache-Control from the version stamped by import_data.py, plus cached
+# identity/gzip/brotli bodies for the hot endpoints
+class DatasetCache:
+    def __init__(self, storage, hot_paths: Iterable[str], skip_paths: Iterable[str] = ()):
+        self.storage = storage
+        self.hot_paths = set(hot_paths)
+        self.skip_paths = set(skip_paths)
+        self.version: Optional[str] = None
+        self.bodies: Dict[Tuple[str, str], Tuple[str, Dict[str, str], Dict[str, bytes]]] = {}
+
+    async def refresh(self):
+        version = await self.storage.dataset_version()
+        if version != self.version:
+            self.version = version
+            self.bodies.clear()
+
+    # Poll the stamp in the background so requests never wait on Mongo for it
+    async def poll(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as exc:
+                print(f"Warning: could not read dataset version: {exc}")
+            await asyncio.sleep(VERSION_POLL_SECONDS)
+
+    async def middleware(self, request: Request, call_next):
+        version = self.version
+        if request.method not in ("GET", "HEAD") or version is None or request.url.path in self.skip_paths:
+            return await call_next(request)
+
+        headers = {
+            "ETag": f'W/"{version}"',
+            "Cache-Control": CACHE_CONTROL,
+            "Vary": "Accept, Accept-Encoding",
+        }
+        # 304 only where the route answers 200, never for unknown paths or 404s
+        not_modified = _etag_matches(request.headers.get("if-none-match"), headers["ETag"])
+
+        if request.url.path not in self.hot_paths or negotiate_stream(request):
+            response = await call_next(request)
+            if response.status_code == 200:
+                if not_modified:
+                    return Response(status_code=304, headers=headers)
+                response.headers.update(headers)
+            return response
+
+        key = (f"{request.url.path}?{request.url.query}", version)
+        cached = self.bodies.get(key)
+        if cached is None:
+            response = await call_next(request)
+            if response.status_code != 200:
+                return response
+            body = b"".join([chunk async for chunk in response.body_iterator])
+            cached = (
+                response.headers.get("content-type", "application/json"),
+                {name: response.headers[name] for name in REPLAYED_HEADERS if name in response.headers},
+                {"identity": body, "gzip": gzip.compress(body), "br": brotli.compress(body)},
+            )
+            if len(self.bodies) < MAX_CACHED_BODIES:
+                self.bodies[key] = cached
+
+        media_type, route_headers, bodies = cached
+        headers.update(route_headers)
+        if not_modified:
+            return Response(status_code=304, headers=headers)
+        encoding = _pick_encoding(request.headers.get("accept-encoding", ""))
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(
+            content=bodies[encoding],
+            headers=headers,
+            media_type=media_type,
+        )
@@ -1,9 +1,21 @@
 # server/import_data.py
+import argparse
+import os
 import pandas as pd
 from pymongo import MongoClient
 from pathlib import Path
-
-from data_schema import BasicInfoModel, SalaryRecordModel
+from datetime import datetime, timezone
+from typing import List
+from uuid import uuid4
+
+from aggregates import build_aggregates, rollup_aggregates, write_aggregates
+from collection_swap import HASH_FIELD, replace_collection, row_hashes, staging_collection, swap_in, sync_collection
+from data_schema import BasicInfoModel, PredictionModel, SalaryRecordModel
+from frame_validation import check_frame
+from sketches import SKETCH_COLL, build_sketches
+from indexes import ensure_indexes
+from snapshot import SNAPSHOT_DIR, write_snapshot
+from stream_import import stream_salaries
 
 CSV_SALARIES = Path(__file__).parent.parent / "data" / "salaries.csv"
 CSV_PREDICTIONS = Path(__file__).parent.parent / "result" / "TFT_Predictions.csv"
@@ -30,9 +42,7 @@ MONGO_URI = "mongodb://localhost:27017"
 DB_NAME   = "team03hw"
 COLL_NAME = "tft_basic_info"
 client       = MongoClient(MONGO_URI)   
-salary_coll = client[DB_NAME]["salaries_filtered"]
-coll   = client[DB_NAME][COLL_NAME]
-predictions_coll = client[DB_NAME]["tft_predictions"]
+meta_coll = client[DB_NAME]["dataset_meta"]
 
 
 def read_and_normalize(name: str, filename: str) -> pd.DataFrame:
@@ -47,60 +57,122 @@ def read_and_normalize(name: str, filename: str) -> pd.DataFrame:
     assert set(df.columns) >= {"key", "value", "dataset"}
     return df[["dataset", "key", "value"]]
 
-def main():
-    frames = [read_and_normalize(ds, fn) for ds, fn in CSV_FILES.items()]
-    df_all = pd.concat(frames, ignore_index=True)
-    print(f"Total rows to insert: {len(df_all)}")
-
-    for rec in df_all.to_dict("records"):
-        BasicInfoModel(**rec)
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stream", action="store_true",
+                        help="import salaries in chunks with parallel bulk writes, for large dumps")
+    parser.add_argument("--chunk-size", type=int, default=50_000)
+    parser.add_argument("--in-flight", type=int, default=4, help="bulk writes running at once")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only insert/delete the rows that changed since the last import")
+    args = parser.parse_args()
+    if args.stream and args.incremental:
+        parser.error("--stream and --incremental can't be combined")
+    return args
+
+
+# Blue/green swap of the whole collection, or with --incremental only the rows
+# whose content hash changed
+def load_collection(coll_name: str, df: pd.DataFrame, columns: List[str], incremental: bool):
+    db = client[DB_NAME]
+    if incremental:
+        inserted, deleted = sync_collection(db[coll_name], df, columns)
+        print(f"Inserted {inserted} and deleted {deleted} changed documents in {coll_name}.")
+    else:
+        df = df.assign(**{HASH_FIELD: row_hashes(df, columns)})
+        replace_collection(db, coll_name, df[columns + [HASH_FIELD]].to_dict("records"))
+        print(f"Inserted {db[coll_name].count_documents({})} documents into {coll_name}.")
 
-    coll.delete_many({})
-    coll.insert_many(df_all.to_dict("records"))
-    print(f"Inserted {coll.count_documents({})} documents into {COLL_NAME}.")
 
+def import_predictions(incremental: bool):
+    if not CSV_PREDICTIONS.exists():
+        print(f"Warning: {CSV_PREDICTIONS} not found, skip importing predictions.")
+        return
 
-    df = pd.read_csv(CSV_SALARIES)
-    df = df[df["job_title"].isin(SELECTED_TITLES)].copy()
-    df.columns = df.columns.str.strip().str.lower().str.replace(" ", "_")
+    df_pred = pd.read_csv(CSV_PREDICTIONS)
 
-    df.rename(columns={"work_year": "year"}, inplace=True)
+    df_pred = df_pred.rename(columns=lambda c: c.lower().replace(" ", "_"))
 
     mapping = {"EN": "Entry", "MI": "Mid", "SE": "Senior", "EX": "Executive"}
-    df["experience_level"] = df["experience_level"].map(mapping)
+    if "experience_level" in df_pred.columns:
+        df_pred["experience_level"] = df_pred["experience_level"].map(mapping)
+
+    df_pred = check_frame(df_pred, PredictionModel)
+    load_collection("tft_predictions", df_pred, list(df_pred.columns), incremental)
+
 
-    required_fields = {"job_title", "experience_level", "salary_in_usd", "employee_residence", "year"}
-    df = df[[col for col in df.columns if col in required_fields]]
+def main():
+    args = parse_args()
+    frames = [read_and_normalize(ds, fn) for ds, fn in CSV_FILES.items()]
+    df_all = pd.concat(frames, ignore_index=True)
+    print(f"Total rows to insert: {len(df_all)}")
 
-    records = []
-    for rec in df.to_dict("records"):
-        validated = SalaryRecordModel(**rec)
-        records.append(validated.model_dump(by_alias=True))  
+    df_all = check_frame(df_all, BasicInfoModel)
+    load_collection(COLL_NAME, df_all, list(df_all.columns), args.incremental)
+
+    if args.stream:
+        # Bounded memory: chunks go straight to Mongo and the snapshot, aggregates
+        # are rolled up from the per-cell sketches
+        SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+        # the columnar backend keeps serving the old salaries.parquet until the
+        # new collection is swapped in; a failed import leaves no partial file
+        partial = SNAPSHOT_DIR / "salaries.parquet.tmp"
+        try:
+            report = stream_salaries(
+                CSV_SALARIES, staging_collection(client[DB_NAME], "salaries_filtered"), SELECTED_TITLES,
+                args.chunk_size, args.in_flight, partial,
+            )
+            swap_in(client[DB_NAME], "salaries_filtered")
+        except BaseException:
+            partial.unlink(missing_ok=True)
+            raise
+        os.replace(partial, SNAPSHOT_DIR / "salaries.parquet")
+        print(f"Streamed {report['rows']} salary records into salaries_filtered in {report['elapsed_s']:.1f}s "
+              f"({report['rows_per_s']:.0f} rows/s, peak RSS {report['peak_rss_mb']:.0f} MB).")
+        sketches = report["cells"]
+        aggregates = rollup_aggregates(sketches, report["location_counts"])
+    else:
+        df = pd.read_csv(CSV_SALARIES)
+        df = df[df["job_title"].isin(SELECTED_TITLES)].copy()
+        df.columns = df.columns.str.strip().str.lower().str.replace(" ", "_")
 
-    salary_coll.delete_many({})
-    if records:
-        salary_coll.insert_many(records)
-    print(f"Inserted {salary_coll.count_documents({})} salary records into salaries_filtered.")
+        df.rename(columns={"work_year": "year"}, inplace=True)
 
+        mapping = {"EN": "Entry", "MI": "Mid", "SE": "Senior", "EX": "Executive"}
+        df["experience_level"] = df["experience_level"].map(mapping)
 
-# predictions
-if CSV_PREDICTIONS.exists():
-    df_pred = pd.read_csv(CSV_PREDICTIONS)
+        # every bad row is reported at once, with its CSV row index
+        salaries = check_frame(df, SalaryRecordModel)
+        load_collection("salaries_filtered", salaries, list(salaries.columns), args.incremental)
 
-    df_pred = df_pred.rename(columns=lambda c: c.lower().replace(" ", "_"))
+        aggregates = build_aggregates(salaries)
+        sketches = build_sketches(salaries)
 
-    mapping = {"EN": "Entry", "MI": "Mid", "SE": "Senior", "EX": "Executive"}
-    if "experience_level" in df_pred.columns:
-        df_pred["experience_level"] = df_pred["experience_level"].map(mapping)
+    # Averages and counts the API serves without grouping the raw rows
+    write_aggregates(client[DB_NAME], aggregates)
+    print(f"Wrote aggregate collections: {', '.join(aggregates)}.")
+
+    # One serialized t-digest per cell, merged by /salary_percentiles
+    write_aggregates(client[DB_NAME], {SKETCH_COLL: sketches})
+    print(f"Wrote {len(sketches)} quantile sketches into {SKETCH_COLL}.")
+
+    import_predictions(args.incremental)
+
+    ensure_indexes(client[DB_NAME])
+    print("Created API indexes.")
 
-    pred_records = df_pred.to_dict("records")
-    predictions_coll.delete_many({})
-    if pred_records:
-        predictions_coll.insert_many(pred_records)
-    print(f"Inserted {predictions_coll.count_documents({})} prediction records into tft_predictions.")
-else:
-    print(f"Warning: {CSV_PREDICTIONS} not found, skip importing predictions.")
+    # The API derives its ETags from this stamp, so bump it on every import
+    version = uuid4().hex
+    meta_coll.replace_one(
+        {"_id": "dataset"},
+        {"_id": "dataset", "version": version, "imported_at": datetime.now(timezone.utc)},
+        upsert=True,
+    )
+    print(f"Stamped dataset version {version}.")
 
+    # Columnar copy for STORAGE_BACKEND=columnar; streamed salaries are already written
+    write_snapshot(client[DB_NAME], version, tables=["basic_info", "predictions"] if args.stream else None)
+    print(f"Wrote columnar snapshot to {SNAPSHOT_DIR}.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,157 @@
+# server/indexes.py
+# Compound indexes for the API queries, created by import_data.py and at API startup.
+#
+#   python indexes.py            # create indexes and print the explain() report
+import argparse
+from typing import Dict, Iterator, List, Tuple
+
+from pymongo import ASCENDING, MongoClient
+
+MONGO_URI = "mongodb://localhost:27017"
+DB_NAME   = "team03hw"
+
+# Equality fields first, then _id so keyset pages come straight out of the index
+INDEXES: Dict[str, List[List[Tuple[str, int]]]] = {
+    "salaries_filtered": [
+        [("job_title", ASCENDING), ("_id", ASCENDING)],
+        [("job_title", ASCENDING), ("experience_level", ASCENDING), ("_id", ASCENDING)],
+        [("company_location", ASCENDING), ("_id", ASCENDING)],
+        [("company_location", ASCENDING), ("job_title", ASCENDING), ("_id", ASCENDING)],
+    ],
+    "agg_salary_by_title": [
+        [("job_title", ASCENDING)],
+    ],
+    "agg_salary_by_title_level": [
+        [("job_title", ASCENDING), ("experience_level", ASCENDING)],
+    ],
+    "agg_salary_by_title_year_level": [
+        [("job_title", ASCENDING), ("year", ASCENDING), ("experience_level", ASCENDING)],
+    ],
+    "agg_count_by_location": [
+        [("company_location", ASCENDING)],
+    ],
+    "salary_sketches": [
+        [("job_title", ASCENDING), ("experience_level", ASCENDING), ("employee_residence", ASCENDING), ("year", ASCENDING)],
+    ],
+    "tft_basic_info": [
+        [("dataset", ASCENDING), ("_id", ASCENDING)],
+        [("dataset", ASCENDING), ("key", ASCENDING)],
+    ],
+}
+
+
+def _index_name(keys: List[Tuple[str, int]]) -> str:
+    return "api_" + "_".join(f"{field}_{direction}" for field, direction in keys)
+
+
+def ensure_indexes(db):
+    for coll_name in INDEXES:
+        ensure_collection_indexes(db[coll_name], coll_name)
+
+
+# Indexes of coll_name, built on coll (e.g. its staging copy before the swap)
+def ensure_collection_indexes(coll, coll_name: str):
+    for keys in INDEXES.get(coll_name, []):
+        coll.create_index(keys, name=_index_name(keys))
+
+
+async def ensure_indexes_async(db):
+    for coll_name, specs in INDEXES.items():
+        for keys in specs:
+            await db[coll_name].create_index(keys, name=_index_name(keys))
+
+
+# Representative query of each route: (route, collection, "find"/"aggregate", spec)
+def route_queries(job_title: str, level: str, location: str) -> List[Tuple[str, str, str, object]]:
+    return [
+        ("/records", "tft_basic_info", "find", ({}, [("_id", 1)])),
+        ("/records/{dataset}", "tft_basic_info", "find", ({"dataset": "attention_summary"}, [("_id", 1)])),
+        ("/records/{dataset}/{key}", "tft_basic_info", "find", ({"dataset": "attention_summary", "key": "0"}, None)),
+        ("/salaries", "salaries_filtered", "find", ({"job_title": job_title}, [("_id", 1)])),
+        ("/salaries/{job_title}", "salaries_filtered", "find", ({"job_title": job_title}, [("_id", 1)])),
+        ("/salaries/{job_title}/{experience_level}", "salaries_filtered", "find",
+         ({"job_title": job_title, "experience_level": level}, [("_id", 1)])),
+        ("/salary_location/{company_location}", "salaries_filtered", "find",
+         ({"company_location": location}, [("_id", 1)])),
+        ("/salary_location/{company_location}/{job_title}", "salaries_filtered", "find",
+         ({"company_location": location, "job_title": job_title}, [("_id", 1)])),
+        ("/salary_stats/{job_title}", "salaries_filtered", "aggregate", [
+            {"$match": {"job_title": job_title}},
+            {"$group": {"_id": "$experience_level", "salaries": {"$push": "$salary_in_usd"}}},
+        ]),
+        ("/salary_percentiles/{job_title}", "salary_sketches", "find",
+         ({"job_title": job_title, "experience_level": level}, None)),
+        ("/salaries/{job_title}/experience_levels", "agg_salary_by_title_level", "find",
+         ({"job_title": job_title}, None)),
+        ("/avg_salaries/{job_title}", "agg_salary_by_title_level", "find",
+         ({"job_title": job_title}, [("mean", -1)])),
+        ("/avg_sal_by_year/{job_title}", "agg_salary_by_title_year_level", "find",
+         ({"job_title": {"$in": [job_title]}, "year": {"$ne": 2025}},
+          [("job_title", 1), ("year", 1), ("experience_level", 1)])),
+        # these two read whole (tiny) pre-aggregated collections, a COLLSCAN is expected
+        ("/avg_salaries", "agg_salary_by_title", "find", ({}, [("mean", -1)])),
+        ("/salary_location", "agg_count_by_location", "find", ({}, [("count", -1)])),
+    ]
+
+
+def _stages(plan) -> Iterator[str]:
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from _stages(value)
+
+
+def _winning_plans(explain: dict) -> Iterator[dict]:
+    if "queryPlanner" in explain:
+        yield explain["queryPlanner"]["winningPlan"]
+    for stage in explain.get("stages", []):
+        if "$cursor" in stage:
+            yield stage["$cursor"]["queryPlanner"]["winningPlan"]
+
+
+def explain_report(db) -> List[Tuple[str, List[str]]]:
+    sample = db["salaries_filtered"].find_one() or {}
+    queries = route_queries(
+        sample.get("job_title", ""),
+        sample.get("experience_level", ""),
+        sample.get("company_location", ""),
+    )
+    report = []
+    for route, coll_name, kind, spec in queries:
+        if kind == "find":
+            query, sort = spec
+            cursor = db[coll_name].find(query).limit(1000)
+            if sort:
+                cursor = cursor.sort(sort)
+            explain = cursor.explain()
+        else:
+            explain = db.command("aggregate", coll_name, pipeline=spec, explain=True)
+        stages = [stage for plan in _winning_plans(explain) for stage in _stages(plan)]
+        report.append((route, stages))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--skip-create", action="store_true", help="only print the explain() report")
+    args = parser.parse_args()
+
+    db = MongoClient(MONGO_URI)[DB_NAME]
+    if not args.skip_create:
+        ensure_indexes(db)
+        print("Indexes are in place.")
+
+    scans = 0
+    for route, stages in explain_report(db):
+        flag = "COLLSCAN" if "COLLSCAN" in stages else "ok"
+        scans += flag == "COLLSCAN"
+        print(f"{flag:8}  {route:50}  {' > '.join(stages)}")
+    print(f"{scans} route(s) still scan the whole collection.")
+
+
+if __name__ == "__main__":
+    main()
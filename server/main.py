@@ -1,87 +1,139 @@
 # server/main.py
-from fastapi import FastAPI, HTTPException, Query
-from data_schema import BasicInfoModel
-from motor.motor_asyncio import AsyncIOMotorClient
-from typing import List, Optional, Dict
-from fastapi.responses import JSONResponse
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Request
+from typing import List, Optional, Dict, Literal
+from fastapi.responses import JSONResponse, ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
-from data_schema import BasicInfoModel, SalaryRecordModel, LocationOverview, PredictionModel
-
-MONGO_URI = "mongodb://localhost:27017"
-DB_NAME   = "team03hw"
-COLL_NAME = "tft_basic_info"
+from data_schema import BasicInfoModel, SalaryRecordModel, LocationOverview, PredictionModel, SalaryStatsModel, SalaryPercentilesModel, DashboardModel, ForecastModel
+from streaming import negotiate_stream, stream_cursor
+from http_cache import DatasetCache
+from pagination import PAGE_LIMIT_DEFAULT, PAGE_LIMIT_MAX, page_response
+from sketches import TDigest
+from storage import make_storage
+from forecast import ForecastService, load_forecast_service
+from metrics import metrics_middleware, render_metrics
+
+# STORAGE_BACKEND=mongo (default) or columnar, see storage.py
+storage = make_storage()
+
+# ETags follow the dataset version stamped by import_data.py
+dataset_cache = DatasetCache(
+    storage,
+    hot_paths=["/avg_salaries", "/tft_predictions", "/records"],
+    skip_paths=["/metrics", "/forecast"],
+)
 
-app = FastAPI(title="TFT Basic Info API")
+# Loaded in lifespan, None when there is no TFT checkpoint (see forecast.py)
+forecast_service: Optional[ForecastService] = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global forecast_service
+    await storage.startup()
+    forecast_service = await asyncio.to_thread(load_forecast_service)
+    version_poller = asyncio.create_task(dataset_cache.poll())
+    yield
+    version_poller.cancel()
+    if forecast_service is not None:
+        forecast_service.close()
+
+app = FastAPI(title="TFT Basic Info API", lifespan=lifespan)
+# registered before CORS so that 304s and cached bodies still get CORS headers
+app.middleware("http")(dataset_cache.middleware)
+# outside the cache, so 304s and cached bodies are measured too
+app.middleware("http")(metrics_middleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # cross-origin clients can only read these if they are exposed
+    expose_headers=["X-Next-Cursor", "Link", "ETag"],
 )
 
-client = AsyncIOMotorClient(MONGO_URI)
-coll   = client[DB_NAME][COLL_NAME]
-salary_coll = client[DB_NAME]["salaries_filtered"]
-predictions_coll = client[DB_NAME]["tft_predictions"]
+# Documents were validated at import time, so read routes get plain dicts with
+# only the schema fields from the storage backend and hand them to orjson
+# instead of rebuilding pydantic models.
+#
+# List routes return one page in storage order; the next page's token is sent in
+# the X-Next-Cursor / Link headers and passed back as ?cursor=
+
+# Request counts, latency/size histograms per route template and Mongo timings
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return render_metrics()
 
 # List all basic info records, with optional limit
 @app.get("/records", response_model=List[BasicInfoModel])
-async def list_all(limit: int = 100):
-    cursor = coll.find({}, limit=limit)
-    return [BasicInfoModel(**doc) async for doc in cursor]
+async def list_all(
+    request: Request,
+    limit: int = Query(100, ge=1, le=PAGE_LIMIT_MAX),
+    cursor: Optional[str] = None,
+):
+    docs, next_cursor = await storage.find_page("basic_info", {}, limit, cursor)
+    return page_response(docs, next_cursor, request)
 
 # List records by dataset name
 @app.get("/records/{dataset}", response_model=List[BasicInfoModel])
-async def list_by_dataset(dataset: str, limit: int = 100):
-    cursor = coll.find({"dataset": dataset}, limit=limit)
-    docs = [BasicInfoModel(**doc) async for doc in cursor]
+async def list_by_dataset(
+    dataset: str,
+    request: Request,
+    limit: int = Query(100, ge=1, le=PAGE_LIMIT_MAX),
+    cursor: Optional[str] = None,
+):
+    docs, next_cursor = await storage.find_page("basic_info", {"dataset": dataset}, limit, cursor)
     if not docs:
         raise HTTPException(404, f"No records in dataset={dataset}")
-    return docs
+    return page_response(docs, next_cursor, request)
 
 # Get a single record by dataset and key
 @app.get("/records/{dataset}/{key}", response_model=BasicInfoModel)
 async def get_single(dataset: str, key: str):
-    doc = await coll.find_one({"dataset": dataset, "key": key})
+    doc = await storage.find_one("basic_info", {"dataset": dataset, "key": key})
     if not doc:
         raise HTTPException(404, "Record not found")
-    return BasicInfoModel(**doc)
+    return ORJSONResponse(doc)
 
 # List salary records, optionally filtered by job title
 @app.get("/salaries", response_model=List[SalaryRecordModel])
 async def list_salaries(
-    limit: int = Query(100, ge=1, le=2000),
+    request: Request,
+    limit: int = Query(100, ge=1, le=PAGE_LIMIT_MAX),
     job_title: Optional[str] = None,
+    cursor: Optional[str] = None,
 ):
     query  = {"job_title": job_title} if job_title else {}
-    cursor = salary_coll.find(query, limit=limit)
-    return [SalaryRecordModel(**doc) async for doc in cursor]
+    docs, next_cursor = await storage.find_page("salaries", query, limit, cursor)
+    return page_response(docs, next_cursor, request)
 
 # List salaries for a specific job title
 @app.get("/salaries/{job_title}", response_model=List[SalaryRecordModel])
 async def list_salaries_by_title(
-    job_title: str
+    job_title: str,
+    request: Request,
+    limit: int = Query(PAGE_LIMIT_DEFAULT, ge=1, le=PAGE_LIMIT_MAX),
+    cursor: Optional[str] = None,
 ):
-    cursor = salary_coll.find({"job_title": job_title})
-    docs   = [SalaryRecordModel(**doc) async for doc in cursor]
+    query = {"job_title": job_title}
+    media_type = negotiate_stream(request)
+    if media_type:
+        return await stream_cursor(
+            storage.stream("salaries", query, cursor),
+            SalaryRecordModel, media_type,
+            f"No salary records for job_title={job_title}",
+        )
+    docs, next_cursor = await storage.find_page("salaries", query, limit, cursor)
     if not docs:
         raise HTTPException(404, f"No salary records for job_title={job_title}")
-    return docs
+    return page_response(docs, next_cursor, request)
 
 # Get counts of each experience level for a given job title
 @app.get("/salaries/{job_title}/experience_levels", response_model=Dict[str, int])
 async def experience_level_stats(job_title: str):
-    pipeline = [
-        {"$match": {"job_title": job_title}},
-        {"$group": {"_id": "$experience_level", "count": {"$sum": 1}}},
-    ]
-    cursor = salary_coll.aggregate(pipeline)
-
-    stats: Dict[str, int] = {}
-    async for doc in cursor:
-        stats[doc["_id"]] = doc["count"]
+    stats = await storage.experience_level_counts(job_title)
 
     if not stats:
         raise HTTPException(404, f"No salary records for job_title={job_title}")
@@ -90,26 +142,77 @@ async def experience_level_stats(job_title: str):
 
 # List salaries by job title and experience level
 @app.get("/salaries/{job_title}/{experience_level}", response_model=List[SalaryRecordModel])
-async def salaries_by_title_level(job_title: str, experience_level: str):
+async def salaries_by_title_level(
+    job_title: str,
+    experience_level: str,
+    request: Request,
+    limit: int = Query(PAGE_LIMIT_DEFAULT, ge=1, le=PAGE_LIMIT_MAX),
+    cursor: Optional[str] = None,
+):
     query = {"job_title": job_title, "experience_level": experience_level}
-    cursor = salary_coll.find(query)
-    docs = [SalaryRecordModel(**doc) async for doc in cursor]
+    media_type = negotiate_stream(request)
+    if media_type:
+        return await stream_cursor(
+            storage.stream("salaries", query, cursor),
+            SalaryRecordModel, media_type,
+            f"No salary records for job_title='{job_title}' & experience_level='{experience_level}'",
+        )
+    docs, next_cursor = await storage.find_page("salaries", query, limit, cursor)
     if not docs:
         raise HTTPException(
             404,
             f"No salary records for job_title='{job_title}' & experience_level='{experience_level}'",
         )
-    return docs
+    return page_response(docs, next_cursor, request)
+
+# Get salary count/median/quartiles/min/max per group for a job title
+@app.get(
+    "/salary_stats/{job_title}",
+    response_model=List[SalaryStatsModel],
+    response_model_exclude_none=True,
+)
+async def salary_stats(
+    job_title: str,
+    group_by: List[Literal["experience_level", "employee_residence", "year"]] = Query([]),
+):
+    stats = await storage.salary_stats(job_title, list(dict.fromkeys(group_by)))
+
+    if not stats:
+        raise HTTPException(404, f"No salary records for job_title={job_title}")
+
+    return stats
+
+# Percentiles of a job title, optionally narrowed by level/residence/year, merged
+# from the per-cell quantile sketches written by import_data.py
+@app.get("/salary_percentiles/{job_title}", response_model=SalaryPercentilesModel)
+async def salary_percentiles(
+    job_title: str,
+    experience_level: Optional[str] = None,
+    employee_residence: Optional[str] = None,
+    year: Optional[int] = None,
+    q: List[float] = Query([0.25, 0.5, 0.75, 0.9]),
+):
+    if any(not 0 <= p <= 1 for p in q):
+        raise HTTPException(400, "Percentiles q must be between 0 and 1")
+
+    filters = {"experience_level": experience_level, "employee_residence": employee_residence, "year": year}
+    sketches = await storage.salary_sketches(job_title, {k: v for k, v in filters.items() if v is not None})
+
+    if not sketches:
+        raise HTTPException(404, f"No salary records for job_title={job_title} with these filters")
+
+    digest = TDigest.merge(sketches)
+    return {
+        "count": digest.count,
+        "min": digest.min,
+        "max": digest.max,
+        "percentiles": {str(p): round(v, 2) for p, v in zip(q, digest.quantile(q))},
+    }
 
 # Get number of records per company location
 @app.get("/salary_location", response_model=LocationOverview)
 async def location_overview():
-    pipeline = [
-        {"$group": {"_id": "$company_location", "count": {"$sum": 1}}},
-        {"$sort":  {"count": -1}},
-    ]
-    cursor = salary_coll.aggregate(pipeline)
-    loc_dict = {doc["_id"]: doc["count"] async for doc in cursor}
+    loc_dict = await storage.location_counts()
 
     if not loc_dict:
         raise HTTPException(404, "No salary records in database.")
@@ -121,76 +224,63 @@ async def location_overview():
 
 # List salaries filtered by company location
 @app.get("/salary_location/{company_location}", response_model=List[SalaryRecordModel])
-async def salaries_by_location(company_location: str):
-    cursor = (
-        salary_coll
-        .find({"company_location": company_location})
-    )
-    docs = [SalaryRecordModel(**doc) async for doc in cursor]
+async def salaries_by_location(
+    company_location: str,
+    request: Request,
+    limit: int = Query(PAGE_LIMIT_DEFAULT, ge=1, le=PAGE_LIMIT_MAX),
+    cursor: Optional[str] = None,
+):
+    query = {"company_location": company_location}
+    media_type = negotiate_stream(request)
+    if media_type:
+        return await stream_cursor(
+            storage.stream("salaries", query, cursor),
+            SalaryRecordModel, media_type,
+            f"No salary records for company_location='{company_location}'",
+        )
+    docs, next_cursor = await storage.find_page("salaries", query, limit, cursor)
     if not docs:
         raise HTTPException(404, f"No salary records for company_location='{company_location}'")
-    return docs
+    return page_response(docs, next_cursor, request)
 
 # List salaries by company location and job title
 @app.get(
     "/salary_location/{company_location}/{job_title}",
     response_model=List[SalaryRecordModel],
 )
-async def salaries_by_location_title(company_location: str, job_title: str):
+async def salaries_by_location_title(
+    company_location: str,
+    job_title: str,
+    request: Request,
+    limit: int = Query(PAGE_LIMIT_DEFAULT, ge=1, le=PAGE_LIMIT_MAX),
+    cursor: Optional[str] = None,
+):
     query = {
         "company_location": company_location,
         "job_title": job_title,
     }
-    cursor = salary_coll.find(query)
-    docs = [SalaryRecordModel(**doc) async for doc in cursor]
+    docs, next_cursor = await storage.find_page("salaries", query, limit, cursor)
     if not docs:
         raise HTTPException(
             404,
             f"No salary records for company_location='{company_location}' & job_title='{job_title}'",
         )
-    return docs
+    return page_response(docs, next_cursor, request)
 
 # Get average salary per job title
 @app.get("/avg_salaries", response_model=Dict[str, float])
 async def average_salary_by_title():
-    pipeline = [
-        {"$group": {
-            "_id": "$job_title",
-            "avg_salary": {"$avg": "$salary_in_usd"}
-        }},
-        {"$sort": {"avg_salary": -1}}
-    ]
-    cursor = salary_coll.aggregate(pipeline)
-
-    result: Dict[str, float] = {}
-    async for doc in cursor:
-        job_title = doc["_id"]
-        avg_salary = round(doc["avg_salary"], 2)
-        result[job_title] = avg_salary
+    result = await storage.avg_salary_by_title()
 
     if not result:
         raise HTTPException(404, "No salary data found.")
-    
+
     return JSONResponse(content=result)
 
 # Get average salary by experience level for a job title
 @app.get("/avg_salaries/{job_title}", response_model=Dict[str, float])
 async def avg_salary_by_experience_level(job_title: str):
-    pipeline = [
-        {"$match": {"job_title": job_title}},
-        {"$group": {
-            "_id": "$experience_level",
-            "avg_salary": {"$avg": "$salary_in_usd"}
-        }},
-        {"$sort": {"avg_salary": -1}}
-    ]
-    cursor = salary_coll.aggregate(pipeline)
-
-    result: Dict[str, float] = {}
-    async for doc in cursor:
-        level = doc["_id"]
-        avg_salary = round(doc["avg_salary"], 2)
-        result[level] = avg_salary
+    result = await storage.avg_salary_by_level(job_title)
 
     if not result:
         raise HTTPException(404, f"No salary data for job_title='{job_title}'")
@@ -202,19 +292,27 @@ async def avg_salary_by_experience_level(job_title: str):
     "/tft_predictions",
     response_model=List[PredictionModel],
 )
-async def get_all_tft_predictions():
-    cursor = predictions_coll.find({})
-    
-    docs: List[PredictionModel] = []
-    async for doc in cursor:
-        docs.append(PredictionModel(**doc))
+async def get_all_tft_predictions(
+    request: Request,
+    limit: int = Query(PAGE_LIMIT_DEFAULT, ge=1, le=PAGE_LIMIT_MAX),
+    cursor: Optional[str] = None,
+):
+    media_type = negotiate_stream(request)
+    if media_type:
+        return await stream_cursor(
+            storage.stream("predictions", {}, cursor),
+            PredictionModel, media_type,
+            "No prediction records found in 'tft_predictions'.",
+        )
+
+    docs, next_cursor = await storage.find_page("predictions", {}, limit, cursor)
 
     if not docs:
         raise HTTPException(
             status_code=404,
             detail="No prediction records found in 'tft_predictions'.",
         )
-    return docs
+    return page_response(docs, next_cursor, request)
 
 
 # Get average salary by year and experience level for a job title (excluding 2025)
@@ -223,41 +321,8 @@ async def get_all_tft_predictions():
     response_model=Dict[int, Dict[str, float]],
 )
 async def avg_salary_by_year(job_title: str):
-    pipeline = [
-        {
-            "$match": {
-                "job_title": job_title,
-                "year": {"$ne": 2025} 
-            }
-        },
-        {
-            "$group": {
-                "_id": {
-                    "year": "$year",
-                    "level": "$experience_level"
-                },
-                "avg_salary": {"$avg": "$salary_in_usd"}
-            }
-        },
-        {
-            "$sort": {
-                "_id.year": 1,
-                "_id.level": 1
-            }
-        }
-    ]
-    cursor = salary_coll.aggregate(pipeline)
-
-
-    temp: Dict[int, Dict[str, float]] = {}
-    async for doc in cursor:
-        year = doc["_id"]["year"]                 
-        level = doc["_id"]["level"]                
-        avg_usd = round(doc["avg_salary"], 2)     
-
-        if year not in temp:
-            temp[year] = {}
-        temp[year][level] = avg_usd
+    by_title = await storage.avg_salary_by_year([job_title])
+    temp = by_title.get(job_title, {})
 
     if not temp:
         raise HTTPException(
@@ -266,3 +331,66 @@ async def avg_salary_by_year(job_title: str):
         )
     return temp
 
+
+# TFT forecast for one series and year, computed online from the checkpoint;
+# concurrent requests share one batched forward pass
+@app.get("/forecast", response_model=ForecastModel)
+async def forecast(
+    job_title: str,
+    experience_level: Literal["Entry", "Mid", "Senior", "Executive"],
+    year: int,
+):
+    if forecast_service is None:
+        raise HTTPException(503, "No TFT checkpoint loaded, run src/main.py first")
+    try:
+        result = await forecast_service.forecast(job_title, experience_level, year)
+    except LookupError as e:
+        raise HTTPException(404, str(e))
+    except ValueError as e:
+        raise HTTPException(422, str(e))
+    return ORJSONResponse(result)
+
+
+# Everything the dashboard shows for a selected job title, in one response;
+# the storage queries run concurrently
+@app.get("/dashboard/{job_title}", response_model=DashboardModel)
+async def dashboard(job_title: str):
+    level_averages, trend, level_residence, residence, (predictions, _) = await asyncio.gather(
+        storage.avg_salary_by_level(job_title),
+        storage.avg_salary_by_year([job_title]),
+        storage.salary_stats(job_title, ["experience_level", "employee_residence"]),
+        storage.salary_stats(job_title, ["employee_residence"]),
+        storage.find_page("predictions", {"job_title": job_title}, PAGE_LIMIT_MAX, None),
+    )
+
+    if not level_averages:
+        raise HTTPException(404, f"No salary data for job_title='{job_title}'")
+
+    level_residence_medians: Dict[str, Dict[str, float]] = {}
+    for row in level_residence:
+        level_residence_medians.setdefault(row["experience_level"], {})[row["employee_residence"]] = row["median"]
+
+    return {
+        "job_title": job_title,
+        "level_averages": level_averages,
+        "trend": trend.get(job_title, {}),
+        "level_residence_medians": level_residence_medians,
+        "residence_medians": {row["employee_residence"]: row["median"] for row in residence},
+        "predictions": predictions,
+    }
+
+
+# Get average salary by year and experience level for several job titles in one aggregation (excluding 2025)
+@app.get(
+    "/avg_sal_by_year",
+    response_model=Dict[str, Dict[int, Dict[str, float]]],
+)
+async def avg_salary_by_year_batch(job_title: List[str] = Query([])):
+    temp = await storage.avg_salary_by_year(job_title)
+
+    if not temp:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No salary data found for job_title={job_title or 'any'}"
+        )
+    return temp
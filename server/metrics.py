@@ -0,0 +1,170 @@
+# server/metrics.py
+# Request and database metrics, exposed on /metrics in the Prometheus text format.
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import Request
+from fastapi.responses import PlainTextResponse
+from starlette.routing import Match
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS    = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+BATCH_BUCKETS   = (1, 2, 4, 8, 16, 32, 64, 128)
+FILL_BUCKETS    = (0.05, 0.1, 0.25, 0.5, 0.75, 1.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self.values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = tuple(sorted(labels.items()))
+        self.values[key] = self.values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_format_labels(labels)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float]):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        # labels -> (per-bucket counts incl. +Inf, sum)
+        self.values: Dict[Labels, Tuple[List[int], float]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(sorted(labels.items()))
+        counts, total = self.values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+        counts[bisect_left(self.buckets, value)] += 1
+        self.values[key] = (counts, total + value)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f"{self.name}_bucket{_format_labels(labels, ('le', le))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {total:g}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+requests_total  = Counter("http_requests_total", "HTTP requests by route template and status.")
+request_seconds = Histogram("http_request_duration_seconds", "Time until the last body byte was sent.", LATENCY_BUCKETS)
+response_bytes  = Histogram("http_response_size_bytes", "Response body size.", SIZE_BUCKETS)
+request_db_seconds = Histogram("http_request_db_seconds", "Database time spent inside one request.", LATENCY_BUCKETS)
+db_seconds      = Histogram("db_operation_duration_seconds", "Time spent waiting on Mongo find/aggregate.", LATENCY_BUCKETS)
+db_documents    = Counter("db_documents_returned_total", "Documents returned by Mongo find/aggregate.")
+forecast_seconds    = Histogram("forecast_request_seconds", "Time to answer one /forecast request, by cache hit/miss.", LATENCY_BUCKETS)
+forecast_cache      = Counter("forecast_cache_total", "/forecast requests by cache hit/miss.")
+forecast_batch_size = Histogram("forecast_batch_size", "Distinct forecasts computed by one batched forward pass.", BATCH_BUCKETS)
+forecast_batch_fill = Histogram("forecast_batch_fill_ratio", "Batch size over the maximum batch size.", FILL_BUCKETS)
+
+ALL_METRICS = (requests_total, request_seconds, response_bytes, request_db_seconds, db_seconds, db_documents,
+               forecast_seconds, forecast_cache, forecast_batch_size, forecast_batch_fill)
+
+# Database seconds of the current request, shared with the task running the route
+_request_db: ContextVar[Optional[List[float]]] = ContextVar("request_db", default=None)
+
+
+class DbTimer:
+    def __init__(self):
+        self.documents = 0
+
+
+# Time one database call; set .documents on the yielded timer to count results
+@contextmanager
+def db_timer(operation: str, collection: str):
+    timer = DbTimer()
+    start = time.perf_counter()
+    try:
+        yield timer
+    finally:
+        elapsed = time.perf_counter() - start
+        db_seconds.observe(elapsed, operation=operation, collection=collection)
+        db_documents.inc(timer.documents, operation=operation, collection=collection)
+        request_db = _request_db.get()
+        if request_db is not None:
+            request_db[0] += elapsed
+
+
+# Time only the awaits on the cursor, not what the consumer does between documents
+async def timed_cursor(cursor, operation: str, collection: str) -> AsyncIterator[dict]:
+    waited = 0.0
+    documents = 0
+    try:
+        while True:
+            start = time.perf_counter()
+            doc = await anext(cursor, None)
+            waited += time.perf_counter() - start
+            if doc is None:
+                break
+            documents += 1
+            yield doc
+    finally:
+        db_seconds.observe(waited, operation=operation, collection=collection)
+        db_documents.inc(documents, operation=operation, collection=collection)
+        request_db = _request_db.get()
+        if request_db is not None:
+            request_db[0] += waited
+
+
+def _route_template(request: Request) -> str:
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return getattr(route, "path", request.url.path)
+    return "unmatched"
+
+
+async def metrics_middleware(request: Request, call_next):
+    start = time.perf_counter()
+    request_db = [0.0]
+    _request_db.set(request_db)
+    response = await call_next(request)
+    route = _route_template(request)
+    method = request.method
+    status = str(response.status_code)
+    body_iterator = response.body_iterator
+
+    # record once the body has gone out, so streamed responses count in full
+    async def counted_body():
+        size = 0
+        try:
+            async for chunk in body_iterator:
+                size += len(chunk)
+                yield chunk
+        finally:
+            requests_total.inc(method=method, route=route, status=status)
+            request_seconds.observe(time.perf_counter() - start, method=method, route=route)
+            response_bytes.observe(size, method=method, route=route)
+            request_db_seconds.observe(request_db[0], method=method, route=route)
+
+    response.body_iterator = counted_body()
+    return response
+
+
+def render_metrics() -> PlainTextResponse:
+    lines = [line for metric in ALL_METRICS for line in metric.render()]
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
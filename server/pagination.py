@@ -0,0 +1,33 @@
+# server/pagination.py
+import base64
+from typing import Dict, List, Optional
+
+import orjson
+from fastapi import HTTPException, Request
+from fastapi.responses import ORJSONResponse
+
+PAGE_LIMIT_DEFAULT = 1000
+PAGE_LIMIT_MAX     = 5000
+
+
+# Tokens wrap the storage backend's sort key of the last row served (a Mongo
+# _id, or a row position in the columnar snapshot)
+def encode_cursor(after: str) -> str:
+    return base64.urlsafe_b64encode(orjson.dumps({"after": after})).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> str:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        return str(orjson.loads(base64.urlsafe_b64decode(padded))["after"])
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(400, f"Invalid cursor '{token}'")
+
+
+# The body stays a plain list; the next page is advertised in the headers
+def page_response(docs: List[Dict], next_cursor: Optional[str], request: Request) -> ORJSONResponse:
+    headers = {}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+        headers["Link"] = f'<{request.url.include_query_params(cursor=next_cursor)}>; rel="next"'
+    return ORJSONResponse(docs, headers=headers)
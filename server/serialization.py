@@ -0,0 +1,15 @@
+# server/serialization.py
+from typing import Dict, Type
+
+import orjson
+from pydantic import BaseModel
+
+
+# Mongo projection that returns only the model's fields and drops _id
+def schema_projection(model: Type[BaseModel]) -> Dict[str, int]:
+    return {"_id": 0, **{name: 1 for name in model.model_fields}}
+
+
+# Encode an already validated document as one NDJSON line
+def ndjson_line(doc: dict) -> bytes:
+    return orjson.dumps(doc, option=orjson.OPT_APPEND_NEWLINE)
@@ -0,0 +1,110 @@
+# server/sketches.py
+# Mergeable t-digest quantile sketches, one per (job_title, experience_level,
+# employee_residence, year) cell. import_data.py stores them serialized; the API
+# merges any subset of cells to answer percentile queries without the raw rows.
+import struct
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+SKETCH_COLL = "salary_sketches"
+SKETCH_CELL = ["job_title", "experience_level", "employee_residence", "year"]
+COMPRESSION = 500
+
+_HEADER = struct.Struct("<dd")  # min, max
+
+
+class TDigest:
+    def __init__(self, means: np.ndarray, weights: np.ndarray, min_value: float, max_value: float):
+        self.means = means
+        self.weights = weights
+        self.min = min_value
+        self.max = max_value
+
+    @property
+    def count(self) -> int:
+        return int(self.weights.sum())
+
+    @classmethod
+    def from_values(cls, values: Iterable[float], compression: int = COMPRESSION) -> "TDigest":
+        values = np.sort(np.asarray(values, dtype=np.float64))
+        return cls._compress(values, np.ones(len(values)), values[0], values[-1], compression)
+
+    @classmethod
+    def merge(cls, digests: Sequence["TDigest"], compression: int = COMPRESSION) -> "TDigest":
+        means = np.concatenate([d.means for d in digests])
+        weights = np.concatenate([d.weights for d in digests])
+        order = np.argsort(means, kind="stable")
+        return cls._compress(
+            means[order], weights[order],
+            min(d.min for d in digests), max(d.max for d in digests), compression,
+        )
+
+    # Centroids whose midpoints fall in the same unit of the k1 scale function
+    # k(q) = compression / 2pi * asin(2q - 1) are merged, so clusters stay small
+    # near the tails and at most ~compression / 2 remain
+    @classmethod
+    def _compress(cls, means: np.ndarray, weights: np.ndarray, min_value: float, max_value: float,
+                  compression: int) -> "TDigest":
+        total = weights.sum()
+        q = (np.cumsum(weights) - weights / 2) / total
+        k = np.floor(compression / (2 * np.pi) * np.arcsin(2 * q - 1))
+        starts = np.flatnonzero(np.r_[True, k[1:] != k[:-1]])
+        merged_weights = np.add.reduceat(weights, starts)
+        merged_means = np.add.reduceat(means * weights, starts) / merged_weights
+        return cls(merged_means, merged_weights, float(min_value), float(max_value))
+
+    def quantile(self, qs: Sequence[float]) -> List[float]:
+        centers = np.cumsum(self.weights) - self.weights / 2
+        positions = np.r_[0.0, centers, self.weights.sum()]
+        values = np.r_[self.min, self.means, self.max]
+        return [float(v) for v in np.interp(np.asarray(qs) * positions[-1], positions, values)]
+
+    # min, max, then float64 means and uint32 weights: 12 bytes per centroid
+    def to_bytes(self) -> bytes:
+        return (
+            _HEADER.pack(self.min, self.max)
+            + self.means.astype("<f8").tobytes()
+            + self.weights.astype("<u4").tobytes()
+        )
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "TDigest":
+        min_value, max_value = _HEADER.unpack_from(data)
+        n = (len(data) - _HEADER.size) // 12
+        means = np.frombuffer(data, dtype="<f8", count=n, offset=_HEADER.size)
+        weights = np.frombuffer(data, dtype="<u4", count=n, offset=_HEADER.size + 8 * n).astype(np.float64)
+        return cls(means, weights, min_value, max_value)
+
+
+# Running per-cell counts, sums and digests; chunks can be added one at a time
+class SketchCells:
+    def __init__(self, compression: int = COMPRESSION):
+        self.compression = compression
+        self.cells: Dict[Tuple, List] = {}  # cell key -> [count, sum, digests not merged yet]
+
+    def add(self, salaries: pd.DataFrame):
+        for key, values in salaries.groupby(SKETCH_CELL, observed=True)["salary_in_usd"]:
+            digest = TDigest.from_values(values, self.compression)
+            cell = self.cells.setdefault(key, [0, 0, []])
+            cell[0] += len(values)
+            cell[1] += int(values.sum())
+            cell[2].append(digest)
+            # merge in batches, one merge per chunk would dominate the import
+            if len(cell[2]) >= 32:
+                cell[2] = [TDigest.merge(cell[2], self.compression)]
+
+    def frame(self) -> pd.DataFrame:
+        rows = [
+            {**dict(zip(SKETCH_CELL, key)), "count": count, "sum": total,
+             "sketch": TDigest.merge(digests, self.compression).to_bytes()}
+            for key, (count, total, digests) in sorted(self.cells.items())
+        ]
+        return pd.DataFrame(rows, columns=SKETCH_CELL + ["count", "sum", "sketch"])
+
+
+def build_sketches(salaries: pd.DataFrame, compression: int = COMPRESSION) -> pd.DataFrame:
+    cells = SketchCells(compression)
+    cells.add(salaries)
+    return cells.frame()
@@ -0,0 +1,58 @@
+# server/snapshot.py
+# Parquet snapshot of the imported collections, read by the columnar storage backend.
+import json
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+SNAPSHOT_DIR = Path(__file__).parent.parent / "snapshot"
+
+# snapshot table -> mongo collection
+TABLES = {
+    "basic_info":  "tft_basic_info",
+    "salaries":    "salaries_filtered",
+    "predictions": "tft_predictions",
+}
+
+
+def write_tables(tables: Dict[str, pd.DataFrame], version: str, snapshot_dir: Path = SNAPSHOT_DIR):
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+    for table, df in tables.items():
+        if table == "basic_info" and not df.empty:
+            # keys are a mix of ints (attention steps) and strings, parquet wants one type
+            df = df.assign(
+                key_is_int=df["key"].map(lambda k: isinstance(k, (int, np.integer))),
+                key=df["key"].astype(str),
+            )
+        df.to_parquet(snapshot_dir / f"{table}.parquet", index=False)
+    # written last, so readers only see the new version once every table is there
+    (snapshot_dir / "meta.json").write_text(json.dumps({"version": version}))
+
+
+# tables limits the dump to those tables, e.g. when salaries.parquet was streamed
+def write_snapshot(db, version: str, snapshot_dir: Path = SNAPSHOT_DIR, tables: Optional[List[str]] = None):
+    tables = {
+        table: pd.DataFrame(list(db[TABLES[table]].find({}, {"_id": 0, "row_hash": 0})))
+        for table in (tables or TABLES)
+    }
+    write_tables(tables, version, snapshot_dir)
+
+
+def read_version(snapshot_dir: Path = SNAPSHOT_DIR) -> Optional[str]:
+    meta = snapshot_dir / "meta.json"
+    if not meta.exists():
+        return None
+    return json.loads(meta.read_text())["version"]
+
+
+# String columns come back dictionary-encoded (pandas categoricals)
+def read_tables(snapshot_dir: Path = SNAPSHOT_DIR) -> Dict[str, pd.DataFrame]:
+    tables = {}
+    for table in TABLES:
+        df = pd.read_parquet(snapshot_dir / f"{table}.parquet", memory_map=True)
+        for col in df.select_dtypes(include="object").columns:
+            df[col] = df[col].astype("category")
+        tables[table] = df
+    return tables
@@ -0,0 +1,373 @@
+# server/storage.py
+# Storage backends behind the API routes: MongoDB through Motor, or an in-process
+# columnar copy of the snapshot written by import_data.py.
+import os
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from aggregates import LOCATION_COUNTS
+from data_schema import BasicInfoModel, PredictionModel, SalaryRecordModel
+from indexes import ensure_indexes_async
+from metrics import db_timer, timed_cursor
+from pagination import decode_cursor, encode_cursor
+from serialization import schema_projection
+from sketches import SKETCH_COLL, TDigest, build_sketches
+import snapshot
+
+MONGO_URI = "mongodb://localhost:27017"
+DB_NAME   = "team03hw"
+META_COLL_NAME = "dataset_meta"
+
+# table -> schema model; documents are served with exactly these fields
+MODELS = {
+    "basic_info":  BasicInfoModel,
+    "salaries":    SalaryRecordModel,
+    "predictions": PredictionModel,
+}
+
+Page = Tuple[List[Dict], Optional[str]]
+
+
+class Storage(ABC):
+    async def startup(self):
+        pass
+
+    @abstractmethod
+    async def dataset_version(self) -> Optional[str]: ...
+
+    # Equality filter, one page in storage order, plus the next page's cursor token
+    @abstractmethod
+    async def find_page(self, table: str, query: Dict, limit: int, cursor: Optional[str]) -> Page: ...
+
+    @abstractmethod
+    async def find_one(self, table: str, query: Dict) -> Optional[Dict]: ...
+
+    # Every matching document after the cursor, without a limit
+    @abstractmethod
+    def stream(self, table: str, query: Dict, cursor: Optional[str]) -> AsyncIterator[Dict]: ...
+
+    @abstractmethod
+    async def experience_level_counts(self, job_title: str) -> Dict[str, int]: ...
+
+    @abstractmethod
+    async def location_counts(self) -> Dict[str, int]: ...
+
+    @abstractmethod
+    async def avg_salary_by_title(self) -> Dict[str, float]: ...
+
+    @abstractmethod
+    async def avg_salary_by_level(self, job_title: str) -> Dict[str, float]: ...
+
+    # {job_title: {year: {experience_level: avg}}} excluding 2025, all titles if none given
+    @abstractmethod
+    async def avg_salary_by_year(self, job_titles: List[str]) -> Dict[str, Dict[int, Dict[str, float]]]: ...
+
+    @abstractmethod
+    async def salary_stats(self, job_title: str, group_by: List[str]) -> List[Dict]: ...
+
+    # Quantile sketches of every (job_title, experience_level, employee_residence, year)
+    # cell matching the filters
+    @abstractmethod
+    async def salary_sketches(self, job_title: str, filters: Dict) -> List[TDigest]: ...
+
+
+class MongoStorage(Storage):
+    COLLECTIONS = {
+        "basic_info":  "tft_basic_info",
+        "salaries":    "salaries_filtered",
+        "predictions": "tft_predictions",
+    }
+
+    def __init__(self, uri: str = MONGO_URI, db_name: str = DB_NAME):
+        self.client = AsyncIOMotorClient(uri)
+        self.db = self.client[db_name]
+        self.projections = {table: schema_projection(model) for table, model in MODELS.items()}
+
+    def coll(self, table: str):
+        return self.db[self.COLLECTIONS[table]]
+
+    def _aggregate(self, table: str, pipeline: List[Dict]) -> AsyncIterator[Dict]:
+        return timed_cursor(self.coll(table).aggregate(pipeline), "aggregate", self.COLLECTIONS[table])
+
+    async def startup(self):
+        try:
+            await ensure_indexes_async(self.db)
+        except Exception as exc:
+            print(f"Warning: could not create indexes: {exc}")
+
+    async def dataset_version(self) -> Optional[str]:
+        doc = await self.db[META_COLL_NAME].find_one({"_id": "dataset"})
+        return doc["version"] if doc else None
+
+    # Add the keyset condition so the scan starts right after the previous page
+    def _after(self, query: Dict, cursor: Optional[str]) -> Dict:
+        if not cursor:
+            return query
+        try:
+            after = ObjectId(decode_cursor(cursor))
+        except InvalidId:
+            raise HTTPException(400, f"Invalid cursor '{cursor}'")
+        return {**query, "_id": {"$gt": after}}
+
+    async def find_page(self, table: str, query: Dict, limit: int, cursor: Optional[str]) -> Page:
+        find = (
+            self.coll(table)
+            .find(self._after(query, cursor), {**self.projections[table], "_id": 1})
+            .sort("_id", 1)
+            .limit(limit + 1)
+        )
+        with db_timer("find", self.COLLECTIONS[table]) as timer:
+            docs = await find.to_list(None)
+            timer.documents = len(docs)
+        next_cursor = encode_cursor(str(docs[limit - 1]["_id"])) if len(docs) > limit else None
+        docs = docs[:limit]
+        for doc in docs:
+            del doc["_id"]
+        return docs, next_cursor
+
+    async def find_one(self, table: str, query: Dict) -> Optional[Dict]:
+        with db_timer("find_one", self.COLLECTIONS[table]) as timer:
+            doc = await self.coll(table).find_one(query, self.projections[table])
+            timer.documents = int(doc is not None)
+        return doc
+
+    def stream(self, table: str, query: Dict, cursor: Optional[str]) -> AsyncIterator[Dict]:
+        find = self.coll(table).find(self._after(query, cursor), self.projections[table]).sort("_id", 1)
+        return timed_cursor(find, "find", self.COLLECTIONS[table])
+
+    # The average/count routes read the collections pre-aggregated by import_data.py
+    async def _find_aggregate(self, coll_name: str, query: Dict, sort: List[Tuple[str, int]]) -> List[Dict]:
+        with db_timer("find", coll_name) as timer:
+            docs = await self.db[coll_name].find(query, {"_id": 0}).sort(sort).to_list(None)
+            timer.documents = len(docs)
+        return docs
+
+    async def experience_level_counts(self, job_title: str) -> Dict[str, int]:
+        docs = await self._find_aggregate(
+            "agg_salary_by_title_level", {"job_title": job_title}, [("experience_level", 1)]
+        )
+        return {doc["experience_level"]: doc["count"] for doc in docs}
+
+    async def location_counts(self) -> Dict[str, int]:
+        docs = await self._find_aggregate(LOCATION_COUNTS, {}, [("count", -1)])
+        return {doc["company_location"]: doc["count"] for doc in docs}
+
+    async def avg_salary_by_title(self) -> Dict[str, float]:
+        docs = await self._find_aggregate("agg_salary_by_title", {}, [("mean", -1)])
+        return {doc["job_title"]: round(doc["mean"], 2) for doc in docs}
+
+    async def avg_salary_by_level(self, job_title: str) -> Dict[str, float]:
+        docs = await self._find_aggregate(
+            "agg_salary_by_title_level", {"job_title": job_title}, [("mean", -1)]
+        )
+        return {doc["experience_level"]: round(doc["mean"], 2) for doc in docs}
+
+    async def avg_salary_by_year(self, job_titles: List[str]) -> Dict[str, Dict[int, Dict[str, float]]]:
+        query = {"year": {"$ne": 2025}}
+        if job_titles:
+            query["job_title"] = {"$in": job_titles}
+        docs = await self._find_aggregate(
+            "agg_salary_by_title_year_level", query,
+            [("job_title", 1), ("year", 1), ("experience_level", 1)],
+        )
+
+        temp: Dict[str, Dict[int, Dict[str, float]]] = {}
+        for doc in docs:
+            temp.setdefault(doc["job_title"], {}).setdefault(doc["year"], {})[doc["experience_level"]] = round(doc["mean"], 2)
+        return temp
+
+    async def salary_stats(self, job_title: str, group_by: List[str]) -> List[Dict]:
+        pipeline = [
+            {"$match": {"job_title": job_title}},
+            {"$group": {
+                "_id": {field: f"${field}" for field in group_by} or None,
+                "count": {"$sum": 1},
+                "min": {"$min": "$salary_in_usd"},
+                "max": {"$max": "$salary_in_usd"},
+                "salaries": {"$push": "$salary_in_usd"},
+            }},
+            {"$sort": {f"_id.{field}": 1 for field in group_by} or {"count": -1}},
+        ]
+        cursor = self._aggregate("salaries", pipeline)
+
+        stats: List[Dict] = []
+        async for doc in cursor:
+            p25, median, p75 = np.percentile(np.asarray(doc["salaries"]), [25, 50, 75])
+            stats.append({
+                **(doc["_id"] or {}),
+                "count": doc["count"],
+                "median": float(median),
+                "p25": float(p25),
+                "p75": float(p75),
+                "min": doc["min"],
+                "max": doc["max"],
+            })
+        return stats
+
+    async def salary_sketches(self, job_title: str, filters: Dict) -> List[TDigest]:
+        with db_timer("find", SKETCH_COLL) as timer:
+            docs = await self.db[SKETCH_COLL].find(
+                {"job_title": job_title, **filters}, {"_id": 0, "sketch": 1}
+            ).to_list(None)
+            timer.documents = len(docs)
+        return [TDigest.from_bytes(doc["sketch"]) for doc in docs]
+
+
+# Whole dataset held in memory as pandas columns; strings are categoricals so
+# filters compare integer codes and group-bys run on the codes
+class ColumnarStorage(Storage):
+    def __init__(self, snapshot_dir: Path = snapshot.SNAPSHOT_DIR):
+        self.snapshot_dir = Path(snapshot_dir)
+        self.version: Optional[str] = None
+        self.tables: Dict[str, pd.DataFrame] = {}
+        self.sketches: Optional[pd.DataFrame] = None
+
+    def load(self):
+        version = snapshot.read_version(self.snapshot_dir)
+        if version is None:
+            raise FileNotFoundError(f"No snapshot in {self.snapshot_dir}, run import_data.py first")
+        self.tables = snapshot.read_tables(self.snapshot_dir)
+        # same cells import_data.py writes to Mongo, kept deserialized
+        sketches = build_sketches(self.tables["salaries"])
+        sketches["sketch"] = [TDigest.from_bytes(s) for s in sketches["sketch"]]
+        self.sketches = sketches
+        self.version = version
+
+    async def startup(self):
+        self.load()
+
+    # Reload when import_data.py wrote a newer snapshot
+    async def dataset_version(self) -> Optional[str]:
+        if snapshot.read_version(self.snapshot_dir) != self.version:
+            self.load()
+        return self.version
+
+    def _mask(self, df: pd.DataFrame, query: Dict) -> np.ndarray:
+        mask = np.ones(len(df), dtype=bool)
+        for field, value in query.items():
+            if field not in df.columns:
+                return np.zeros(len(df), dtype=bool)
+            col = df[field]
+            if isinstance(col.dtype, pd.CategoricalDtype):
+                code = col.cat.categories.get_indexer([value])[0]
+                mask &= col.cat.codes.to_numpy() == code if code >= 0 else False
+            else:
+                mask &= col.to_numpy() == value
+        return mask
+
+    def _rows(self, table: str, positions: np.ndarray) -> List[Dict]:
+        df = self.tables[table]
+        fields = list(MODELS[table].model_fields)
+        rows = df.iloc[positions][fields].to_dict("records")
+        if table == "basic_info":
+            for row, is_int in zip(rows, df["key_is_int"].to_numpy()[positions]):
+                if is_int:
+                    row["key"] = int(row["key"])
+        return rows
+
+    def _positions(self, table: str, query: Dict, cursor: Optional[str]) -> np.ndarray:
+        positions = np.flatnonzero(self._mask(self.tables[table], query))
+        if cursor:
+            try:
+                after = int(decode_cursor(cursor))
+            except ValueError:
+                raise HTTPException(400, f"Invalid cursor '{cursor}'")
+            positions = positions[positions > after]
+        return positions
+
+    async def find_page(self, table: str, query: Dict, limit: int, cursor: Optional[str]) -> Page:
+        positions = self._positions(table, query, cursor)
+        next_cursor = encode_cursor(str(positions[limit - 1])) if len(positions) > limit else None
+        return self._rows(table, positions[:limit]), next_cursor
+
+    async def find_one(self, table: str, query: Dict) -> Optional[Dict]:
+        positions = self._positions(table, query, None)
+        return self._rows(table, positions[:1])[0] if len(positions) else None
+
+    async def stream(self, table: str, query: Dict, cursor: Optional[str]) -> AsyncIterator[Dict]:
+        positions = self._positions(table, query, cursor)
+        for start in range(0, len(positions), 1000):
+            for row in self._rows(table, positions[start:start + 1000]):
+                yield row
+
+    def _salaries(self, query: Dict) -> pd.DataFrame:
+        df = self.tables["salaries"]
+        return df[self._mask(df, query)]
+
+    async def experience_level_counts(self, job_title: str) -> Dict[str, int]:
+        counts = self._salaries({"job_title": job_title}).groupby("experience_level", observed=True).size()
+        return {level: int(n) for level, n in counts.items()}
+
+    async def location_counts(self) -> Dict[str, int]:
+        df = self.tables["salaries"]
+        if "company_location" not in df.columns:
+            return {}
+        counts = df.groupby("company_location", observed=True).size().sort_values(ascending=False)
+        return {loc: int(n) for loc, n in counts.items()}
+
+    async def avg_salary_by_title(self) -> Dict[str, float]:
+        avg = self.tables["salaries"].groupby("job_title", observed=True)["salary_in_usd"].mean()
+        return {title: round(float(v), 2) for title, v in avg.sort_values(ascending=False).items()}
+
+    async def avg_salary_by_level(self, job_title: str) -> Dict[str, float]:
+        df = self._salaries({"job_title": job_title})
+        avg = df.groupby("experience_level", observed=True)["salary_in_usd"].mean()
+        return {level: round(float(v), 2) for level, v in avg.sort_values(ascending=False).items()}
+
+    async def avg_salary_by_year(self, job_titles: List[str]) -> Dict[str, Dict[int, Dict[str, float]]]:
+        df = self.tables["salaries"]
+        mask = df["year"].to_numpy() != 2025
+        if job_titles:
+            mask &= df["job_title"].isin(job_titles).to_numpy()
+        avg = (
+            df[mask]
+            .groupby(["job_title", "year", "experience_level"], observed=True)["salary_in_usd"]
+            .mean()
+            .sort_index()
+        )
+        temp: Dict[str, Dict[int, Dict[str, float]]] = {}
+        for (title, year, level), v in avg.items():
+            temp.setdefault(title, {}).setdefault(int(year), {})[level] = round(float(v), 2)
+        return temp
+
+    async def salary_stats(self, job_title: str, group_by: List[str]) -> List[Dict]:
+        df = self._salaries({"job_title": job_title})
+        if df.empty:
+            return []
+        salaries = df["salary_in_usd"]
+        if not group_by:
+            groups = salaries.groupby(np.zeros(len(df), dtype=int))
+        else:
+            groups = salaries.groupby([df[field] for field in group_by], observed=True)
+        stats = pd.DataFrame({
+            "count": groups.size(),
+            "median": groups.median(),
+            "p25": groups.quantile(0.25),
+            "p75": groups.quantile(0.75),
+            "min": groups.min(),
+            "max": groups.max(),
+        }).sort_index()
+        if group_by:
+            stats = stats.reset_index()
+        return stats.to_dict("records")
+
+    async def salary_sketches(self, job_title: str, filters: Dict) -> List[TDigest]:
+        mask = self._mask(self.sketches, {"job_title": job_title, **filters})
+        return list(self.sketches["sketch"].to_numpy()[mask])
+
+
+def make_storage() -> Storage:
+    backend = os.environ.get("STORAGE_BACKEND", "mongo")
+    if backend == "mongo":
+        return MongoStorage(os.environ.get("MONGO_URI", MONGO_URI), os.environ.get("MONGO_DB", DB_NAME))
+    if backend == "columnar":
+        return ColumnarStorage(os.environ.get("SNAPSHOT_DIR", snapshot.SNAPSHOT_DIR))
+    raise ValueError(f"Unknown STORAGE_BACKEND={backend!r}, expected 'mongo' or 'columnar'")
@@ -0,0 +1,100 @@
+# server/stream_import.py
+# Chunked salary import for dumps too big to load at once: read the CSV in chunks,
+# filter and map each chunk with vectorized pandas, and keep several unordered
+# bulk_write calls in flight. Memory stays bounded by chunk_size * in_flight.
+# Writes go to the collection passed in, normally a fresh staging collection.
+import resource
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pymongo import InsertOne
+
+from collection_swap import HASH_FIELD, row_hashes
+from data_schema import SalaryRecordModel
+from frame_validation import check_frame
+from sketches import SketchCells
+
+LEVELS = {"EN": "Entry", "MI": "Mid", "SE": "Senior", "EX": "Executive"}
+COLUMNS = ["job_title", "experience_level", "salary_in_usd", "employee_residence", "year", "company_location"]
+FIELDS = COLUMNS + [HASH_FIELD]
+SALARIES_SCHEMA = pa.schema([
+    ("job_title", pa.string()),
+    ("experience_level", pa.string()),
+    ("salary_in_usd", pa.int64()),
+    ("employee_residence", pa.string()),
+    ("year", pa.int64()),
+    ("company_location", pa.string()),
+])
+
+
+def read_chunks(csv_path: Path, titles, chunk_size: int):
+    reader = pd.read_csv(
+        csv_path,
+        usecols=["work_year", "experience_level", "job_title", "salary_in_usd", "employee_residence",
+                 "company_location"],
+        dtype={"experience_level": "category", "job_title": "category", "employee_residence": "category",
+               "company_location": "category"},
+        chunksize=chunk_size,
+    )
+    for chunk in reader:
+        chunk = chunk[chunk["job_title"].isin(titles)].rename(columns={"work_year": "year"})
+        chunk["experience_level"] = chunk["experience_level"].map(LEVELS)
+        yield check_frame(chunk, SalaryRecordModel)
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def stream_salaries(csv_path: Path, coll, titles, chunk_size: int = 50_000, in_flight: int = 4,
+                    snapshot_path: Optional[Path] = None) -> Dict:
+    cells = SketchCells()
+    locations = pd.Series(dtype="int64")
+    writer = pq.ParquetWriter(snapshot_path, SALARIES_SCHEMA) if snapshot_path else None
+    pending = deque()
+    rows = 0
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=in_flight) as pool:
+        try:
+            for chunk in read_chunks(csv_path, titles, chunk_size):
+                if chunk.empty:
+                    continue
+                # wait for the oldest write once in_flight chunks are queued
+                if len(pending) >= in_flight:
+                    pending.popleft().result()
+                # plain Python columns: building the documents from them is much
+                # cheaper than DataFrame.to_dict
+                columns = {col: chunk[col].tolist() for col in COLUMNS}
+                hashes = row_hashes(chunk, COLUMNS).tolist()
+                requests = [
+                    InsertOne(dict(zip(FIELDS, row))) for row in zip(*columns.values(), hashes)
+                ]
+                pending.append(pool.submit(coll.bulk_write, requests, ordered=False))
+
+                cells.add(chunk)
+                locations = locations.add(chunk.groupby("company_location", observed=True).size(), fill_value=0)
+                if writer:
+                    writer.write_table(pa.Table.from_pydict(columns, schema=SALARIES_SCHEMA))
+                rows += len(chunk)
+            while pending:
+                pending.popleft().result()
+        finally:
+            if writer:
+                writer.close()
+
+    elapsed = time.perf_counter() - start
+    return {
+        "rows": rows,
+        "elapsed_s": elapsed,
+        "rows_per_s": rows / elapsed if elapsed else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+        "cells": cells.frame(),
+        "location_counts": locations.astype("int64").rename_axis("company_location").rename("count").reset_index(),
+    }
@@ -0,0 +1,78 @@
+# server/streaming.py
+import io
+from typing import Optional, Type, get_args
+
+import pyarrow as pa
+from fastapi import HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from serialization import ndjson_line
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+ARROW_MEDIA_TYPE  = "application/vnd.apache.arrow.stream"
+ARROW_BATCH_SIZE  = 1000
+
+
+# Pick a streaming media type from the Accept header, None means plain JSON
+def negotiate_stream(request: Request) -> Optional[str]:
+    accept = request.headers.get("accept", "")
+    for part in accept.split(","):
+        media_type = part.split(";")[0].strip().lower()
+        if media_type in (NDJSON_MEDIA_TYPE, ARROW_MEDIA_TYPE):
+            return media_type
+    return None
+
+
+# Map the flat pydantic fields (str/int/float) to an arrow schema
+def arrow_schema(model: Type[BaseModel]):
+    types = {str: pa.string(), int: pa.int64(), float: pa.float64()}
+    fields = []
+    for name, info in model.model_fields.items():
+        annotation = info.annotation
+        if annotation not in types:
+            # Optional[...] / Union[...] fall back to the first supported member
+            annotation = next((a for a in get_args(annotation) if a in types), str)
+        fields.append(pa.field(name, types[annotation]))
+    return pa.schema(fields)
+
+
+# Storage backends yield documents with only the schema fields, so they go out as-is
+async def _ndjson_lines(first: dict, cursor):
+    yield ndjson_line(first)
+    async for doc in cursor:
+        yield ndjson_line(doc)
+
+
+def _drain(buf: io.BytesIO) -> bytes:
+    data = buf.getvalue()
+    buf.seek(0)
+    buf.truncate()
+    return data
+
+
+async def _arrow_batches(first: dict, cursor, model: Type[BaseModel]):
+    schema = arrow_schema(model)
+    buf = io.BytesIO()
+    with pa.ipc.new_stream(buf, schema) as writer:
+        rows = [first]
+        async for doc in cursor:
+            rows.append(doc)
+            if len(rows) >= ARROW_BATCH_SIZE:
+                writer.write_batch(pa.RecordBatch.from_pylist(rows, schema=schema))
+                rows = []
+                yield _drain(buf)
+        if rows:
+            writer.write_batch(pa.RecordBatch.from_pylist(rows, schema=schema))
+    yield _drain(buf)
+
+
+# Stream a storage iterator as NDJSON lines or arrow record batches
+async def stream_cursor(cursor, model: Type[BaseModel], media_type: str, not_found: str):
+    first = await anext(cursor, None)
+    if first is None:
+        raise HTTPException(404, not_found)
+
+    if media_type == ARROW_MEDIA_TYPE:
+        return StreamingResponse(_arrow_batches(first, cursor, model), media_type=ARROW_MEDIA_TYPE)
+    return StreamingResponse(_ndjson_lines(first, cursor), media_type=NDJSON_MEDIA_TYPE)
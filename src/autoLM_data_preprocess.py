@@ -1,8 +1,10 @@
 import pandas as pd
 
+from features import check_frame, RawSalaryModel
+
 # read the csv
 test_df = pd.read_csv("./result/TFTtest_Predictions.csv")
-salaries_df = pd.read_csv("./data/salaries.csv")
+salaries_df = check_frame(pd.read_csv("./data/salaries.csv"), RawSalaryModel)
 
 # the name is different. we
 test_df = test_df.rename(columns={
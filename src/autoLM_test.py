@@ -5,8 +5,10 @@ from sklearn.metrics import mean_absolute_error, mean_squared_error
 from flaml import AutoML
 import joblib
 
+from features import check_frame, RawSalaryModel
 
-df = pd.read_csv("./result/filtered_salaries.csv")          
+
+df = check_frame(pd.read_csv("./result/filtered_salaries.csv"), RawSalaryModel)
 y = df.pop("salary_in_usd")
 X = df                                  
 
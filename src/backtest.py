@@ -0,0 +1,217 @@
+# src/backtest.py
+# Rolling-origin backtest of the TFT setup in test.py. Each (origin, horizon)
+# cutoff trains on the years before origin and predicts origin .. origin +
+# horizon - 1. Cutoffs run in parallel worker processes that all read the same
+# cached, preprocessed salaries frame. The output is one long table of MAE / RMSE /
+# SMAPE per cutoff overall, per job title and per experience level.
+#
+#   python backtest.py                                    # origins 2022-2024, horizons 1-2
+#   python backtest.py --origins 2023 2024 --horizons 1 --compare-serial
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from features import TARGET_COL, TIME_COL, cached_frames, feature_columns, holdout_input, load_salaries
+from search import limit_torch_threads
+
+CSV_PATH = "./data/salaries.csv"
+BACKTEST_CONFIG = {
+    "top_n_titles": 50,
+    "max_encoder_length": 3,
+    "max_epochs": 3,
+}
+
+GROUPS = {"all": [], "job_title": ["Job Title"], "experience_level": ["Experience Level"]}
+
+
+def load_history(config: Dict) -> pd.DataFrame:
+    frames, _ = cached_frames(
+        "backtest", [CSV_PATH], {"top_n_titles": config["top_n_titles"]},
+        lambda: {"salaries": load_salaries(CSV_PATH, config["top_n_titles"])},
+    )
+    return frames["salaries"]
+
+
+def error_metrics(actual: np.ndarray, predicted: np.ndarray) -> Dict[str, float]:
+    return {
+        "rows": len(actual),
+        "MAE": float(np.mean(np.abs(predicted - actual))),
+        "RMSE": float(np.sqrt(np.mean((predicted - actual) ** 2))),
+        # same SMAPE (as %) as test.py
+        "SMAPE": float(100 * np.mean(2 * np.abs(predicted - actual) / (np.abs(actual) + np.abs(predicted) + 1e-8))),
+    }
+
+
+# TFT trained on frames["train"] with test.py's setup, and the prediction dataset for frames["model_input"]
+def fit_tft(frames: Dict[str, pd.DataFrame], encoder_length: int, horizon: int, max_epochs: int):
+    from lightning.pytorch import Trainer
+    from pytorch_forecasting.data import GroupNormalizer, TimeSeriesDataSet
+    from pytorch_forecasting.metrics import SMAPE
+    from pytorch_forecasting.models import TemporalFusionTransformer
+    from main import TFT_PARAMS
+
+    model_input_df = frames["model_input"]
+    training_data = TimeSeriesDataSet(
+        frames["train"],
+        time_idx=TIME_COL,
+        target=TARGET_COL,
+        group_ids=["series_id"],
+        max_encoder_length=encoder_length,
+        max_prediction_length=horizon,
+        allow_missing_timesteps=True,
+        target_normalizer=GroupNormalizer(groups=["series_id"]),
+        **feature_columns(model_input_df),
+    )
+    full_data = TimeSeriesDataSet.from_dataset(training_data, model_input_df, predict=True, stop_randomization=True)
+
+    tft = TemporalFusionTransformer.from_dataset(
+        training_data,
+        **TFT_PARAMS,
+        loss=SMAPE(),
+        log_interval=-1,
+        reduce_on_plateau_patience=2,
+    )
+    trainer = Trainer(max_epochs=max_epochs, gradient_clip_val=0.1, accelerator="cpu",
+                      enable_model_summary=False, enable_progress_bar=False, enable_checkpointing=False,
+                      logger=False)
+    # in-process loading, the cutoffs are the parallelism
+    trainer.fit(tft, train_dataloaders=training_data.to_dataloader(train=True, batch_size=32, num_workers=0))
+    return tft, full_data
+
+
+# One row per series and predicted time step
+def predict_tft(tft, full_data, horizon: int) -> pd.DataFrame:
+    result = tft.predict(full_data.to_dataloader(train=False, batch_size=256, num_workers=0),
+                         mode="prediction", return_index=True)
+    values = result.output.detach().cpu().numpy()
+    index = result.index
+    return pd.DataFrame({
+        "series_id": np.repeat(index["series_id"].to_numpy(), horizon),
+        TIME_COL: (index[TIME_COL].to_numpy()[:, None] + np.arange(horizon)).ravel(),
+        "Predicted Salary USD": values.reshape(-1),
+    })
+
+
+# Train on the years before origin, predict horizon years, score every salary row
+def run_cutoff(df: pd.DataFrame, origin: int, horizon: int, config: Dict) -> Dict:
+    from lightning.pytorch import seed_everything
+
+    start = time.perf_counter()
+    # early origins have only a couple of training years, so the encoder shrinks to fit
+    train_years = df.loc[df["Year"] < origin, "Year"].nunique()
+    encoder_length = min(config["max_encoder_length"], train_years - horizon)
+    if encoder_length < 1:
+        return {"origin": origin, "horizon": horizon, "encoder_length": encoder_length,
+                "metrics": [], "wall_s": 0.0, "skipped": f"only {train_years} training years"}
+
+    seed_everything(0, workers=True)
+    try:
+        frames = holdout_input(df, encoder_length, horizon, origin)
+    except ValueError as e:
+        return {"origin": origin, "horizon": horizon, "encoder_length": encoder_length,
+                "metrics": [], "wall_s": 0.0, "skipped": str(e)}
+    tft, full_data = fit_tft(frames, encoder_length, horizon, config["max_epochs"])
+    predicted = predict_tft(tft, full_data, horizon)
+    scored = frames["predict"].merge(predicted, on=["series_id", TIME_COL], how="inner")
+
+    metrics = []
+    for group, columns in GROUPS.items():
+        parts = scored.groupby(columns) if columns else [("all", scored)]
+        for key, part in parts:
+            key = key[0] if isinstance(key, tuple) else key
+            metrics.append({"group": group, "key": key, **error_metrics(
+                part[TARGET_COL].to_numpy(dtype=float), part["Predicted Salary USD"].to_numpy(dtype=float))})
+    return {"origin": origin, "horizon": horizon, "encoder_length": encoder_length, "metrics": metrics,
+            "wall_s": round(time.perf_counter() - start, 2), "skipped": None}
+
+
+_history = None
+
+
+def init_worker(config: Dict, threads: int):
+    global _history
+    limit_torch_threads(threads)
+    _history = load_history(config)
+
+
+def run_cutoff_in_worker(origin: int, horizon: int, config: Dict) -> Dict:
+    return run_cutoff(_history, origin, horizon, config)
+
+
+def metrics_table(results: List[Dict]) -> pd.DataFrame:
+    rows = [
+        {"origin": r["origin"], "horizon": r["horizon"], "encoder_length": r["encoder_length"], **m}
+        for r in results for m in r["metrics"]
+    ]
+    columns = ["origin", "horizon", "encoder_length", "group", "key", "rows", "MAE", "RMSE", "SMAPE"]
+    return pd.DataFrame(rows, columns=columns).sort_values(["origin", "horizon", "group", "key"]).reset_index(drop=True)
+
+
+def parse_args():
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Rolling-origin TFT backtest")
+    parser.add_argument("--origins", type=int, nargs="+", default=[2022, 2023, 2024])
+    parser.add_argument("--horizons", type=int, nargs="+", default=[1, 2])
+    parser.add_argument("--threads-per-worker", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=None, help="default: min(cutoffs, CPUs / threads per worker)")
+    parser.add_argument("--compare-serial", action="store_true",
+                        help="also run the cutoffs one after another in this process and report the speedup")
+    args = parser.parse_args()
+    args.cpus = cpus
+    return args
+
+
+def main():
+    args = parse_args()
+    os.makedirs("result", exist_ok=True)
+    df = load_history(BACKTEST_CONFIG)
+    last_year = int(df["Year"].max())
+
+    # only horizons whose years all have actuals
+    cutoffs = [(o, h) for o in args.origins for h in args.horizons if o + h - 1 <= last_year]
+    workers = args.workers or max(1, min(len(cutoffs), args.cpus // args.threads_per_worker))
+    print(f"{len(cutoffs)} cutoffs on {workers} workers x {args.threads_per_worker} threads")
+
+    start = time.perf_counter()
+    results = []
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=init_worker,
+                             initargs=(BACKTEST_CONFIG, args.threads_per_worker)) as pool:
+        futures = [pool.submit(run_cutoff_in_worker, o, h, BACKTEST_CONFIG) for o, h in cutoffs]
+        for future in as_completed(futures):
+            r = future.result()
+            results.append(r)
+            if r["skipped"]:
+                print(f"[origin {r['origin']} h={r['horizon']}] skipped: {r['skipped']}")
+            else:
+                print(f"[origin {r['origin']} h={r['horizon']}] encoder {r['encoder_length']}, {r['wall_s']:.1f}s")
+    parallel_s = time.perf_counter() - start
+
+    table = metrics_table(results)
+    if table.empty:
+        raise SystemExit("Every cutoff was skipped, no metrics to write. Use later --origins or shorter --horizons.")
+    table.to_parquet("result/backtest_metrics.parquet", index=False)
+    table.to_csv("result/backtest_metrics.csv", index=False)
+    print(table[table["group"] == "all"].to_string(index=False))
+    print("Saved result/backtest_metrics.parquet and result/backtest_metrics.csv")
+
+    if args.compare_serial:
+        start = time.perf_counter()
+        for o, h in cutoffs:
+            run_cutoff(df, o, h, BACKTEST_CONFIG)
+        serial_s = time.perf_counter() - start
+        print(f"Wall time: parallel {parallel_s:.1f}s, serial {serial_s:.1f}s, speedup {serial_s / parallel_s:.2f}x")
+    else:
+        task_s = sum(r["wall_s"] for r in results)
+        print(f"Wall time: parallel {parallel_s:.1f}s for {task_s:.1f}s of cutoff time "
+              f"(run with --compare-serial for a measured serial baseline)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# src/checkpoints.py
+# Versioned TFT checkpoints written by main.py: the Lightning checkpoint, the
+# fitted TimeSeriesDataSet parameters, the config and the predictions the model
+# produced right after training (to check a reloaded model against).
+#
+#   checkpoints/<version>/model.ckpt
+#   checkpoints/<version>/dataset_params.pkl
+#   checkpoints/<version>/meta.json
+#   checkpoints/<version>/predictions.parquet
+#   checkpoints/<version>/model_input.parquet   # history the server's /forecast encodes
+#   checkpoints/LATEST                          # name of the newest version
+import json
+import pickle
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+
+CHECKPOINT_DIR = Path("checkpoints")
+
+
+def save_checkpoint(trainer, training_data, model_input: pd.DataFrame, predictions: pd.DataFrame,
+                    config: Dict, feature_key: str, checkpoint_dir: Path = CHECKPOINT_DIR) -> Path:
+    version = f"tft-{datetime.now(timezone.utc):%Y%m%d-%H%M%S}-{feature_key}"
+    path = checkpoint_dir / version
+    path.mkdir(parents=True, exist_ok=True)
+
+    trainer.save_checkpoint(path / "model.ckpt")
+    with open(path / "dataset_params.pkl", "wb") as f:
+        pickle.dump(training_data.get_parameters(), f)
+    predictions.to_parquet(path / "predictions.parquet", index=False)
+    model_input.to_parquet(path / "model_input.parquet", index=False)
+    (path / "meta.json").write_text(json.dumps({
+        "version": version,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "config": config,
+        "feature_key": feature_key,
+    }, indent=2))
+    # written last, so LATEST never points at a half-written checkpoint
+    (checkpoint_dir / "LATEST").write_text(version)
+    print(f"Saved checkpoint {path}")
+    return path
+
+
+def checkpoint_path(version: Optional[str] = None, checkpoint_dir: Path = CHECKPOINT_DIR) -> Path:
+    if version is None:
+        latest = checkpoint_dir / "LATEST"
+        if not latest.exists():
+            raise FileNotFoundError(f"No checkpoint in {checkpoint_dir}, run main.py without --predict-only first")
+        version = latest.read_text().strip()
+    path = checkpoint_dir / version
+    if not (path / "meta.json").exists():
+        raise FileNotFoundError(f"Checkpoint {path} is missing or incomplete")
+    return path
+
+
+def load_checkpoint(version: Optional[str] = None, checkpoint_dir: Path = CHECKPOINT_DIR) -> Tuple:
+    from pytorch_forecasting.models import TemporalFusionTransformer
+
+    path = checkpoint_path(version, checkpoint_dir)
+    tft = TemporalFusionTransformer.load_from_checkpoint(path / "model.ckpt", map_location="cpu")
+    tft.eval()
+    with open(path / "dataset_params.pkl", "rb") as f:
+        dataset_params = pickle.load(f)
+    meta = json.loads((path / "meta.json").read_text())
+    print(f"Loaded checkpoint {path}")
+    return tft, dataset_params, meta, path
+
+
+# Reloaded model must give bit-identical predictions to the ones saved at training time
+def verify_predictions(predictions: pd.DataFrame, path: Path) -> bool:
+    saved = pd.read_parquet(path / "predictions.parquet")
+    try:
+        pd.testing.assert_frame_equal(
+            predictions.reset_index(drop=True), saved.reset_index(drop=True),
+            check_dtype=False, check_exact=True,
+        )
+    except AssertionError as e:
+        print(f"Predictions differ from {path / 'predictions.parquet'}:\n{e}")
+        return False
+    print(f"Predictions match {path / 'predictions.parquet'} exactly ({len(saved)} rows)")
+    return True
@@ -0,0 +1,181 @@
+# src/compare.py
+# One accuracy / cost table for the model families we use: the TFT (as in
+# test.py), FLAML AutoML (as in autoLM_test.py) and per-series baselines. Every
+# model is trained on the same time-based split: years before origin for
+# training, the origin year for testing, restricted to the series and categories
+# the TFT can score (features.holdout_input). The split is cached with
+# cached_frames. Each model is fitted in its own process, so peak RSS is the
+# model's own (torch is only imported by the TFT run).
+#
+#   python compare.py                                       # origins 2024 2025, all models
+#   python compare.py --origins 2025 --models median flaml --time-budget 60 --n-jobs 4
+import argparse
+import multiprocessing
+import os
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backtest import BACKTEST_CONFIG, CSV_PATH, error_metrics, fit_tft, load_history, predict_tft
+from features import TARGET_COL, TIME_COL, cached_frames, holdout_input
+from search import limit_torch_threads
+
+MODELS = ["median", "last_year_median", "flaml", "tft"]
+COMPARE_CONFIG = {
+    "top_n_titles": BACKTEST_CONFIG["top_n_titles"],
+    "max_encoder_length": BACKTEST_CONFIG["max_encoder_length"],
+    "max_epochs": BACKTEST_CONFIG["max_epochs"],
+    "time_budget": 120,
+}
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# Encoder length for an origin, shortened like backtest.run_cutoff when training years are few
+def encoder_length(history: pd.DataFrame, origin: int, config: Dict) -> int:
+    train_years = history.loc[history["Year"] < origin, "Year"].nunique()
+    return min(config["max_encoder_length"], train_years - 1)
+
+
+def split_frames(origin: int, length: int, config: Dict) -> Dict[str, pd.DataFrame]:
+    key = {"top_n_titles": config["top_n_titles"], "encoder_length": length, "origin": origin}
+    frames, _ = cached_frames(
+        "compare", [CSV_PATH], key,
+        lambda: holdout_input(load_history(config), length, 1, origin),
+    )
+    return frames
+
+
+# FLAML features; test categoricals reuse the train categories so the codes match
+def tabular(df: pd.DataFrame, train: pd.DataFrame = None) -> pd.DataFrame:
+    X = df.drop(columns=[TARGET_COL, "series_id", TIME_COL])
+    for col in X.select_dtypes(include=["object", "string"]).columns:
+        if train is None:
+            X[col] = X[col].astype("category")
+        else:
+            X[col] = pd.Categorical(X[col], categories=train[col].cat.categories)
+    return X
+
+
+# Fit on frames["train"], then predict frames["predict"]; returns predictions and both timings
+def fit_predict(model: str, frames: Dict[str, pd.DataFrame], length: int,
+                config: Dict, n_jobs: int) -> Tuple[np.ndarray, float, float]:
+    train, test = frames["train"], frames["predict"]
+    start = time.perf_counter()
+    if model == "median":
+        medians = train.groupby("series_id")[TARGET_COL].median()
+        train_s = time.perf_counter() - start
+        start = time.perf_counter()
+        predicted = test["series_id"].map(medians).to_numpy(dtype=float)
+    elif model == "last_year_median":
+        latest = train[train["Year"] == train.groupby("series_id")["Year"].transform("max")]
+        medians = latest.groupby("series_id")[TARGET_COL].median()
+        train_s = time.perf_counter() - start
+        start = time.perf_counter()
+        predicted = test["series_id"].map(medians).to_numpy(dtype=float)
+    elif model == "flaml":
+        from flaml import AutoML
+
+        automl = AutoML()
+        X_train = tabular(train)
+        automl.fit(X_train, train[TARGET_COL], task="regression", metric="mae",
+                   time_budget=config["time_budget"], n_jobs=n_jobs, seed=0, verbose=0)
+        train_s = time.perf_counter() - start
+        start = time.perf_counter()
+        predicted = np.asarray(automl.predict(tabular(test, X_train)), dtype=float)
+    elif model == "tft":
+        from lightning.pytorch import seed_everything
+
+        limit_torch_threads(n_jobs)
+        seed_everything(0, workers=True)
+        tft, full_data = fit_tft(frames, length, 1, config["max_epochs"])
+        train_s = time.perf_counter() - start
+        start = time.perf_counter()
+        scored = test.merge(predict_tft(tft, full_data, 1), on=["series_id", TIME_COL], how="left")
+        predicted = scored["Predicted Salary USD"].to_numpy(dtype=float)
+    else:
+        raise ValueError(f"Unknown model {model}, expected one of {MODELS}")
+    return predicted, train_s, time.perf_counter() - start
+
+
+# Predictions for every test row (NaN where the model has none), costs and unscored rows
+def run_model(model: str, origin: int, length: int, config: Dict, n_jobs: int) -> Dict:
+    frames = split_frames(origin, length, config)
+    predicted, train_s, predict_s = fit_predict(model, frames, length, config, n_jobs)
+    return {
+        "origin": origin,
+        "model": model,
+        "predicted": predicted,
+        "train_rows": len(frames["train"]),
+        "unscored_rows": int(np.isnan(predicted).sum()),
+        "train_s": round(train_s, 3),
+        "predict_s": round(predict_s, 4),
+        "predict_ms_per_row": round(1000 * predict_s / max(len(predicted), 1), 4),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+# Every model's metrics on the same rows: the test rows all of them scored
+def score_origin(runs: List[Dict], actual: np.ndarray) -> List[Dict]:
+    common = np.logical_and.reduce([~np.isnan(run["predicted"]) for run in runs])
+    rows = []
+    for run in runs:
+        row = {k: v for k, v in run.items() if k != "predicted"}
+        metrics = error_metrics(actual[common], run["predicted"][common])
+        rows.append({"origin": row.pop("origin"), "model": row.pop("model"), **metrics, **row})
+    return rows
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="TFT vs FLAML vs baselines on identical time-based splits")
+    parser.add_argument("--origins", type=int, nargs="+", default=[2024, 2025],
+                        help="test years; each model trains on the years before")
+    parser.add_argument("--models", nargs="+", choices=MODELS, default=MODELS)
+    parser.add_argument("--time-budget", type=int, default=COMPARE_CONFIG["time_budget"],
+                        help="FLAML time budget in seconds")
+    parser.add_argument("--n-jobs", type=int, default=os.cpu_count() or 1,
+                        help="FLAML n_jobs and torch threads")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    os.makedirs("result", exist_ok=True)
+    config = {**COMPARE_CONFIG, "time_budget": args.time_budget}
+    history = load_history(config)
+
+    rows = []
+    ctx = multiprocessing.get_context("spawn")
+    for origin in args.origins:
+        length = encoder_length(history, origin, config)
+        if length < 1 or origin > history["Year"].max():
+            print(f"[origin {origin}] skipped: no training or test years for it")
+            continue
+        # cached before the workers start, so they all read it
+        frames = split_frames(origin, length, config)
+        runs = []
+        for model in args.models:
+            # a fresh process per model, so peak RSS and thread settings are its own
+            with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                run = pool.submit(run_model, model, origin, length, config, args.n_jobs).result()
+            runs.append(run)
+            print(f"[origin {origin}] {model}: train {run['train_s']:.1f}s, "
+                  f"predict {run['predict_ms_per_row']:.3f} ms/row, peak RSS {run['peak_rss_mb']:.0f} MB, "
+                  f"{run['unscored_rows']} unscored rows")
+        rows += score_origin(runs, frames["predict"][TARGET_COL].to_numpy(dtype=float))
+
+    table = pd.DataFrame(rows)
+    table.to_parquet("result/model_comparison.parquet", index=False)
+    table.to_csv("result/model_comparison.csv", index=False)
+    print(table.to_string(index=False))
+    print("Saved result/model_comparison.parquet and result/model_comparison.csv")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+# src/export.py
+# Export a checkpoint from main.py for tft_runtime.py. The network is traced to
+# TorchScript (and, with --onnx, also exported to ONNX). It takes the collated
+# batch tensors and returns rescaled point predictions. The categorical
+# encoders, real-valued scalers and GroupNormalizer parameters go to
+# preprocessing.json. Every export is checked against tft.predict on the
+# checkpoint's model input; --bench then times the exported artifact against the
+# eager model for a single series and for all series at once.
+#
+#   python export.py                           # latest checkpoint -> checkpoints/<version>/export/
+#   python export.py --onnx --bench
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+import torch
+from pytorch_forecasting.data import GroupNormalizer, NaNLabelEncoder, TimeSeriesDataSet
+from sklearn.preprocessing import StandardScaler
+
+from checkpoints import load_checkpoint
+from tft_runtime import INPUTS, TFTRuntime
+
+PREDICTION_COLUMN = "Predicted Salary USD"
+# float32 network, so predictions match to about 6 significant digits
+PARITY_RTOL = 1e-4
+BENCH_REPEATS = 50
+
+
+# The collated tensors in, rescaled point predictions out
+class ExportedTFT(torch.nn.Module):
+    def __init__(self, tft):
+        super().__init__()
+        self.tft = tft
+
+    def forward(self, encoder_cat, encoder_cont, decoder_cat, decoder_cont,
+                encoder_lengths, decoder_lengths, target_scale):
+        x = {
+            "encoder_cat": encoder_cat, "encoder_cont": encoder_cont,
+            "decoder_cat": decoder_cat, "decoder_cont": decoder_cont,
+            "encoder_lengths": encoder_lengths, "decoder_lengths": decoder_lengths,
+            "target_scale": target_scale,
+        }
+        return self.tft.to_prediction(self.tft(x))
+
+
+def preprocessing_spec(dataset: TimeSeriesDataSet, example: Dict[str, torch.Tensor]) -> Dict:
+    added = [name for name in ["add_relative_time_idx", "add_target_scales", "add_encoder_length"]
+             if getattr(dataset, name)]
+    if added:
+        raise ValueError(f"Cannot export a dataset with {', '.join(added)}: tft_runtime does not compute these inputs")
+    normalizer = dataset.target_normalizer
+    if not isinstance(normalizer, GroupNormalizer):
+        raise TypeError(f"Cannot export target normalizer {type(normalizer).__name__}: only GroupNormalizer is supported")
+    if normalizer.transformation not in (None, "none"):
+        raise ValueError(f"Cannot export GroupNormalizer with transformation={normalizer.transformation!r}: "
+                         f"only untransformed targets are supported")
+
+    categoricals = []
+    for name in dataset.categoricals:
+        encoder = dataset.categorical_encoders[name]
+        if not isinstance(encoder, NaNLabelEncoder):
+            raise TypeError(f"Cannot export encoder {type(encoder).__name__} of {name}: only NaNLabelEncoder is supported")
+        categoricals.append({"name": name, "add_nan": bool(encoder.add_nan),
+                             "classes": {str(k): int(v) for k, v in encoder.classes_.items()}})
+
+    reals = []
+    for name in dataset.reals:
+        if name in dataset.target_names:
+            reals.append({"name": name, "target": True})
+            continue
+        scaler = dataset.scalers.get(name)
+        if scaler is None:
+            reals.append({"name": name, "target": False, "mean": 0.0, "scale": 1.0})
+        elif isinstance(scaler, StandardScaler):
+            reals.append({"name": name, "target": False,
+                          "mean": float(scaler.mean_[0]) if scaler.with_mean else 0.0,
+                          "scale": float(scaler.scale_[0]) if scaler.with_std else 1.0})
+        else:
+            raise TypeError(f"Cannot export scaler {type(scaler).__name__} of {name}: only StandardScaler is supported")
+
+    group = dataset.group_ids[0]
+    groups = pd.DataFrame({group: normalizer.norm_.index})
+    norms = normalizer.get_norm(groups)
+    return {
+        "group_id": group,
+        "time_idx": dataset.time_idx,
+        "max_encoder_length": dataset.max_encoder_length,
+        "min_encoder_length": dataset.min_encoder_length,
+        "max_prediction_length": dataset.max_prediction_length,
+        "min_prediction_length": dataset.min_prediction_length,
+        "prediction_column": PREDICTION_COLUMN,
+        "categoricals": categoricals,
+        "reals": reals,
+        "target_norms": {str(int(g)): [float(c), float(s)] for g, (c, s) in zip(groups[group], norms)},
+        "missing_norm": [float(normalizer.missing_["center"]), float(normalizer.missing_["scale"])],
+        "dtypes": {name: str(example[name].numpy().dtype) for name in INPUTS},
+    }
+
+
+def export(tft, dataset: TimeSeriesDataSet, export_dir: Path, onnx: bool) -> Path:
+    export_dir.mkdir(parents=True, exist_ok=True)
+    tft.eval()
+    # the whole prediction set as one batch, so the trace sees the longest encoder
+    x, _ = next(iter(dataset.to_dataloader(train=False, batch_size=len(dataset), num_workers=0)))
+    # the runtime always pads to the maximum lengths
+    example = {name: x[name] for name in INPUTS}
+    example["encoder_cat"], example["encoder_cont"] = _pad(example["encoder_cat"], dataset.max_encoder_length), \
+        _pad(example["encoder_cont"], dataset.max_encoder_length)
+    example["decoder_cat"], example["decoder_cont"] = _pad(example["decoder_cat"], dataset.max_prediction_length), \
+        _pad(example["decoder_cont"], dataset.max_prediction_length)
+
+    module = ExportedTFT(tft).eval()
+    args = tuple(example[name] for name in INPUTS)
+    with torch.no_grad():
+        traced = torch.jit.trace(module, args, check_trace=False, strict=False)
+    traced.save(str(export_dir / "tft.pt"))
+    print(f"Saved TorchScript network to {export_dir / 'tft.pt'}")
+
+    if onnx:
+        try:
+            torch.onnx.export(module, args, str(export_dir / "tft.onnx"), input_names=INPUTS,
+                              output_names=["prediction"], opset_version=17,
+                              dynamic_axes={name: {0: "batch"} for name in INPUTS + ["prediction"]})
+            print(f"Saved ONNX network to {export_dir / 'tft.onnx'}")
+        except Exception as e:
+            print(f"[Warn] ONNX export failed, TorchScript only: {type(e).__name__}: {e}")
+
+    spec = preprocessing_spec(dataset, example)
+    (export_dir / "preprocessing.json").write_text(json.dumps(spec, indent=2))
+    print(f"Saved encoders and scalers to {export_dir / 'preprocessing.json'}")
+    return export_dir
+
+
+def _pad(tensor: torch.Tensor, length: int) -> torch.Tensor:
+    if tensor.size(1) >= length:
+        return tensor
+    pad = torch.zeros((tensor.size(0), length - tensor.size(1)) + tuple(tensor.shape[2:]), dtype=tensor.dtype)
+    return torch.cat([tensor, pad], dim=1)
+
+
+def eager_predictions(tft, dataset: TimeSeriesDataSet) -> pd.DataFrame:
+    result = tft.predict(dataset.to_dataloader(train=False, batch_size=256, num_workers=0),
+                         mode="prediction", return_index=True)
+    values = result.output.detach().cpu().numpy()
+    horizon = values.shape[1]
+    group, time_idx = dataset.group_ids[0], dataset.time_idx
+    return pd.DataFrame({
+        group: np.repeat(result.index[group].to_numpy(), horizon),
+        time_idx: (result.index[time_idx].to_numpy()[:, None] + np.arange(horizon)).ravel(),
+        PREDICTION_COLUMN: values.reshape(-1),
+    })
+
+
+# Exported predictions must cover the same series and steps as tft.predict, within PARITY_RTOL
+def check_parity(runtime: TFTRuntime, tft, dataset: TimeSeriesDataSet, model_input: pd.DataFrame) -> bool:
+    keys = [dataset.group_ids[0], dataset.time_idx]
+    eager = eager_predictions(tft, dataset)
+    exported = runtime.predict(model_input)
+    merged = eager.merge(exported, on=keys, how="outer", suffixes=("_eager", "_exported"), indicator=True)
+    missing = int((merged["_merge"] != "both").sum())
+    both = merged[merged["_merge"] == "both"]
+    a, b = both[f"{PREDICTION_COLUMN}_eager"].to_numpy(), both[f"{PREDICTION_COLUMN}_exported"].to_numpy()
+    max_rel = float(np.max(np.abs(a - b) / np.maximum(np.abs(a), 1e-8))) if len(both) else 0.0
+    ok = missing == 0 and max_rel <= PARITY_RTOL
+    print(f"Parity ({runtime.backend}): {len(both)} predictions, {missing} unmatched, "
+          f"max relative difference {max_rel:.2e} -> {'OK' if ok else 'FAILED'}")
+    return ok
+
+
+def _median_ms(fn) -> float:
+    fn()  # warm-up
+    times = []
+    for _ in range(BENCH_REPEATS):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return round(float(np.median(times)) * 1000, 3)
+
+
+# Network-only latency on identical tensors, and end-to-end latency from a frame
+def bench(runtimes: Dict[str, TFTRuntime], tft, dataset_params: Dict, model_input: pd.DataFrame) -> pd.DataFrame:
+    torchscript = runtimes["torchscript"]
+    group = torchscript.spec["group_id"]
+    first_series = model_input[model_input[group] == model_input[group].iloc[0]]
+    module = ExportedTFT(tft).eval()
+
+    rows = []
+    for batch, frame in [("single series", first_series), ("all series", model_input)]:
+        inputs, index = torchscript.preprocess(frame)
+        tensors = [torch.from_numpy(inputs[name]) for name in INPUTS]
+
+        def eager_forward():
+            with torch.inference_mode():
+                module(*tensors)
+
+        def eager_end_to_end():
+            dataset = TimeSeriesDataSet.from_parameters(dataset_params, frame, predict=True, stop_randomization=True)
+            eager_predictions(tft, dataset)
+
+        rows.append({"batch": batch, "series": len(index), "runtime": "eager",
+                     "network_ms": _median_ms(eager_forward), "end_to_end_ms": _median_ms(eager_end_to_end)})
+        for backend, runtime in runtimes.items():
+            rows.append({"batch": batch, "series": len(index), "runtime": backend,
+                         "network_ms": _median_ms(lambda: runtime.run(inputs)),
+                         "end_to_end_ms": _median_ms(lambda: runtime.predict(frame))})
+    return pd.DataFrame(rows)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Export a TFT checkpoint for tft_runtime.py")
+    parser.add_argument("--checkpoint", default=None, help="checkpoint version under checkpoints/ (default: the latest)")
+    parser.add_argument("--onnx", action="store_true", help="also export ONNX (runs with onnxruntime)")
+    parser.add_argument("--bench", action="store_true", help="time exported vs eager inference")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    tft, dataset_params, meta, path = load_checkpoint(args.checkpoint)
+    model_input = pd.read_parquet(path / "model_input.parquet")
+    dataset = TimeSeriesDataSet.from_parameters(dataset_params, model_input, predict=True, stop_randomization=True)
+
+    export_dir = export(tft, dataset, path / "export", args.onnx)
+    runtimes = {"torchscript": TFTRuntime(export_dir)}
+    if (export_dir / "tft.onnx").exists():
+        try:
+            runtimes["onnx"] = TFTRuntime(export_dir, backend="onnx")
+        except ImportError:
+            print("[Warn] onnxruntime is not installed, skipping the ONNX parity check and benchmark")
+
+    ok = all([check_parity(runtime, tft, dataset, model_input) for runtime in runtimes.values()])
+    if not ok:
+        sys.exit(1)
+
+    if args.bench:
+        os.makedirs("result", exist_ok=True)
+        table = bench(runtimes, tft, dataset_params, model_input)
+        table.to_csv("result/export_bench.csv", index=False)
+        print(table.to_string(index=False))
+        print("Saved result/export_bench.csv")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+# src/features.py
+# Preprocessing shared by the TFT and comparison scripts, with a
+# content-addressed Parquet cache: the key is the hash of the input CSVs, the
+# config and this file, so a changed CSV, setting or preprocessing step misses.
+import hashlib
+import json
+import os
+import pickle
+import sys
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+# column checks shared with server/import_data.py
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "server"))
+from data_schema import RawSalaryModel
+from frame_validation import check_frame
+
+CACHE_DIR = Path("cache") / "features"
+
+TARGET_COL = "Salary in USD"
+TIME_COL = "time_idx"
+
+
+def file_digest(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_key(inputs: List[str], config: Dict) -> str:
+    digest = hashlib.sha256()
+    for path in inputs:
+        digest.update(file_digest(path).encode())
+    digest.update(json.dumps(config, sort_keys=True).encode())
+    digest.update(file_digest(__file__).encode())
+    return digest.hexdigest()[:16]
+
+
+# Frames from the cache when inputs, config and code are unchanged, else build() them
+def cached_frames(name: str, inputs: List[str], config: Dict,
+                  build: Callable[[], Dict[str, pd.DataFrame]]) -> Tuple[Dict[str, pd.DataFrame], Path]:
+    cache_dir = CACHE_DIR / f"{name}-{cache_key(inputs, config)}"
+    meta = cache_dir / "meta.json"
+    if meta.exists():
+        tables = json.loads(meta.read_text())["tables"]
+        print(f"[feature cache] hit  {cache_dir}")
+        return {table: pd.read_parquet(cache_dir / f"{table}.parquet") for table in tables}, cache_dir
+
+    print(f"[feature cache] miss {cache_dir}, preprocessing {', '.join(map(str, inputs))}")
+    frames = build()
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    for table, df in frames.items():
+        df.to_parquet(cache_dir / f"{table}.parquet", index=False)
+    # written last, so an interrupted run is a miss next time
+    meta.write_text(json.dumps({"tables": list(frames), "inputs": list(map(str, inputs)), "config": config}))
+    return frames, cache_dir
+
+
+# Short hash of TimeSeriesDataSet kwargs; encoders and normalizers are hashed by
+# their repr, which lists their parameters
+def dataset_key(kwargs: Dict) -> str:
+    return hashlib.sha256(json.dumps(kwargs, sort_keys=True, default=repr).encode()).hexdigest()[:16]
+
+
+# TimeSeriesDataSet from the persisted parameters (fitted encoders and normalizers)
+# of an earlier run with the same cache key and dataset kwargs, else built and fitted from data
+def timeseries_dataset(cache_dir: Path, data: pd.DataFrame, **kwargs):
+    from pytorch_forecasting.data import TimeSeriesDataSet
+
+    path = cache_dir / f"dataset_params-{dataset_key(kwargs)}.pkl"
+    if path.exists():
+        print(f"[feature cache] hit  {path}")
+        with open(path, "rb") as f:
+            return TimeSeriesDataSet.from_parameters(pickle.load(f), data)
+
+    print(f"[feature cache] miss {path}, fitting dataset")
+    dataset = TimeSeriesDataSet(data, **kwargs)
+    with open(path, "wb") as f:
+        pickle.dump(dataset.get_parameters(), f)
+    return dataset
+
+
+def load_salaries(csv_path: str, top_n_titles: int) -> pd.DataFrame:
+    df = check_frame(pd.read_csv(csv_path), RawSalaryModel)
+    df.drop(columns=["salary_currency", "salary"], inplace=True, errors="ignore")
+    df = df.dropna(subset=["salary_in_usd"])
+    df.rename(columns={
+        "salary_in_usd": TARGET_COL,
+        "job_title": "Job Title",
+        "experience_level": "Experience Level",
+        "work_year": "Year"
+    }, inplace=True)
+
+    # Filter to top N job titles
+    top_jobs = df["Job Title"].value_counts().nlargest(top_n_titles).index.tolist()
+    df = df[df["Job Title"].isin(top_jobs)]
+
+    # Assign series_id based on job + experience
+    df["series_id"] = df.groupby(["Job Title", "Experience Level"]).ngroup()
+    df[TIME_COL] = df["Year"] - df["Year"].min()
+
+    # Sort for consistency
+    return df.sort_values(["series_id", TIME_COL]).reset_index(drop=True)
+
+
+def _as_str(df: pd.DataFrame) -> pd.DataFrame:
+    # Ensure string type consistency for encoding
+    for col in df.select_dtypes(include="object").columns:
+        df[col] = df[col].astype(str)
+    return df
+
+
+# main.py: history plus len(future_years) rows to forecast per (Job Title, Experience Level)
+def forecast_input(df: pd.DataFrame, future_years: List[int]) -> Dict[str, pd.DataFrame]:
+    combos = df[["Job Title", "Experience Level"]].drop_duplicates()
+    steps = len(future_years)
+    future_df = combos.loc[combos.index.repeat(steps)].reset_index(drop=True)
+    future_df["Year"] = np.tile(future_years, len(combos))
+    future_df[TIME_COL] = df[TIME_COL].max() + np.tile(np.arange(1, steps + 1), len(combos))
+    future_df[TARGET_COL] = 0.0
+
+    future_df["series_id"] = future_df.groupby(["Job Title", "Experience Level"]).ngroup()
+
+    for col in df.columns:
+        if col not in future_df.columns:
+            # Attempt to fill from a representative value or default
+            if df[col].dtype == "object":
+                default_val = df[col].mode().iloc[0] if not df[col].mode().empty else "Unknown"
+            else:
+                default_val = df[col].median() if not df[col].isna().all() else 0.0
+            future_df[col] = default_val
+
+    model_input_df = pd.concat([df, future_df], ignore_index=True)
+    model_input_df = model_input_df.sort_values(["series_id", TIME_COL]).reset_index(drop=True)
+    return {"model_input": _as_str(model_input_df), "future": future_df}
+
+
+# test.py / backtest.py: train on the years before target_year, predict
+# target_year and the max_prediction_length - 1 years after it
+def holdout_input(df: pd.DataFrame, max_encoder_length: int, max_prediction_length: int,
+                  target_year: int) -> Dict[str, pd.DataFrame]:
+    train_df = df[df["Year"] < target_year].copy()
+    categorical_columns = train_df.select_dtypes(include="object").columns.tolist()
+    predict_df = df[df["Year"].between(target_year, target_year + max_prediction_length - 1)].copy()
+
+    # Filter valid series (length >= encoder + decoder)
+    min_required = max_encoder_length + max_prediction_length
+
+    def is_valid_group(df_group):
+        return df_group[TIME_COL].nunique() >= min_required and df_group[TIME_COL].max() >= (
+            df_group[TIME_COL].min() + max_encoder_length
+        )
+
+    valid_train_df = train_df.groupby("series_id").filter(is_valid_group)
+    if valid_train_df.empty:
+        raise ValueError("No valid training data found after filtering. Consider lowering encoder/prediction length.")
+
+    # Restrict all dfs to valid series_id
+    valid_series_ids = valid_train_df["series_id"].unique()
+    train_df = train_df[train_df["series_id"].isin(valid_series_ids)]
+    predict_df = predict_df[predict_df["series_id"].isin(valid_series_ids)]
+
+    for cat_col in categorical_columns:
+        valid_categories = train_df[cat_col].unique()
+        predict_df = predict_df[predict_df[cat_col].isin(valid_categories)]
+
+    model_input_df = pd.concat([train_df, predict_df], ignore_index=True)
+    return {"train": train_df, "predict": predict_df, "model_input": _as_str(model_input_df)}
+
+
+# Variable groups for the TimeSeriesDataSet, the same rules in every script
+def feature_columns(model_input_df: pd.DataFrame) -> Dict[str, List[str]]:
+    known_reals = ["Year", TIME_COL]
+    unknown_reals = [TARGET_COL]
+    static_categoricals = []
+    time_varying_categoricals = []
+    static_reals = ["remote_ratio"]
+
+    for col in model_input_df.columns:
+        if col in [TARGET_COL, TIME_COL, "series_id"]:
+            continue
+        elif model_input_df[col].dtype == "object":
+            if model_input_df[col].nunique() < 100:
+                if col in ["Job Title", "Experience Level"]:
+                    time_varying_categoricals.append(col)
+                else:
+                    static_categoricals.append(col)
+        else:
+            if col not in known_reals + unknown_reals + static_reals:
+                known_reals.append(col)
+
+    return {
+        "static_reals": static_reals,
+        "static_categoricals": static_categoricals,
+        "time_varying_known_reals": known_reals,
+        "time_varying_unknown_reals": unknown_reals,
+        "time_varying_known_categoricals": time_varying_categoricals,
+    }
+
+
+def prepare_forecast(csv_path: str, config: Dict) -> Tuple[Dict[str, pd.DataFrame], Path]:
+    def build():
+        df = load_salaries(csv_path, config["top_n_titles"])
+        return forecast_input(df, config["future_years"])
+    return cached_frames("forecast", [csv_path], config, build)
+
+
+def prepare_holdout(csv_path: str, config: Dict) -> Tuple[Dict[str, pd.DataFrame], Path]:
+    def build():
+        df = load_salaries(csv_path, config["top_n_titles"])
+        return holdout_input(df, config["max_encoder_length"], config["max_prediction_length"], config["target_year"])
+    return cached_frames("holdout", [csv_path], config, build)
@@ -0,0 +1,84 @@
+# src/inference.py
+# One inference pass over a prediction dataloader. Each batch goes through the
+# network once. From that raw output come the point predictions and the
+# interpretation (static / encoder / decoder variable importances and attention).
+# The global interpretation is kept as running sums, so it equals
+# interpret_output(reduction="sum") over the whole set. Per-series rows are
+# appended to a CSV as each batch finishes, so memory stays bounded by one batch
+# plus the predictions.
+from contextlib import nullcontext
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import torch
+
+REDUCED = ["static_variables", "encoder_variables", "decoder_variables", "attention"]
+
+
+def variable_names(tft) -> Dict[str, List[str]]:
+    return {
+        "static_variables": list(tft.static_variables),
+        "encoder_variables": list(tft.encoder_variables),
+        "decoder_variables": list(tft.decoder_variables),
+        "attention": list(range(tft.hparams.max_encoder_length)),
+    }
+
+
+def _series_rows(index: pd.DataFrame, interpretation: Dict[str, torch.Tensor],
+                 names: Dict[str, List[str]]) -> pd.DataFrame:
+    parts = []
+    for kind in REDUCED:
+        values = interpretation[kind].cpu().numpy()
+        variables = names[kind][:values.shape[1]]
+        parts.append(pd.DataFrame({
+            "series_id": np.repeat(index["series_id"].to_numpy(), len(variables)),
+            "kind": kind,
+            "variable": np.tile(np.asarray(variables, dtype=object), len(values)),
+            "importance": values[:, :len(variables)].reshape(-1),
+        }))
+    return pd.concat(parts, ignore_index=True)
+
+
+# Predictions (series_id, time_idx, Predicted Salary USD) and the summed
+# interpretation; per-series interpretation goes to series_path when given
+def stream_inference(tft, dataset, dataloader, series_path: Optional[str] = None,
+                     series_labels: Optional[pd.DataFrame] = None) -> Tuple[pd.DataFrame, Dict[str, np.ndarray]]:
+    names = variable_names(tft)
+    max_len = tft.hparams.max_encoder_length
+    totals: Dict[str, np.ndarray] = {}
+    predictions = []
+    clipped = False
+
+    tft.eval()
+    with torch.inference_mode(), (open(series_path, "w", newline="") if series_path else nullcontext()) as series_file:
+        for batch, (x, _) in enumerate(dataloader):
+            out = tft(x)
+            raw_output = dict(out._asdict())
+            # clamped the encoder_lengths
+            if raw_output["encoder_lengths"].max() >= max_len:
+                clipped = True
+                raw_output["encoder_lengths"] = torch.clamp(raw_output["encoder_lengths"], max=max_len - 1)
+
+            summed = tft.interpret_output(raw_output, reduction="sum")
+            for kind in REDUCED:
+                totals[kind] = totals.get(kind, 0) + summed[kind].cpu().numpy()
+
+            index = dataset.x_to_index(x)
+            values = tft.to_prediction(out).cpu().numpy()
+            horizon = values.shape[1]
+            predictions.append(pd.DataFrame({
+                "series_id": np.repeat(index["series_id"].to_numpy(), horizon),
+                "time_idx": (index["time_idx"].to_numpy()[:, None] + np.arange(horizon)).ravel(),
+                "Predicted Salary USD": values.reshape(-1),
+            }))
+
+            if series_file is not None:
+                rows = _series_rows(index, tft.interpret_output(raw_output, reduction="none"), names)
+                if series_labels is not None:
+                    rows = series_labels.merge(rows, on="series_id", how="right")
+                rows.to_csv(series_file, index=False, header=batch == 0)
+
+    if clipped:
+        print(f"[Fix] Clipped encoder_lengths > {max_len - 1}")
+    return pd.concat(predictions, ignore_index=True), totals
@@ -6,234 +6,258 @@ from pytorch_forecasting.metrics import SMAPE
 from lightning.pytorch import Trainer
 import torch
 import numpy as np
+import argparse
+import json
 import os
+import sys
+import time
+
+from checkpoints import load_checkpoint, save_checkpoint, verify_predictions
+from inference import stream_inference, variable_names
+from throughput import apply_threads, find_batch_size, load_throughput, prepare_model, trainer_options
+from throughput import train_dataloader as throughput_dataloader
+from warm_start import WARM_EPOCHS, NoNewRows, history_rows, latest_smape, warm_start
+from features import TARGET_COL, TIME_COL, feature_columns, prepare_forecast, timeseries_dataset
+
+FORECAST_CONFIG = {
+    "top_n_titles": 50,
+    "future_years": [2025, 2026],
+    "max_encoder_length": 5,
+    "max_prediction_length": 2,
+}
+
+# overridden by --hparams, e.g. the result/search_best.json written by search.py
+TFT_PARAMS = {
+    "learning_rate": 0.03,
+    "hidden_size": 8,
+    "attention_head_size": 1,
+    "dropout": 0.1,
+}
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Train the TFT and write forecasts and interpretation CSVs")
+    parser.add_argument("--predict-only", action="store_true",
+                        help="skip training, load a saved checkpoint and only write the outputs")
+    parser.add_argument("--checkpoint", default=None,
+                        help="checkpoint version under checkpoints/ (default: the latest)")
+    parser.add_argument("--warm-start", action="store_true",
+                        help="fine-tune the checkpoint on the rows added since it was saved instead of training from scratch")
+    parser.add_argument("--warm-epochs", type=int, default=WARM_EPOCHS,
+                        help="maximum fine-tuning epochs for --warm-start (stops early on val_loss)")
+    parser.add_argument("--compare-full", action="store_true",
+                        help="with --warm-start, also train from scratch and compare wall time and SMAPE")
+    parser.add_argument("--hparams", default=None,
+                        help="JSON file with TFT hyperparameters to train with instead of TFT_PARAMS")
+    parser.add_argument("--throughput", default=None,
+                        help="JSON file with training throughput settings, e.g. result/throughput_best.json")
+    parser.add_argument("--per-series", action="store_true",
+                        help="also write result/series_interpretation.csv with importances and attention per series")
+    parser.add_argument("--verify", action="store_true",
+                        help="with --predict-only, exit 1 unless predictions on the checkpoint's saved input equal the saved ones")
+    args = parser.parse_args()
+    if args.verify and not args.predict_only:
+        parser.error("--verify needs --predict-only")
+    if args.checkpoint and not (args.predict_only or args.warm_start):
+        parser.error("--checkpoint needs --predict-only or --warm-start")
+    if args.predict_only and args.warm_start:
+        parser.error("--predict-only and --warm-start cannot be combined")
+    if args.compare_full and not args.warm_start:
+        parser.error("--compare-full needs --warm-start")
+    if (args.hparams or args.throughput) and args.predict_only:
+        parser.error("--hparams and --throughput only apply to training")
+    return args
+
+
+def prediction_dataloader(training_data, model_input_df):
+    full_data = TimeSeriesDataSet.from_dataset(training_data,model_input_df,predict=True,stop_randomization=True)
+    full_dataloader = full_data.to_dataloader(train=False, batch_size=32, num_workers=4,persistent_workers=True)
+    return full_data, full_dataloader
 
-def main():
-    # Load and preprocess dataset
-    os.makedirs("result", exist_ok=True)
-    df = pd.read_csv("./data/salaries.csv")
-    df.drop(columns=["salary_currency", "salary"], inplace=True, errors="ignore")
-    df = df.dropna(subset=["salary_in_usd"])
-    df.rename(columns={
-        "salary_in_usd": "Salary in USD",
-        "job_title": "Job Title",
-        "experience_level": "Experience Level",
-        "work_year": "Year"
-    }, inplace=True)
-
-    # Filter to top 50 job titles
-    top_jobs = df["Job Title"].value_counts().nlargest(50).index.tolist()
-    df = df[df["Job Title"].isin(top_jobs)]
-
-    # Assign series_id based on job + experience
-    df["series_id"] = df.groupby(["Job Title", "Experience Level"]).ngroup()
-    df["time_idx"] = df["Year"] - df["Year"].min()
-
-    # Sort for consistency
-    df = df.sort_values(["series_id", "time_idx"]).reset_index(drop=True)
-
-    # Generate 2 future rows per unique (Job Title, Experience Level)
-    unique_combos = df[["Job Title", "Experience Level"]].drop_duplicates()
-    future_years = [2025, 2026]
-    last_time_idx = df["time_idx"].max()
-
-    future_rows = []
-    for _, row in unique_combos.iterrows():
-        job = str(row["Job Title"])
-        exp = str(row["Experience Level"])
-        for i, year in enumerate(future_years):
-            future_rows.append({
-                "Job Title": job,
-                "Experience Level": exp,
-                "Year": year,
-                "time_idx": last_time_idx + i + 1,
-                "Salary in USD": 0.0
-            })
-
-    # Create future DataFrame
-    future_df = pd.DataFrame(future_rows)
-    
-    # Reassign series_id
-    future_df["series_id"] = future_df.groupby(["Job Title", "Experience Level"]).ngroup()
-
-    for col in df.columns:
-        if col not in future_df.columns:
-            # Attempt to fill from a representative value or default
-            if df[col].dtype == "object":
-                default_val = df[col].mode().iloc[0] if not df[col].mode().empty else "Unknown"
-                future_df[col] = default_val
-            else:
-                default_val = df[col].median() if not df[col].isna().all() else 0.0
-                future_df[col] = default_val
-
-    df["series_id"] = df.groupby(["Job Title", "Experience Level"]).ngroup()
-
-    # Combine
-    model_input_df = pd.concat([df, future_df], ignore_index=True)
-    model_input_df = model_input_df.sort_values(["series_id", "time_idx"]).reset_index(drop=True)
-    # Ensure string type consistency for encoding
-    for col in model_input_df.select_dtypes(include='object').columns:
-        model_input_df[col] = model_input_df[col].astype(str)
-
-    # print(model_input_df)
-    # Identify model input features
-    target_col = "Salary in USD"
-    time_col = "time_idx"
-    known_reals = ["Year", time_col]
-    unknown_reals = [target_col]
-    static_categoricals = []
-    time_varying_categoricals = []
-    static_reals = ["remote_ratio"]
-
-    for col in model_input_df.columns:
-        if col in [target_col, time_col, "series_id"]:
-            continue
-        elif model_input_df[col].dtype == "object":
-            if model_input_df[col].nunique() < 100:
-                if col in ["Job Title", "Experience Level"]:
-                    time_varying_categoricals.append(col)
-                else:
-                    static_categoricals.append(col)
-        else:
-            if col not in known_reals + unknown_reals+static_reals:
-                known_reals.append(col)
-
-    max_encoder_length = 5
-    max_prediction_length = 2
-
-    # Build datasets
-    training_data = TimeSeriesDataSet(
+
+def training_dataset(cache_dir, model_input_df):
+    # Build datasets; fitted encoders/normalizers come from the cache when it hits
+    return timeseries_dataset(
+        cache_dir,
         model_input_df,
-        time_idx=time_col,
-        target=target_col,
+        time_idx=TIME_COL,
+        target=TARGET_COL,
         group_ids=["series_id"],
-        max_encoder_length=max_encoder_length,
-        max_prediction_length=max_prediction_length,
-        static_reals=static_reals,
-        static_categoricals=static_categoricals,
-        time_varying_known_reals=known_reals,
-        time_varying_unknown_reals=unknown_reals,
-        time_varying_known_categoricals=time_varying_categoricals,
+        max_encoder_length=FORECAST_CONFIG["max_encoder_length"],
+        max_prediction_length=FORECAST_CONFIG["max_prediction_length"],
         allow_missing_timesteps=True,
         target_normalizer=GroupNormalizer(groups=["series_id"]),
+        **feature_columns(model_input_df),
     )
 
-    train_dataloader = training_data.to_dataloader(train=True, batch_size=32, num_workers=4,persistent_workers=True)
-    full_data = TimeSeriesDataSet.from_dataset(training_data,model_input_df,predict=True,stop_randomization=True)
-    full_dataloader = full_data.to_dataloader(train=False, batch_size=32, num_workers=4,persistent_workers=True)
-    
-    # Model definition and training
+
+def build_model(training_data, params):
+    # Model definition
     tft = TemporalFusionTransformer.from_dataset(
         training_data,
-        learning_rate=0.03,
-        hidden_size=8,
-        attention_head_size=1,
-        dropout=0.1,
+        **params,
         loss=SMAPE(),
         log_interval=10,
         reduce_on_plateau_patience=2,
     )
     tft.save_hyperparameters(ignore=["loss", "logging_metrics"])
-
-    trainer = Trainer(max_epochs=10, gradient_clip_val=0.1, enable_model_summary=False,log_every_n_steps=1)
-    trainer.fit(tft, train_dataloaders=train_dataloader)
-    
-    # Get weight csv
-    raw_predictions= tft.predict(full_dataloader, mode="raw", return_x=True)
-    raw_output = dict(raw_predictions.output._asdict())
-    max_len = tft.hparams.max_encoder_length
-    # clamped the encoder_lengths
-    if raw_output["encoder_lengths"].max() >= max_len:
-        print(f"[Fix] Clipping encoder_lengths > {max_len - 1}")
-        raw_output["encoder_lengths"] = torch.clamp(
-            raw_output["encoder_lengths"], max=max_len - 1
-        )
-    interpretation = tft.interpret_output(raw_output, reduction="sum")
-
-    # Get static variable importances
-    static_importance_values = interpretation["static_variables"].detach().cpu().numpy()
-    static_variable_names = training_data.static_categoricals+\
-                            training_data.static_reals
-    static_df = pd.DataFrame({
-        "Variable": static_variable_names,
-        "Importance (%)": static_importance_values
+    return tft
+
+
+# Batch size, loader workers, threads, bf16 and compile come from the throughput config
+def train(training_data, params, throughput):
+    apply_threads(throughput)
+    if throughput["batch_size"] == "auto":
+        batch_size = find_batch_size(lambda: build_model(training_data, params), training_data, throughput)
+        throughput = {**throughput, "batch_size": batch_size}
+        print(f"Training with batch size {batch_size}")
+    train_dataloader = throughput_dataloader(training_data, throughput)
+
+    tft = build_model(training_data, params)
+    trainer = Trainer(max_epochs=10, gradient_clip_val=0.1, enable_model_summary=False,log_every_n_steps=1,
+                      **trainer_options(throughput))
+    trainer.fit(prepare_model(tft, throughput), train_dataloaders=train_dataloader)
+    return tft, trainer
+
+
+# Interpretation CSVs and TFT_Predictions.csv from a trained (or reloaded) model,
+# all from one inference pass (see inference.py)
+def write_outputs(tft, full_data, full_dataloader, future_df, per_series=False):
+    series_labels = future_df[["series_id", "Job Title", "Experience Level"]].drop_duplicates()
+    predictable_index, interpretation = stream_inference(
+        tft, full_data, full_dataloader,
+        series_path="result/series_interpretation.csv" if per_series else None,
+        series_labels=series_labels,
+    )
+    names = variable_names(tft)
+
+    # Get static, encoder and decoder variable importances
+    for kind, label in [("static_variables", "static"), ("encoder_variables", "encoder"), ("decoder_variables", "decoder")]:
+        importance_df = pd.DataFrame({
+            "Variable": names[kind],
+            "Importance (%)": interpretation[kind]
+        }).sort_values(by="Importance (%)", ascending=False)
+        importance_df.to_csv(f"result/{label}_variable_importances.csv", index=False)
+        print(f"Saved {label} variable importances to '{label}_variable_importances.csv'")
+
+    attention_df = pd.DataFrame({
+        "Encoder Step": names["attention"],
+        "Attention Weight": interpretation["attention"]
     })
-    static_df = static_df.sort_values(by="Importance (%)", ascending=False)
-    static_df.to_csv("result/static_variable_importances.csv", index=False)
-    print("Saved static variable importances to 'static_variable_importances.csv'")
-
-    # Extract encoder variable importances
-    encoder_importance_values = interpretation["encoder_variables"].detach().cpu().numpy()
-    encoder_variable_names = training_data.time_varying_known_reals + \
-                            training_data.time_varying_unknown_reals + \
-                            training_data.time_varying_known_categoricals
-
-    encoder_df = pd.DataFrame({
-        "Variable": encoder_variable_names,
-        "Importance (%)": encoder_importance_values
-    }).sort_values(by="Importance (%)", ascending=False)
-    encoder_df.to_csv("result/encoder_variable_importances.csv", index=False)
-    print("Saved encoder variable importances to 'encoder_variable_importances.csv'")
-
-    # Extract decoder variable importances
-    decoder_importance_values = interpretation["decoder_variables"].detach().cpu().numpy()
-    decoder_variable_names = training_data.time_varying_known_reals + \
-                            training_data.time_varying_known_categoricals
-
-    decoder_df = pd.DataFrame({
-        "Variable": decoder_variable_names,
-        "Importance (%)": decoder_importance_values
-    }).sort_values(by="Importance (%)", ascending=False)
-    decoder_df.to_csv("result/decoder_variable_importances.csv", index=False)
-    print("Saved decoder variable importances to 'decoder_variable_importances.csv'")
-
-    if "attention" in interpretation:
-        attention = interpretation["attention"]
-        attention_np = attention.detach().cpu().numpy()  # shape: (encoder_length,)
-
-        encoder_steps = list(range(len(attention_np)))
-        attention_df = pd.DataFrame({
-            "Encoder Step": encoder_steps,
-            "Attention Weight": attention_np
-        })
-
-        attention_df.to_csv("result/attention_summary.csv", index=False)
-        print("Saved summary attention weights to 'result/attention_summary.csv'")
-    else:
-        print("No attention data found in interpretation.")
+    attention_df.to_csv("result/attention_summary.csv", index=False)
+    print("Saved summary attention weights to 'result/attention_summary.csv'")
+    if per_series:
+        print("Saved per-series interpretation to 'result/series_interpretation.csv'")
 
     # tft.plot_interpretation(interpretation)
     # plt.show()
 
-    # do prediction
-    result = tft.predict(full_dataloader, mode="prediction", return_x=True)
-    predictions = result[0]
-    x = result[1]
-
-    all_preds = np.concatenate([pred.detach().cpu().numpy().flatten() for pred in predictions])
-
-    n_series = len(set(full_data.index["sequence_id"].tolist()))
-
-    # Repeat each series_id twice (for 2 time steps: 6, 7)
-    series_ids = np.repeat(list(set(full_data.index["sequence_id"])), 2)
-    time_idxs = [6, 7] * n_series  # [6, 7, 6, 7, ..., 6, 7] for each series
+    df_pred = future_predictions(future_df, predictable_index)
+    df_pred.to_csv("result/TFT_Predictions.csv", index=False)
+    print(df_pred.head())
+    return df_pred
 
-    predictable_index = pd.DataFrame({
-        "series_id": series_ids,
-        "time_idx": time_idxs
-    })
 
-    # Add predictions
-    predictable_index["Predicted Salary USD"] = all_preds
-    # Merge with future_df
+# Merge predictions with future_df
+def future_predictions(future_df, predictable_index):
     future_df_filtered = future_df.merge(
         predictable_index,
         on=["series_id", "time_idx"],
         how="inner"
     )
-    df_pred = future_df_filtered[["Job Title", "Experience Level", "Year", "Predicted Salary USD"]]
-    df_pred.to_csv("result/TFT_Predictions.csv", index=False)
-    print(df_pred.head())
+    return future_df_filtered[["Job Title", "Experience Level", "Year", "Predicted Salary USD"]]
+
+
+# --verify: predictions of the reloaded model on the model_input saved with it,
+# so changes to salaries.csv since training do not count as a mismatch
+def checkpoint_predictions(tft, dataset_params, meta, path):
+    saved_input = pd.read_parquet(path / "model_input.parquet")
+    saved_future = saved_input.drop(history_rows(saved_input, meta["config"]["future_years"]).index)
+    training_data = TimeSeriesDataSet.from_parameters(dataset_params, saved_input)
+    full_data, full_dataloader = prediction_dataloader(training_data, saved_input)
+    predictable_index, _ = stream_inference(tft, full_data, full_dataloader)
+    return future_predictions(saved_future, predictable_index)
+
+
+def main():
+    args = parse_args()
+
+    # Load and preprocess dataset
+    os.makedirs("result", exist_ok=True)
+    frames, cache_dir = prepare_forecast("./data/salaries.csv", FORECAST_CONFIG)
+    model_input_df = frames["model_input"]
+    future_df = frames["future"]
+
+    if args.predict_only:
+        # Encoders/normalizers fitted at training time, applied to the current data
+        tft, dataset_params, meta, path = load_checkpoint(args.checkpoint)
+        if args.verify and not verify_predictions(checkpoint_predictions(tft, dataset_params, meta, path), path):
+            sys.exit(1)
+        saved_config = {k: v for k, v in meta["config"].items() if k != "tft"}
+        if saved_config != FORECAST_CONFIG:
+            print(f"[Warn] checkpoint config {saved_config} differs from {FORECAST_CONFIG}")
+        training_data = TimeSeriesDataSet.from_parameters(dataset_params, model_input_df)
+        full_data, full_dataloader = prediction_dataloader(training_data, model_input_df)
+        write_outputs(tft, full_data, full_dataloader, future_df, args.per_series)
+        return
+
+    params = dict(TFT_PARAMS)
+    if args.hparams:
+        with open(args.hparams) as f:
+            hparams = json.load(f)
+        # search.py records the window shape it tuned on
+        window = hparams.pop("window", None)
+        expected = {key: FORECAST_CONFIG[key] for key in ["max_encoder_length", "max_prediction_length"]}
+        if window is not None and window != expected:
+            print(f"[Warn] {args.hparams} was tuned with {window}, training with {expected}")
+        params.update(hparams)
+        print(f"Training with {params}")
+
+    if args.warm_start:
+        warm_retrain(args, model_input_df, future_df, cache_dir, params)
+        return
+
+    training_data = training_dataset(cache_dir, model_input_df)
+    tft, trainer = train(training_data, params, load_throughput(args.throughput))
+    full_data, full_dataloader = prediction_dataloader(training_data, model_input_df)
+    df_pred = write_outputs(tft, full_data, full_dataloader, future_df, args.per_series)
+    save_checkpoint(trainer, training_data, model_input_df, df_pred, {**FORECAST_CONFIG, "tft": params}, cache_dir.name.rsplit("-", 1)[-1])
+
+
+# Fine-tune the previous checkpoint on the new rows (see warm_start.py); with
+# --compare-full, also train from scratch and write both to result/warm_start_report.csv
+def warm_retrain(args, model_input_df, future_df, cache_dir, params):
+    full_input_df = model_input_df
+    try:
+        tft, trainer, training_data, model_input_df, future_df, report = warm_start(
+            model_input_df, future_df, FORECAST_CONFIG["future_years"], args.checkpoint, args.warm_epochs)
+    except NoNewRows as e:
+        # nothing to do is not a failure, e.g. for a scheduled refresh
+        print(e)
+        return
+    reports = [report]
+
+    if args.compare_full:
+        start = time.perf_counter()
+        full_data = training_dataset(cache_dir, full_input_df)
+        full_tft, full_trainer = train(full_data, params, load_throughput(args.throughput))
+        reports.append({
+            "mode": "full retrain",
+            "from_checkpoint": None,
+            "new_rows": None,
+            "epochs": full_trainer.current_epoch,
+            "wall_s": round(time.perf_counter() - start, 2),
+            "smape_latest": round(latest_smape(full_tft, full_data, history_rows(full_input_df, FORECAST_CONFIG["future_years"])), 4),
+        })
+
+    report_df = pd.DataFrame(reports)
+    report_df.to_csv("result/warm_start_report.csv", index=False)
+    print(report_df.to_string(index=False))
+    print("Saved result/warm_start_report.csv (SMAPE on each series' latest observed year)")
+
+    full_data, full_dataloader = prediction_dataloader(training_data, model_input_df)
+    df_pred = write_outputs(tft, full_data, full_dataloader, future_df, args.per_series)
+    config = {**FORECAST_CONFIG, "tft": {k: tft.hparams[k] for k in TFT_PARAMS}}
+    save_checkpoint(trainer, training_data, model_input_df, df_pred, config, cache_dir.name.rsplit("-", 1)[-1])
 
 
 if __name__ == "__main__":
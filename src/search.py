@@ -0,0 +1,264 @@
+# src/search.py
+# Parallel hyperparameter search for the TFT in main.py. Trials run on a process
+# pool, one (hyperparameters, seed) pair per trial, each worker with a fixed
+# number of torch threads so the workers together use the CPU cores once.
+# Every worker rebuilds its datasets from the same feature cache entry, and a
+# trial stops early when its validation SMAPE is worse than the median of the
+# other trials at the same epoch.
+#
+#   python search.py                                   # 12 configs x 2 seeds
+#   python search.py --trials 30 --seeds 3 --workers 8 --threads-per-worker 2
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from features import TARGET_COL, TIME_COL, feature_columns, prepare_holdout, timeseries_dataset
+
+CSV_PATH = "./data/salaries.csv"
+# train on < 2024, validate on 2024; 2025 stays unseen for test.py
+TARGET_YEAR = 2024
+LAST_VALIDATION_YEAR = 2024
+
+SEARCH_SPACE = {
+    "learning_rate": [0.003, 0.01, 0.03, 0.1],
+    "hidden_size": [8, 16, 32, 64],
+    "attention_head_size": [1, 2, 4],
+    "dropout": [0.1, 0.2, 0.3],
+}
+
+# a trial is pruned once it reported this many epochs and is above the median
+PRUNE_AFTER_EPOCHS = 2
+PRUNE_MIN_TRIALS = 3
+
+# set per worker process by init_worker
+_datasets = None
+_reports = None
+
+
+# main.py's window shape, shortened only as far as the 2024 split forces: the
+# decoder cannot reach past LAST_VALIDATION_YEAR, and holdout_input needs
+# encoder + decoder years of training history
+def search_config() -> Dict:
+    from main import FORECAST_CONFIG
+
+    years = pd.read_csv(CSV_PATH, usecols=["work_year"])["work_year"]
+    train_years = years[years < TARGET_YEAR].nunique()
+    prediction_length = min(FORECAST_CONFIG["max_prediction_length"], LAST_VALIDATION_YEAR - TARGET_YEAR + 1)
+    encoder_length = min(FORECAST_CONFIG["max_encoder_length"], train_years - prediction_length)
+    if encoder_length < 1:
+        raise SystemExit(f"Only {train_years} years before {TARGET_YEAR}, too few to search on")
+    return {
+        "top_n_titles": FORECAST_CONFIG["top_n_titles"],
+        "max_encoder_length": encoder_length,
+        "max_prediction_length": prediction_length,
+        "target_year": TARGET_YEAR,
+    }
+
+
+def build_datasets(config: Dict):
+    from pytorch_forecasting.data import TimeSeriesDataSet, GroupNormalizer
+
+    frames, cache_dir = prepare_holdout(CSV_PATH, config)
+    model_input_df = frames["model_input"]
+    training_data = timeseries_dataset(
+        cache_dir,
+        frames["train"],
+        time_idx=TIME_COL,
+        target=TARGET_COL,
+        group_ids=["series_id"],
+        max_encoder_length=config["max_encoder_length"],
+        max_prediction_length=config["max_prediction_length"],
+        allow_missing_timesteps=True,
+        target_normalizer=GroupNormalizer(groups=["series_id"]),
+        **feature_columns(model_input_df),
+    )
+    validation_data = TimeSeriesDataSet.from_dataset(training_data, model_input_df, predict=True, stop_randomization=True)
+    return training_data, validation_data
+
+
+# Per worker process, so workers x threads does not exceed the cores
+def limit_torch_threads(threads: int):
+    import torch
+
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    torch.set_num_threads(threads)
+    torch.set_num_interop_threads(1)
+
+
+def init_worker(config: Dict, threads: int, reports):
+    global _datasets, _reports
+    limit_torch_threads(threads)
+    _datasets = build_datasets(config)
+    _reports = reports
+
+
+def median_pruning_callback(trial_id: int):
+    from lightning.pytorch.callbacks import Callback
+
+    # Median stopping across the pool: reports[(trial_id, epoch)] = val SMAPE
+    class MedianPruning(Callback):
+        def __init__(self):
+            self.history: List[float] = []
+            self.pruned = False
+
+        def on_validation_epoch_end(self, trainer, pl_module):
+            if trainer.sanity_checking or "val_loss" not in trainer.callback_metrics:
+                return
+            epoch = len(self.history)
+            value = float(trainer.callback_metrics["val_loss"])
+            self.history.append(value)
+            _reports[(trial_id, epoch)] = value
+
+            if epoch + 1 < PRUNE_AFTER_EPOCHS:
+                return
+            others = [v for (t, e), v in _reports.items() if e == epoch and t != trial_id]
+            if len(others) >= PRUNE_MIN_TRIALS and value > np.median(others):
+                self.pruned = True
+                trainer.should_stop = True
+
+    return MedianPruning()
+
+
+def run_trial(trial: Dict) -> Dict:
+    from lightning.pytorch import Trainer, seed_everything
+    from lightning.pytorch.callbacks import EarlyStopping
+    from pytorch_forecasting.metrics import SMAPE
+    from pytorch_forecasting.models import TemporalFusionTransformer
+
+    start = time.perf_counter()
+    seed_everything(trial["seed"], workers=True)
+    training_data, validation_data = _datasets
+    # the pool is the parallelism, so batches load in-process
+    train_dataloader = training_data.to_dataloader(train=True, batch_size=32, num_workers=0)
+    val_dataloader = validation_data.to_dataloader(train=False, batch_size=256, num_workers=0)
+
+    tft = TemporalFusionTransformer.from_dataset(
+        training_data,
+        **trial["params"],
+        loss=SMAPE(),
+        log_interval=-1,
+        reduce_on_plateau_patience=2,
+    )
+    pruning = median_pruning_callback(trial["trial"])
+    trainer = Trainer(
+        max_epochs=trial["max_epochs"],
+        gradient_clip_val=0.1,
+        accelerator="cpu",
+        enable_model_summary=False,
+        enable_progress_bar=False,
+        enable_checkpointing=False,
+        logger=False,
+        callbacks=[EarlyStopping(monitor="val_loss", patience=3), pruning],
+    )
+    trainer.fit(tft, train_dataloaders=train_dataloader, val_dataloaders=val_dataloader)
+
+    history = pruning.history or [float("nan")]
+    return {
+        "trial": trial["trial"],
+        "config": trial["config"],
+        "seed": trial["seed"],
+        **trial["params"],
+        "val_smape": float(np.nanmin(history)),
+        "best_epoch": int(np.nanargmin(history)) if pruning.history else -1,
+        "epochs": len(pruning.history),
+        "pruned": pruning.pruned,
+        "wall_s": round(time.perf_counter() - start, 2),
+        "worker_pid": os.getpid(),
+    }
+
+
+def sample_configs(n: int, seed: int) -> List[Dict]:
+    grid = [dict(zip(SEARCH_SPACE, values)) for values in
+            pd.MultiIndex.from_product(list(SEARCH_SPACE.values())).tolist()]
+    return random.Random(seed).sample(grid, min(n, len(grid)))
+
+
+def leaderboard(trials: pd.DataFrame) -> pd.DataFrame:
+    params = list(SEARCH_SPACE)
+    board = trials.groupby(["config"] + params, as_index=False).agg(
+        val_smape_mean=("val_smape", "mean"),
+        val_smape_std=("val_smape", "std"),
+        seeds=("seed", "count"),
+        pruned=("pruned", "sum"),
+        wall_s=("wall_s", "sum"),
+        epochs=("epochs", "sum"),
+    )
+    return board.sort_values("val_smape_mean").reset_index(drop=True)
+
+
+def parse_args():
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Parallel TFT hyperparameter search")
+    parser.add_argument("--trials", type=int, default=12, help="hyperparameter configs to sample")
+    parser.add_argument("--seeds", type=int, default=2, help="training seeds per config")
+    parser.add_argument("--max-epochs", type=int, default=10)
+    parser.add_argument("--threads-per-worker", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=None, help="default: CPUs / threads per worker")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the config sampling")
+    args = parser.parse_args()
+    args.workers = args.workers or max(1, cpus // args.threads_per_worker)
+    return args
+
+
+def main():
+    args = parse_args()
+    os.makedirs("result", exist_ok=True)
+
+    config = search_config()
+    print(f"Searching with encoder length {config['max_encoder_length']} and prediction length "
+          f"{config['max_prediction_length']} (validation year {TARGET_YEAR})")
+    # fill the feature cache once, so every worker gets a hit
+    build_datasets(config)
+
+    configs = sample_configs(args.trials, args.seed)
+    trials = [
+        {"trial": i * args.seeds + s, "config": i, "seed": s, "params": params, "max_epochs": args.max_epochs}
+        for i, params in enumerate(configs) for s in range(args.seeds)
+    ]
+    print(f"{len(trials)} trials ({len(configs)} configs x {args.seeds} seeds) on "
+          f"{args.workers} workers x {args.threads_per_worker} threads")
+
+    start = time.perf_counter()
+    results = []
+    # spawn: forked torch thread pools are not safe to reuse
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Manager() as manager:
+        reports = manager.dict()
+        with ProcessPoolExecutor(max_workers=args.workers, mp_context=ctx, initializer=init_worker,
+                                 initargs=(config, args.threads_per_worker, reports)) as pool:
+            futures = [pool.submit(run_trial, trial) for trial in trials]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                status = "pruned" if result["pruned"] else "done"
+                print(f"[trial {result['trial']:3d}] {status:6s} val SMAPE {result['val_smape']:.4f} "
+                      f"after {result['epochs']} epochs in {result['wall_s']:.1f}s")
+    wall_s = time.perf_counter() - start
+
+    trials_df = pd.DataFrame(results).sort_values("trial")
+    trials_df.to_csv("result/search_trials.csv", index=False)
+    board = leaderboard(trials_df)
+    board.to_csv("result/search_leaderboard.csv", index=False)
+    best = json.loads(board[list(SEARCH_SPACE)].iloc[[0]].to_json(orient="records"))[0]
+    # main.py --hparams warns when its window differs from the one searched on
+    best["window"] = {key: config[key] for key in ["max_encoder_length", "max_prediction_length"]}
+    with open("result/search_best.json", "w") as f:
+        json.dump(best, f, indent=2)
+
+    print(board.head(10).to_string(index=False))
+    print(f"Wall time {wall_s:.1f}s, {trials_df['wall_s'].sum():.1f}s of trial time "
+          f"({trials_df['wall_s'].sum() / wall_s:.1f}x), {int(trials_df['pruned'].sum())} trials pruned")
+    print("Saved result/search_leaderboard.csv, result/search_trials.csv and result/search_best.json "
+          "(train with: python main.py --hparams result/search_best.json)")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,130 +8,81 @@ from sklearn.metrics import mean_absolute_error, mean_squared_error
 import torch
 import numpy as np
 import math
+import argparse
 import os
 
+from features import TARGET_COL, TIME_COL, feature_columns, prepare_holdout, timeseries_dataset
+from throughput import apply_threads, find_batch_size, load_throughput, prepare_model, trainer_options
+from throughput import train_dataloader as throughput_dataloader
+
+# train on <= 2024, predict 2025
+HOLDOUT_CONFIG = {
+    "top_n_titles": 50,
+    "max_encoder_length": 3,
+    "max_prediction_length": 1,
+    "target_year": 2025,
+}
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Train on <= 2024 and score the 2025 predictions")
+    parser.add_argument("--throughput", default=None,
+                        help="JSON file with training throughput settings, e.g. result/throughput_best.json")
+    return parser.parse_args()
+
 def test():
+    args = parse_args()
+    throughput = load_throughput(args.throughput)
+    apply_threads(throughput)
+
     # Create result folder
     os.makedirs("result", exist_ok=True)
 
     # Load and preprocess dataset
-    df = pd.read_csv("./data/salaries.csv")
-    df.drop(columns=["salary_currency", "salary"], inplace=True, errors="ignore")
-    df = df.dropna(subset=["salary_in_usd"])
-    df.rename(columns={
-        "salary_in_usd": "Salary in USD",
-        "job_title": "Job Title",
-        "experience_level": "Experience Level",
-        "work_year": "Year"
-    }, inplace=True)
-
-    # Filter to top 50 job titles
-    top_jobs = df["Job Title"].value_counts().nlargest(50).index.tolist()
-    df = df[df["Job Title"].isin(top_jobs)]
-
-    # Assign series_id and time_idx
-    df["series_id"] = df.groupby(["Job Title", "Experience Level"]).ngroup()
-    df["time_idx"] = df["Year"] - df["Year"].min()
-    df = df.sort_values(["series_id", "time_idx"]).reset_index(drop=True)
-
-    # Config
-    max_encoder_length = 3
-    max_prediction_length = 1
-    target_year = 2025
-
-    # Split into train and predict sets
-    train_df = df[df["Year"] <= 2024].copy()
-    categorical_columns = train_df.select_dtypes(include='object').columns.tolist()
-    predict_df = df[df["Year"] == target_year].copy()
-
-    # Filter valid series (length ≥ encoder + decoder)
-    min_required = max_encoder_length + max_prediction_length
-
-    def is_valid_group(df_group):
-        return df_group["time_idx"].nunique() >= min_required and df_group["time_idx"].max() >= (
-            df_group["time_idx"].min() + max_encoder_length
-        )
-
-    # Filter train_df to only valid series
-    valid_train_df = train_df.groupby("series_id").filter(is_valid_group)
-
-    # Proceed only if not empty
-    if valid_train_df.empty:
-        raise ValueError("No valid training data found after filtering. Consider lowering encoder/prediction length.")
-
-    # Restrict all dfs to valid series_id
-    valid_series_ids = valid_train_df["series_id"].unique()
-    train_df = train_df[train_df["series_id"].isin(valid_series_ids)]
-    predict_df = predict_df[predict_df["series_id"].isin(valid_series_ids)]
-
-    for cat_col in categorical_columns:
-        valid_categories = train_df[cat_col].unique()
-        predict_df = predict_df[predict_df[cat_col].isin(valid_categories)]
-
-    model_input_df = pd.concat([train_df, predict_df], ignore_index=True)
-
-
-    # Ensure categorical type consistency
-    for col in model_input_df.select_dtypes(include='object').columns:
-        model_input_df[col] = model_input_df[col].astype(str)
-
-    # Feature setup
-    target_col = "Salary in USD"
-    time_col = "time_idx"
-    known_reals = ["Year", time_col]
-    unknown_reals = [target_col]
-    static_categoricals = []
-    time_varying_categoricals = []
-    static_reals = ["remote_ratio"]
-
-    for col in model_input_df.columns:
-        if col in [target_col, time_col, "series_id"]:
-            continue
-        elif model_input_df[col].dtype == "object":
-            if model_input_df[col].nunique() < 100:
-                if col in ["Job Title", "Experience Level"]:
-                    time_varying_categoricals.append(col)
-                else:
-                    static_categoricals.append(col)
-        else:
-            if col not in known_reals + unknown_reals + static_reals:
-                known_reals.append(col)
-
-    # Build datasets
-    training_data = TimeSeriesDataSet(
+    frames, cache_dir = prepare_holdout("./data/salaries.csv", HOLDOUT_CONFIG)
+    train_df = frames["train"]
+    predict_df = frames["predict"]
+    model_input_df = frames["model_input"]
+
+    # Build datasets; fitted encoders/normalizers come from the cache when it hits
+    training_data = timeseries_dataset(
+        cache_dir,
         train_df,
-        time_idx=time_col,
-        target=target_col,
+        time_idx=TIME_COL,
+        target=TARGET_COL,
         group_ids=["series_id"],
-        max_encoder_length=max_encoder_length,
-        max_prediction_length=max_prediction_length,
-        static_reals=static_reals,
-        static_categoricals=static_categoricals,
-        time_varying_known_reals=known_reals,
-        time_varying_unknown_reals=unknown_reals,
-        time_varying_known_categoricals=time_varying_categoricals,
+        max_encoder_length=HOLDOUT_CONFIG["max_encoder_length"],
+        max_prediction_length=HOLDOUT_CONFIG["max_prediction_length"],
         allow_missing_timesteps=True,
         target_normalizer=GroupNormalizer(groups=["series_id"]),
+        **feature_columns(model_input_df),
     )
 
-    train_dataloader = training_data.to_dataloader(train=True, batch_size=32, num_workers=4, persistent_workers=True)
     full_data = TimeSeriesDataSet.from_dataset(training_data, model_input_df, predict=True, stop_randomization=True)
     full_dataloader = full_data.to_dataloader(train=False, batch_size=32, num_workers=4, persistent_workers=True)
 
     # Train model
-    tft = TemporalFusionTransformer.from_dataset(
-        training_data,
-        learning_rate=0.03,
-        hidden_size=8,
-        attention_head_size=1,
-        dropout=0.1,
-        loss=SMAPE(),
-        log_interval=10,
-        reduce_on_plateau_patience=2,
-    )
-    tft.save_hyperparameters(ignore=["loss", "logging_metrics"])
-    trainer = Trainer(max_epochs=3, gradient_clip_val=0.1, enable_model_summary=False, log_every_n_steps=1)
-    trainer.fit(tft, train_dataloaders=train_dataloader)
+    def make_model():
+        tft = TemporalFusionTransformer.from_dataset(
+            training_data,
+            learning_rate=0.03,
+            hidden_size=8,
+            attention_head_size=1,
+            dropout=0.1,
+            loss=SMAPE(),
+            log_interval=10,
+            reduce_on_plateau_patience=2,
+        )
+        tft.save_hyperparameters(ignore=["loss", "logging_metrics"])
+        return tft
+
+    if throughput["batch_size"] == "auto":
+        throughput["batch_size"] = find_batch_size(make_model, training_data, throughput)
+        print(f"Training with batch size {throughput['batch_size']}")
+    train_dataloader = throughput_dataloader(training_data, throughput)
+    tft = make_model()
+    trainer = Trainer(max_epochs=3, gradient_clip_val=0.1, enable_model_summary=False, log_every_n_steps=1,
+                      **trainer_options(throughput))
+    trainer.fit(prepare_model(tft, throughput), train_dataloaders=train_dataloader)
     
     # raw_predictions= tft.predict(full_dataloader, mode="raw", return_x=True)
     # raw_output = dict(raw_predictions.output._asdict())
@@ -0,0 +1,131 @@
+# src/tft_runtime.py
+# Forecasts from a TFT exported by export.py, without pytorch_forecasting or
+# Lightning. The runtime applies the preprocessing TimeSeriesDataSet does for
+# predict=True, using the saved encoders and scalers (preprocessing.json), then
+# runs the TorchScript network (tft.pt) or, with backend="onnx", tft.onnx through
+# onnxruntime.
+#
+#   runtime = TFTRuntime("checkpoints/<version>/export")
+#   predictions = runtime.predict(model_input_df)    # series_id, time_idx, Predicted Salary USD
+import json
+from pathlib import Path
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+INPUTS = ["encoder_cat", "encoder_cont", "decoder_cat", "decoder_cont",
+          "encoder_lengths", "decoder_lengths", "target_scale"]
+
+
+class TFTRuntime:
+    def __init__(self, export_dir, backend: str = "torchscript"):
+        export_dir = Path(export_dir)
+        self.spec = json.loads((export_dir / "preprocessing.json").read_text())
+        self.backend = backend
+        if backend == "torchscript":
+            import torch
+
+            self.torch = torch
+            self.module = torch.jit.load(str(export_dir / "tft.pt"), map_location="cpu")
+            self.module.eval()
+        elif backend == "onnx":
+            import onnxruntime
+
+            self.session = onnxruntime.InferenceSession(str(export_dir / "tft.onnx"),
+                                                        providers=["CPUExecutionProvider"])
+        else:
+            raise ValueError(f"Unknown backend {backend}, expected torchscript or onnx")
+        self.norms = {int(k): v for k, v in self.spec["target_norms"].items()}
+
+    def _encode(self, values: pd.Series, categorical: Dict) -> np.ndarray:
+        classes = categorical["classes"]
+        codes = values.astype(str).map(classes)
+        if codes.isna().any():
+            if not categorical["add_nan"]:
+                unknown = values[codes.isna()].unique()[:5].tolist()
+                raise KeyError(f"Unknown {categorical['name']} values {unknown}")
+            codes = codes.fillna(0)
+        return codes.to_numpy(dtype=np.int64)
+
+    # One row per time step, encoder and decoder cut and padded like
+    # TimeSeriesDataSet(predict=True) and its collate function
+    def preprocess(self, frame: pd.DataFrame) -> Tuple[Dict[str, np.ndarray], pd.DataFrame]:
+        spec = self.spec
+        group, time_idx = spec["group_id"], spec["time_idx"]
+        max_enc, max_dec = spec["max_encoder_length"], spec["max_prediction_length"]
+        min_enc, min_dec = spec["min_encoder_length"], spec["min_prediction_length"]
+
+        # with several rows per time step the dataset keeps the last one
+        frame = frame.sort_values([group, time_idx]).drop_duplicates([group, time_idx], keep="last")
+        series = frame[group].to_numpy()
+        norm = np.array([self.norms.get(int(s), spec["missing_norm"]) for s in series], dtype=np.float64)
+
+        cats = np.stack([self._encode(frame[c["name"]], c) for c in spec["categoricals"]], axis=1) \
+            if spec["categoricals"] else np.zeros((len(frame), 0), dtype=np.int64)
+        conts = []
+        for real in spec["reals"]:
+            values = frame[real["name"]].to_numpy(dtype=np.float64)
+            if real["target"]:
+                conts.append((values - norm[:, 0]) / norm[:, 1])
+            else:
+                conts.append((values - real["mean"]) / real["scale"])
+        conts = np.stack(conts, axis=1) if conts else np.zeros((len(frame), 0))
+
+        all_times = frame[time_idx].to_numpy()
+        windows, index = [], []
+        bounds = np.flatnonzero(np.r_[True, series[1:] != series[:-1], True])
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            times = all_times[start:end]
+            # missing time steps repeat the previous row
+            steps = np.arange(times[0], times[-1] + 1)
+            rows = start + np.searchsorted(times, steps, side="right") - 1
+            dec = min(max_dec, len(steps) - min_enc)
+            enc = min(max_enc, len(steps) - dec)
+            if dec < min_dec or enc < min_enc:
+                continue
+            windows.append((rows[len(steps) - dec - enc:len(steps) - dec], rows[len(steps) - dec:], start))
+            index.append((series[start], int(steps[len(steps) - dec])))
+
+        n = len(windows)
+        dtypes = spec["dtypes"]
+        inputs = {
+            "encoder_cat": np.zeros((n, max_enc, cats.shape[1]), dtype=dtypes["encoder_cat"]),
+            "encoder_cont": np.zeros((n, max_enc, conts.shape[1]), dtype=dtypes["encoder_cont"]),
+            "decoder_cat": np.zeros((n, max_dec, cats.shape[1]), dtype=dtypes["decoder_cat"]),
+            "decoder_cont": np.zeros((n, max_dec, conts.shape[1]), dtype=dtypes["decoder_cont"]),
+            "encoder_lengths": np.zeros(n, dtype=dtypes["encoder_lengths"]),
+            "decoder_lengths": np.zeros(n, dtype=dtypes["decoder_lengths"]),
+            "target_scale": np.zeros((n, 2), dtype=dtypes["target_scale"]),
+        }
+        for i, (enc_rows, dec_rows, first) in enumerate(windows):
+            # sequences are left-aligned and zero-padded at the end
+            inputs["encoder_cat"][i, :len(enc_rows)] = cats[enc_rows]
+            inputs["encoder_cont"][i, :len(enc_rows)] = conts[enc_rows]
+            inputs["decoder_cat"][i, :len(dec_rows)] = cats[dec_rows]
+            inputs["decoder_cont"][i, :len(dec_rows)] = conts[dec_rows]
+            inputs["encoder_lengths"][i] = len(enc_rows)
+            inputs["decoder_lengths"][i] = len(dec_rows)
+            inputs["target_scale"][i] = norm[first]
+        return inputs, pd.DataFrame(index, columns=[group, time_idx])
+
+    def run(self, inputs: Dict[str, np.ndarray]) -> np.ndarray:
+        if self.backend == "onnx":
+            return self.session.run(None, {name: inputs[name] for name in INPUTS})[0]
+        with self.torch.inference_mode():
+            return self.module(*[self.torch.from_numpy(inputs[name]) for name in INPUTS]).numpy()
+
+    # One row per series and decoder step
+    def predict(self, frame: pd.DataFrame) -> pd.DataFrame:
+        group, time_idx = self.spec["group_id"], self.spec["time_idx"]
+        inputs, index = self.preprocess(frame)
+        if index.empty:
+            return pd.DataFrame(columns=[group, time_idx, self.spec["prediction_column"]])
+        values = self.run(inputs)
+        lengths = inputs["decoder_lengths"]
+        steps = np.concatenate([np.arange(length) for length in lengths])
+        return pd.DataFrame({
+            group: np.repeat(index[group].to_numpy(), lengths),
+            time_idx: np.repeat(index[time_idx].to_numpy(), lengths) + steps,
+            self.spec["prediction_column"]: np.concatenate([row[:length] for row, length in zip(values, lengths)]),
+        })
@@ -0,0 +1,195 @@
+# src/throughput.py
+# CPU training throughput settings shared by main.py and test.py, and a
+# benchmark that trains with each setting and reports samples/sec and epoch time.
+# Settings are a JSON object with any of the THROUGHPUT_DEFAULTS keys; pass it
+# with --throughput. The benchmark writes the fastest one to
+# result/throughput_best.json.
+#
+#   python throughput.py                                # every preset, 3 epochs each
+#   python throughput.py --settings baseline in_process bf16 --epochs 5
+#   python main.py --throughput result/throughput_best.json
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+import torch
+from lightning.pytorch import Trainer
+from lightning.pytorch.callbacks import Callback
+
+THROUGHPUT_DEFAULTS = {
+    "batch_size": 32,           # or "auto": the fastest of BATCH_SIZES, see find_batch_size
+    "num_workers": 4,           # 0 loads batches in the training process
+    "pin_memory": False,
+    "intra_op_threads": None,   # None keeps torch's default
+    "inter_op_threads": None,
+    "bf16": False,              # bf16 autocast on CPU
+    "compile": False,           # torch.compile the model before fitting
+}
+
+BATCH_SIZES = [32, 64, 128, 256, 512, 1024]
+SEARCH_STEPS = 10
+
+CPUS = os.cpu_count() or 1
+TUNED = {"num_workers": 0, "intra_op_threads": CPUS, "inter_op_threads": 1}
+BENCH_SETTINGS = {
+    "baseline": {},
+    "in_process": {"num_workers": 0},
+    "pinned": {"num_workers": 2, "pin_memory": True},
+    "threads": TUNED,
+    "bf16": {**TUNED, "bf16": True},
+    "compile": {**TUNED, "compile": True},
+    "auto_batch": {**TUNED, "batch_size": "auto"},
+}
+
+
+def load_throughput(path: Optional[str]) -> Dict:
+    config = dict(THROUGHPUT_DEFAULTS)
+    if path:
+        with open(path) as f:
+            config.update(json.load(f))
+    return config
+
+
+def apply_threads(config: Dict):
+    if config["intra_op_threads"]:
+        torch.set_num_threads(config["intra_op_threads"])
+    if config["inter_op_threads"]:
+        try:
+            torch.set_num_interop_threads(config["inter_op_threads"])
+        except RuntimeError as e:
+            # only settable before torch's first parallel work in this process
+            print(f"[Warn] inter_op_threads not applied: {e}")
+
+
+def train_dataloader(dataset, config: Dict):
+    workers = config["num_workers"]
+    return dataset.to_dataloader(train=True, batch_size=config["batch_size"], num_workers=workers,
+                                 persistent_workers=workers > 0, pin_memory=config["pin_memory"])
+
+
+def trainer_options(config: Dict) -> Dict:
+    return {"precision": "bf16-mixed" if config["bf16"] else "32-true"}
+
+
+def prepare_model(tft, config: Dict):
+    return torch.compile(tft) if config["compile"] else tft
+
+
+# Training samples and seconds per epoch
+class ThroughputMonitor(Callback):
+    def __init__(self):
+        self.epochs: List[tuple] = []
+
+    def on_train_epoch_start(self, trainer, pl_module):
+        self.start = time.perf_counter()
+        self.samples = 0
+
+    def on_train_batch_end(self, trainer, pl_module, outputs, batch, batch_idx):
+        self.samples += len(batch[0]["encoder_lengths"])
+
+    def on_train_epoch_end(self, trainer, pl_module):
+        self.epochs.append((time.perf_counter() - self.start, self.samples))
+
+    # the first epoch pays for worker start-up and compilation, so it is left out when there are others
+    def summary(self) -> Dict:
+        measured = self.epochs[1:] or self.epochs
+        seconds = sum(s for s, _ in measured)
+        return {
+            "samples_per_s": round(sum(n for _, n in measured) / seconds, 1),
+            "epoch_s": round(seconds / len(measured), 3),
+            "first_epoch_s": round(self.epochs[0][0], 3),
+        }
+
+
+def _fit(make_model: Callable, dataset, config: Dict, **trainer_kwargs) -> ThroughputMonitor:
+    monitor = ThroughputMonitor()
+    trainer = Trainer(gradient_clip_val=0.1, accelerator="cpu", enable_model_summary=False,
+                      enable_progress_bar=False, enable_checkpointing=False, logger=False,
+                      callbacks=[monitor], **trainer_options(config), **trainer_kwargs)
+    trainer.fit(prepare_model(make_model(), config), train_dataloaders=train_dataloader(dataset, config))
+    return monitor
+
+
+# On CPU memory is rarely the limit, so "auto" means the batch size with the
+# highest samples/sec over a few steps each
+def find_batch_size(make_model: Callable, dataset, config: Dict) -> int:
+    best, best_rate = config["batch_size"], 0.0
+    for batch_size in [b for b in BATCH_SIZES if b <= len(dataset)] or BATCH_SIZES[:1]:
+        monitor = _fit(make_model, dataset, {**config, "batch_size": batch_size},
+                       max_epochs=1, limit_train_batches=SEARCH_STEPS)
+        rate = monitor.summary()["samples_per_s"]
+        print(f"[batch size search] {batch_size:5d}: {rate:.1f} samples/s")
+        if rate > best_rate:
+            best, best_rate = batch_size, rate
+    return best
+
+
+# main.py's training data and model, fitted with one setting in this process
+def bench_setting(name: str, overrides: Dict, epochs: int) -> Dict:
+    from main import FORECAST_CONFIG, TFT_PARAMS, build_model, training_dataset
+    from features import prepare_forecast
+
+    config = {**THROUGHPUT_DEFAULTS, **overrides}
+    apply_threads(config)
+    frames, cache_dir = prepare_forecast("./data/salaries.csv", FORECAST_CONFIG)
+    dataset = training_dataset(cache_dir, frames["model_input"])
+
+    def make_model():
+        return build_model(dataset, TFT_PARAMS)
+
+    row = {"setting": name}
+    try:
+        if config["batch_size"] == "auto":
+            config["batch_size"] = find_batch_size(make_model, dataset, config)
+        monitor = _fit(make_model, dataset, config, max_epochs=epochs)
+        row.update(monitor.summary())
+    except Exception as e:
+        # e.g. torch.compile or bf16 unsupported on this host
+        row["error"] = f"{type(e).__name__}: {e}"
+    row.update({key: config[key] for key in THROUGHPUT_DEFAULTS})
+    return row
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="CPU training throughput benchmark")
+    parser.add_argument("--settings", nargs="+", choices=list(BENCH_SETTINGS), default=list(BENCH_SETTINGS))
+    parser.add_argument("--epochs", type=int, default=3)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    os.makedirs("result", exist_ok=True)
+
+    rows = []
+    ctx = multiprocessing.get_context("spawn")
+    for name in args.settings:
+        # a fresh process per setting: thread counts can only be set once per process
+        with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+            row = pool.submit(bench_setting, name, BENCH_SETTINGS[name], args.epochs).result()
+        rows.append(row)
+        if "error" in row:
+            print(f"[{name}] failed: {row['error']}")
+        else:
+            print(f"[{name}] {row['samples_per_s']:.1f} samples/s, {row['epoch_s']:.2f}s per epoch "
+                  f"(batch size {row['batch_size']})")
+
+    table = pd.DataFrame(rows)
+    table.to_csv("result/throughput_bench.csv", index=False)
+    print(table.to_string(index=False))
+
+    ok = table[table["samples_per_s"].notna()] if "samples_per_s" in table else table.iloc[0:0]
+    if len(ok):
+        best = ok.sort_values("samples_per_s", ascending=False).iloc[[0]]
+        with open("result/throughput_best.json", "w") as f:
+            json.dump(json.loads(best[list(THROUGHPUT_DEFAULTS)].to_json(orient="records"))[0], f, indent=2)
+        print(f"Fastest: {best['setting'].iloc[0]}, saved result/throughput_bench.csv and result/throughput_best.json")
+
+
+if __name__ == "__main__":
+    main()
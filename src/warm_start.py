@@ -0,0 +1,165 @@
+# src/warm_start.py
+# Incremental retraining for main.py --warm-start: start from the previous
+# checkpoint and fine-tune on the rows added since then, instead of training
+# from random weights on the full history.
+#
+# New job titles / levels need room in the fitted state: the series ids are
+# mapped back to the checkpoint's ids, the categorical encoders and the model's
+# embedding tables get rows for new categories (initialised to the mean of the
+# existing ones), and the GroupNormalizer is fitted for new series only.
+# Fine-tuning uses only training samples whose prediction window starts at or
+# after the first new time step, so the encoders still see the older history.
+import copy
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+import torch
+from lightning.pytorch import Trainer
+from lightning.pytorch.callbacks import EarlyStopping
+from pytorch_forecasting.data import GroupNormalizer, TimeSeriesDataSet
+
+from checkpoints import load_checkpoint
+from features import TARGET_COL, TIME_COL
+
+SERIES_COLS = ["Job Title", "Experience Level"]
+WARM_EPOCHS = 3
+
+
+# The data has no rows the checkpoint was not trained on
+class NoNewRows(Exception):
+    pass
+
+
+# The rows main.py trains on, without the zero-target future rows it appended
+def history_rows(model_input: pd.DataFrame, future_years: List[int]) -> pd.DataFrame:
+    is_future = model_input["Year"].isin(future_years) & (model_input[TARGET_COL] == 0)
+    return model_input[~is_future]
+
+
+# Keep the checkpoint's series_id per (Job Title, Experience Level); new pairs get new ids
+def align_series(frame: pd.DataFrame, old_ids: Dict[Tuple[str, str], int]) -> pd.DataFrame:
+    pairs = frame[SERIES_COLS].drop_duplicates().itertuples(index=False, name=None)
+    next_id = max(old_ids.values()) + 1
+    mapping = {}
+    for pair in sorted(pairs):
+        if pair in old_ids:
+            mapping[pair] = old_ids[pair]
+        else:
+            mapping[pair] = next_id
+            next_id += 1
+    frame = frame.copy()
+    frame["series_id"] = [mapping[pair] for pair in zip(frame["Job Title"], frame["Experience Level"])]
+    return frame.sort_values(["series_id", TIME_COL], kind="stable").reset_index(drop=True)
+
+
+# Rows of new that are not in old, matching identical rows by count
+def appended_rows(new: pd.DataFrame, old: pd.DataFrame) -> pd.DataFrame:
+    columns = sorted(c for c in new.columns if c != "series_id")
+
+    def keys(df):
+        hashes = pd.Series(pd.util.hash_pandas_object(
+            df[columns].astype({c: object for c in columns if not pd.api.types.is_numeric_dtype(df[c])}),
+            index=False).to_numpy())
+        return list(zip(hashes, hashes.groupby(hashes).cumcount()))
+
+    old_keys = set(keys(old))
+    return new[[key not in old_keys for key in keys(new)]]
+
+
+def extend_encoder(encoder, values) -> List:
+    new = [v for v in pd.unique(values) if v not in encoder.classes_]
+    next_index = max(encoder.classes_.values()) + 1 if encoder.classes_ else int(encoder.add_nan)
+    for offset, value in enumerate(new):
+        encoder.classes_[value] = next_index + offset
+    if hasattr(encoder, "classes_vector_"):
+        encoder.classes_vector_ = np.array(list(encoder.classes_.keys()))
+    return new
+
+
+def extend_embedding(tft, name: str, size: int):
+    embeddings = tft.input_embeddings.embeddings
+    old = embeddings[name]
+    if old.num_embeddings >= size:
+        return
+    weight = old.weight.data
+    extra = weight.mean(dim=0, keepdim=True).repeat(size - old.num_embeddings, 1)
+    new = torch.nn.Embedding(size, old.embedding_dim, padding_idx=old.padding_idx)
+    new.weight.data = torch.cat([weight, extra])
+    embeddings[name] = new
+    tft.hparams.embedding_sizes[name] = (size, old.embedding_dim)
+
+
+# Encoders, embeddings and normalizer of the checkpoint, extended for history
+def extend_fitted_state(tft, dataset_params: Dict, history: pd.DataFrame) -> Tuple[Dict, Dict[str, List]]:
+    params = copy.deepcopy(dataset_params)
+    added = {}
+    for name, encoder in params["categorical_encoders"].items():
+        column = name.replace("__group_id__", "")
+        if column not in history.columns:
+            continue
+        added[column] = extend_encoder(encoder, history[column])
+        if column in tft.input_embeddings.embeddings:
+            extend_embedding(tft, column, max(encoder.classes_.values()) + 1)
+            tft.hparams.embedding_labels[column] = dict(encoder.classes_)
+
+    normalizer = params["target_normalizer"]
+    known = set(normalizer.norm_.index)
+    new_series = history[~history["series_id"].isin(known)]
+    if len(new_series):
+        fitted = GroupNormalizer(groups=normalizer.groups).fit(new_series[TARGET_COL], new_series)
+        normalizer.norm_ = pd.concat([normalizer.norm_, fitted.norm_])
+    return params, added
+
+
+def latest_smape(tft, training_data, history: pd.DataFrame) -> float:
+    dataset = TimeSeriesDataSet.from_dataset(training_data, history, predict=True, stop_randomization=True)
+    result = tft.predict(dataset.to_dataloader(train=False, batch_size=256, num_workers=0),
+                         mode="prediction", return_y=True)
+    pred, actual = result.output.cpu().numpy(), result.y[0].cpu().numpy()
+    # same SMAPE (as %) as test.py
+    return float(100 * np.mean(2 * np.abs(pred - actual) / (np.abs(actual) + np.abs(pred) + 1e-8)))
+
+
+def warm_start(model_input_df: pd.DataFrame, future_df: pd.DataFrame, future_years: List[int],
+               version=None, epochs: int = WARM_EPOCHS):
+    start = time.perf_counter()
+    tft, dataset_params, meta, path = load_checkpoint(version)
+    old_input = pd.read_parquet(path / "model_input.parquet")
+    old_history = history_rows(old_input, meta["config"]["future_years"])
+    old_ids = dict(zip(zip(old_input["Job Title"], old_input["Experience Level"]), old_input["series_id"]))
+
+    model_input_df = align_series(model_input_df, old_ids)
+    future_df = align_series(future_df, old_ids)
+    history = history_rows(model_input_df, future_years)
+    new_rows = appended_rows(history, old_history)
+    if new_rows.empty:
+        raise NoNewRows(f"No new rows since checkpoint {meta['version']}, nothing to fine-tune")
+
+    params, added = extend_fitted_state(tft, dataset_params, history)
+    first_new = int(new_rows[TIME_COL].min())
+    print(f"[warm start] {len(new_rows)} new rows from time_idx {first_new}, "
+          + ", ".join(f"{len(v)} new {k}" for k, v in added.items() if not k.startswith("series")))
+
+    # samples that predict the new time steps only; encoders still read older rows
+    finetune_data = TimeSeriesDataSet.from_parameters(params, history, min_prediction_idx=first_new)
+    validation_data = TimeSeriesDataSet.from_dataset(finetune_data, history, predict=True, stop_randomization=True)
+    trainer = Trainer(max_epochs=epochs, gradient_clip_val=0.1, enable_model_summary=False, log_every_n_steps=1,
+                      callbacks=[EarlyStopping(monitor="val_loss", patience=1)])
+    tft.train()
+    trainer.fit(tft,
+                train_dataloaders=finetune_data.to_dataloader(train=True, batch_size=32, num_workers=0),
+                val_dataloaders=validation_data.to_dataloader(train=False, batch_size=256, num_workers=0))
+
+    # the whole input under the extended encoders, for prediction and the new checkpoint
+    training_data = TimeSeriesDataSet.from_parameters(params, model_input_df)
+    report = {
+        "mode": "warm start",
+        "from_checkpoint": meta["version"],
+        "new_rows": len(new_rows),
+        "epochs": trainer.current_epoch,
+        "wall_s": round(time.perf_counter() - start, 2),
+        "smape_latest": round(latest_smape(tft, training_data, history), 4),
+    }
+    return tft, trainer, training_data, model_input_df, future_df, report
@@ -0,0 +1,115 @@
+# server/ and src/ modules import each other by bare name, as when run from
+# their own directory; src/ comes first, so `import main` is src/main.py
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for folder in ["server", "src"]:
+    path = os.path.join(ROOT, folder)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+# A few (Job Title, Experience Level) series over 2020-2024, shaped like load_salaries' output
+def synthetic_salaries(seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    rows = []
+    for title in ["Data Analyst", "Data Engineer", "Data Scientist"]:
+        for level in ["EN", "MI", "SE"]:
+            for year in range(2020, 2025):
+                for _ in range(3):
+                    rows.append({
+                        "Year": year,
+                        "Experience Level": level,
+                        "employment_type": "FT",
+                        "Job Title": title,
+                        "Salary in USD": float(rng.integers(50_000, 200_000)),
+                        "employee_residence": "US",
+                        "remote_ratio": int(rng.choice([0, 100])),
+                        "company_location": "US",
+                        "company_size": str(rng.choice(["S", "M", "L"])),
+                    })
+    df = pd.DataFrame(rows)
+    df["series_id"] = df.groupby(["Job Title", "Experience Level"]).ngroup()
+    df["time_idx"] = df["Year"] - df["Year"].min()
+    return df.sort_values(["series_id", "time_idx"]).reset_index(drop=True)
+
+
+# main.py's training run on synthetic_salaries, one epoch, saved as a checkpoint
+@pytest.fixture(scope="session")
+def trained_checkpoint(tmp_path_factory):
+    pytest.importorskip("pytorch_forecasting")
+    from lightning.pytorch import Trainer, seed_everything
+
+    import main
+    from checkpoints import save_checkpoint
+    from features import forecast_input
+
+    root = tmp_path_factory.mktemp("tft")
+    cwd = os.getcwd()
+    os.chdir(root)
+    try:
+        os.makedirs("result")
+        seed_everything(0)
+        frames = forecast_input(synthetic_salaries(), main.FORECAST_CONFIG["future_years"])
+        training_data = main.training_dataset(root, frames["model_input"])
+        tft = main.build_model(training_data, main.TFT_PARAMS)
+        trainer = Trainer(max_epochs=1, accelerator="cpu", logger=False, enable_checkpointing=False,
+                          enable_progress_bar=False, enable_model_summary=False)
+        trainer.fit(tft, train_dataloaders=training_data.to_dataloader(train=True, batch_size=16, num_workers=0))
+        full_data, full_dataloader = main.prediction_dataloader(training_data, frames["model_input"])
+        df_pred = main.write_outputs(tft, full_data, full_dataloader, frames["future"])
+        path = save_checkpoint(trainer, training_data, frames["model_input"], df_pred,
+                               {**main.FORECAST_CONFIG, "tft": main.TFT_PARAMS}, "test", root / "checkpoints")
+    finally:
+        os.chdir(cwd)
+    return {"root": root, "path": path, "frames": frames}
+
+
+# A columnar snapshot small enough to page through: salaries, importances and predictions
+def snapshot_tables(rows: int = 25) -> dict:
+    rng = np.random.default_rng(0)
+    salaries = pd.DataFrame({
+        "job_title": rng.choice(["Data Analyst", "Data Engineer"], size=rows),
+        "experience_level": rng.choice(["Entry", "Mid", "Senior"], size=rows),
+        "salary_in_usd": rng.integers(50_000, 200_000, size=rows),
+        "employee_residence": rng.choice(["US", "GB"], size=rows),
+        "year": rng.choice([2023, 2024], size=rows),
+        "company_location": rng.choice(["US", "GB"], size=rows),
+    })
+    basic_info = pd.DataFrame({
+        "dataset": ["attention_summary"] * rows,
+        "key": list(range(rows)),
+        "value": rng.random(rows),
+    })
+    predictions = pd.DataFrame({
+        "job_title": ["Data Engineer"] * rows,
+        "experience_level": ["Senior"] * rows,
+        "year": 2025 + np.arange(rows),
+        "predicted_salary_usd": rng.random(rows) * 100_000,
+    })
+    return {"basic_info": basic_info, "salaries": salaries, "predictions": predictions}
+
+
+# server/main.py on STORAGE_BACKEND=columnar, loaded by path as "server_main"
+# (src/main.py is "main"), inside its lifespan
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    import importlib.util
+    from fastapi.testclient import TestClient
+
+    import snapshot
+
+    snapshot.write_tables(snapshot_tables(), "v1", tmp_path)
+    monkeypatch.setenv("STORAGE_BACKEND", "columnar")
+    monkeypatch.setenv("SNAPSHOT_DIR", str(tmp_path))
+    monkeypatch.setenv("FORECAST_CHECKPOINT_DIR", str(tmp_path / "checkpoints"))
+    spec = importlib.util.spec_from_file_location("server_main", os.path.join(ROOT, "server", "main.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    with TestClient(module.app) as client:
+        yield client
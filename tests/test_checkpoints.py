@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+from checkpoints import checkpoint_path, verify_predictions
+
+
+def saved_predictions(tmp_path) -> pd.DataFrame:
+    df = pd.DataFrame({
+        "Job Title": ["Data Engineer", "Data Engineer"],
+        "Experience Level": ["SE", "SE"],
+        "Year": [2025, 2026],
+        "Predicted Salary USD": [150000.123456789, 152000.5],
+    })
+    df.to_parquet(tmp_path / "predictions.parquet", index=False)
+    return df
+
+
+def test_verify_accepts_identical_predictions(tmp_path):
+    df = saved_predictions(tmp_path)
+    assert verify_predictions(df.copy(), tmp_path)
+
+
+def test_verify_rejects_any_difference(tmp_path):
+    df = saved_predictions(tmp_path)
+    nudged = df.copy()
+    nudged.loc[0, "Predicted Salary USD"] = np.nextafter(nudged.loc[0, "Predicted Salary USD"], np.inf)
+    assert not verify_predictions(nudged, tmp_path)
+    assert not verify_predictions(df.iloc[::-1], tmp_path)
+    assert not verify_predictions(df.iloc[:1], tmp_path)
+
+
+# main.py --predict-only --verify: reload, predict on the saved model_input, compare
+def test_reloaded_checkpoint_reproduces_predictions(trained_checkpoint):
+    import main
+    from checkpoints import load_checkpoint
+
+    root, path = trained_checkpoint["root"], trained_checkpoint["path"]
+    assert checkpoint_path(None, root / "checkpoints") == path
+
+    tft, dataset_params, meta, _ = load_checkpoint(None, root / "checkpoints")
+    assert verify_predictions(main.checkpoint_predictions(tft, dataset_params, meta, path), path)
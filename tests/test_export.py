@@ -0,0 +1,46 @@
+import pandas as pd
+import pytest
+
+
+@pytest.fixture(scope="module")
+def exported(trained_checkpoint):
+    from pytorch_forecasting.data import TimeSeriesDataSet
+
+    from checkpoints import load_checkpoint
+    from export import export
+
+    root = trained_checkpoint["root"]
+    tft, dataset_params, meta, path = load_checkpoint(None, root / "checkpoints")
+    model_input = pd.read_parquet(path / "model_input.parquet")
+    dataset = TimeSeriesDataSet.from_parameters(dataset_params, model_input, predict=True, stop_randomization=True)
+    export_dir = export(tft, dataset, path / "export", onnx=False)
+    return {"tft": tft, "dataset": dataset, "model_input": model_input, "export_dir": export_dir}
+
+
+# export.py's parity check: the TorchScript runtime against tft.predict
+def test_torchscript_runtime_matches_eager(exported):
+    from export import check_parity
+    from tft_runtime import TFTRuntime
+
+    runtime = TFTRuntime(exported["export_dir"])
+    assert check_parity(runtime, exported["tft"], exported["dataset"], exported["model_input"])
+
+
+def test_runtime_predicts_every_series(exported):
+    from tft_runtime import TFTRuntime
+
+    predictions = TFTRuntime(exported["export_dir"]).predict(exported["model_input"])
+    assert set(predictions["series_id"]) == set(exported["model_input"]["series_id"])
+    assert predictions["Predicted Salary USD"].notna().all()
+
+
+def test_unsupported_dataset_is_rejected(exported):
+    from export import preprocessing_spec
+
+    dataset = exported["dataset"]
+    dataset.add_relative_time_idx = True
+    try:
+        with pytest.raises(ValueError, match="add_relative_time_idx"):
+            preprocessing_spec(dataset, {})
+    finally:
+        dataset.add_relative_time_idx = False
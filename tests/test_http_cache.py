@@ -0,0 +1,36 @@
+# tests/test_http_cache.py
+# DatasetCache in front of the real app on a small columnar snapshot
+
+
+def test_not_modified_only_for_routes_that_answer(api):
+    etag = api.get("/avg_salaries").headers["ETag"]
+    current = {"If-None-Match": etag}
+
+    assert api.get("/avg_salaries", headers=current).status_code == 304
+    assert api.get("/salaries/Data Engineer", headers=current).status_code == 304
+    assert api.get("/nonexistent", headers=current).status_code == 404
+    assert api.get("/salaries/Astronaut", headers=current).status_code == 404
+    assert api.get("/records/unknown_dataset", headers=current).status_code == 404
+
+
+def page_through(api, path: str, limit: int):
+    rows, cursors, params = [], [], {"limit": limit}
+    while True:
+        response = api.get(path, params=params)
+        assert response.status_code == 200
+        rows += response.json()
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return rows, cursors
+        assert 'rel="next"' in response.headers["Link"]
+        cursors.append(cursor)
+        params = {"limit": limit, "cursor": cursor}
+
+
+# The first pass fills the body cache, the second is answered from it
+def test_hot_paths_keep_their_cursor(api):
+    for path, total in [("/records", 25), ("/tft_predictions", 25)]:
+        first, first_cursors = page_through(api, path, 10)
+        second, second_cursors = page_through(api, path, 10)
+        assert len(first) == total and len(first_cursors) == 2
+        assert second == first and second_cursors == first_cursors
@@ -0,0 +1,21 @@
+from aggregates import LOCATION_COUNTS, build_aggregates
+from data_schema import SalaryRecordModel
+from frame_validation import check_frame
+
+from conftest import snapshot_tables
+
+
+# company_location survives the import, so the location aggregate has data
+def test_import_keeps_company_location():
+    salaries = check_frame(snapshot_tables()["salaries"], SalaryRecordModel)
+    counts = build_aggregates(salaries)[LOCATION_COUNTS]
+    expected = salaries["company_location"].value_counts()
+    assert counts.set_index("company_location")["count"].to_dict() == expected.to_dict()
+
+
+def test_location_routes_answer(api):
+    overview = api.get("/salary_location").json()
+    assert sum(overview["locations"].values()) == 25
+    rows = api.get("/salary_location/US").json()
+    assert rows and all(row["company_location"] == "US" for row in rows)
+    assert api.get("/salary_location/ZZ").status_code == 404
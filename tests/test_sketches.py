@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from sketches import TDigest
+
+QUANTILES = [0.01, 0.05, 0.1, 0.25, 0.5, 0.75, 0.9, 0.95, 0.99]
+MAX_RANK_ERROR = 0.01
+
+
+# |rank(estimate) - q|, with one row of slack for estimates between two rows
+def rank_error(values: np.ndarray, q: float, estimate: float) -> float:
+    lo = np.searchsorted(values, estimate, side="left") / len(values)
+    hi = np.searchsorted(values, estimate, side="right") / len(values)
+    error = 0.0 if lo <= q <= hi else max(lo - q, q - hi)
+    return max(0.0, error - 1 / len(values))
+
+
+@pytest.fixture
+def salaries():
+    rng = np.random.default_rng(0)
+    return np.round(rng.lognormal(mean=11.8, sigma=0.5, size=20_000))
+
+
+def test_quantiles_match_exact_percentiles(salaries):
+    digest = TDigest.from_values(salaries)
+    values = np.sort(salaries)
+    estimates = digest.quantile(QUANTILES)
+    exact = np.percentile(values, [q * 100 for q in QUANTILES])
+    for q, estimate, ex in zip(QUANTILES, estimates, exact):
+        assert rank_error(values, q, estimate) <= MAX_RANK_ERROR, (q, estimate, ex)
+    assert digest.count == len(salaries)
+    assert (digest.min, digest.max) == (values[0], values[-1])
+
+
+def test_merged_cells_match_exact_percentiles(salaries):
+    cells = [TDigest.from_bytes(TDigest.from_values(part).to_bytes()) for part in np.array_split(salaries, 37)]
+    merged = TDigest.merge(cells)
+    values = np.sort(salaries)
+    for q, estimate in zip(QUANTILES, merged.quantile(QUANTILES)):
+        assert rank_error(values, q, estimate) <= MAX_RANK_ERROR, (q, estimate)
+    assert merged.count == len(salaries)